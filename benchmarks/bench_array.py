@@ -0,0 +1,83 @@
+#Benchmark of foveating many images of the same size one at a time (loadImgFromArray, run and a synchronous
+#readback per image) vs packed into texture arrays with foveate_array (one upload, draw call and readback per array)
+#Usage: python3 benchmarks/bench_array.py [-s 320x240,640x480,1280x720] [-n 64] [-k 64]
+import sys
+import time
+import getopt
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from foveate import gl_context
+gl_context.configurePlatform()
+import numpy as np
+from OpenGL.GL import *
+
+import foveate
+
+MODELS = ['classic', 'gp']
+
+
+#images per second of the per-image cycle
+def timeSingle(fov, images, gaze_points):
+    glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    start = time.perf_counter()
+    for img, point in zip(images, gaze_points):
+        fov.loadImgFromArray(img)
+        fov.moveGaze(point)
+        fov.run()
+        glReadBuffer(GL_COLOR_ATTACHMENT0)
+        np.frombuffer(glReadPixels(0, 0, fov.img_width, fov.img_height, GL_RGB, GL_UNSIGNED_BYTE), np.uint8)
+    return len(images)/(time.perf_counter() - start)
+
+
+def timeArray(fov, images, gaze_points, layers):
+    start = time.perf_counter()
+    fov.foveate_array(images, gaze_points, layers=layers)
+    return len(images)/(time.perf_counter() - start)
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hs:n:k:', ['help', 'sizes=', 'numImages=', 'layers='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(2)
+
+    sizes = [(320, 240), (640, 480), (1280, 720)]
+    numImages = 64
+    layers = None
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            print('Usage: python3 benchmarks/bench_array.py [-s WxH,WxH,...] [-n numImages] [-k layers]')
+            sys.exit(2)
+        if o in ['-s', '--sizes']:
+            sizes = [tuple(int(x) for x in s.split('x')) for s in a.split(',')]
+        if o in ['-n', '--numImages']:
+            numImages = int(a)
+        if o in ['-k', '--layers']:
+            layers = int(a)
+
+    renderers = {model: foveate.createRenderer(model, viewDist=0.6, pix2deg=32) for model in MODELS}
+
+    rng = np.random.default_rng(0)
+    print('{:>8} {:>12} {:>14} {:>14} {:>9}'.format('model', 'size', 'single img/s', 'array img/s', 'speedup'))
+    for width, height in sizes:
+        images = rng.integers(0, 256, (numImages, height, width, 3), dtype=np.uint8)
+        gaze_points = np.column_stack([rng.uniform(0, height, numImages), rng.uniform(0, width, numImages)])
+        for model, fov in renderers.items():
+            #every renderer has its own context
+            fov.context.makeCurrent()
+            #warm up: compile the array program and allocate the pooled textures and targets
+            timeSingle(fov, images[:2], gaze_points[:2])
+            timeArray(fov, images, gaze_points, layers)
+            single = timeSingle(fov, images, gaze_points)
+            array = timeArray(fov, images, gaze_points, layers)
+            print('{:>8} {:>12} {:>14.1f} {:>14.1f} {:>8.2f}x'.format(model, '{}x{}'.format(width, height), single, array, array/single))
+
+    for fov in renderers.values():
+        fov.context.terminate()
+
+if __name__ == "__main__":
+    main()
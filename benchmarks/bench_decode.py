@@ -0,0 +1,97 @@
+#Benchmark of loading large JPEG images: time and peak memory of loadImgFromFile with the mipmap pyramid (full decode,
+#then glGenerateMipmap or the numpy pyramid) and with the draft pyramid (coarse levels decoded at reduced scale, see
+#foveate/jpeg.py), every load runs in a fresh interpreter so that its peak resident memory is measured alone
+#the stimuli are images/Yarbus_Shishkin.jpg resized to the given sizes
+#Usage: python3 benchmarks/bench_decode.py [-s 6000x4000,12000x8000] [-b cpu,egl] [-t 1,4] [-n 3]
+import os
+import sys
+import json
+import getopt
+import tempfile
+import subprocess
+from os.path import abspath, dirname, join
+
+ROOT = dirname(dirname(abspath(__file__)))
+SRC = join(ROOT, 'src')
+SOURCE_IMAGE = join(ROOT, 'images', 'Yarbus_Shishkin.jpg')
+
+#ru_maxrss is in kilobytes on Linux, in bytes on macOS
+SCRIPT = """
+import sys, time, json, resource
+sys.path.insert(0, {src!r})
+import foveate
+from foveate import jpeg
+jpeg.DRAFT_THREADS = {threads}
+fov = foveate.createRenderer('gp', backend={backend!r}, visualize=False, pyramid={pyramid!r}, viewDist=0.6, pix2deg=32)
+if hasattr(fov, 'context'):
+    from OpenGL.GL import glFinish
+else:
+    glFinish = lambda: None
+scale = 1 if sys.platform == 'darwin' else 1024
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*scale
+start = time.perf_counter()
+fov.loadImgFromFile({filename!r})
+glFinish()
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*scale
+print(json.dumps({{'ms': elapsed*1e3, 'before': before, 'peak': peak}}))
+"""
+
+
+def loadStats(filename, backend, pyramid, threads):
+    script = SCRIPT.format(src=SRC, backend=backend, pyramid=pyramid, threads=threads, filename=filename)
+    result = subprocess.run([sys.executable, '-c', script], stdout=subprocess.PIPE, check=True)
+    return json.loads(result.stdout.decode().strip().splitlines()[-1])
+
+
+def writeStimulus(width, height, directory):
+    from PIL import Image
+    filename = join(directory, '{}x{}.jpg'.format(width, height))
+    with Image.open(SOURCE_IMAGE) as img:
+        img.convert('RGB').resize((width, height), Image.BICUBIC).save(filename, quality=90)
+    return filename
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hs:b:t:n:', ['help', 'sizes=', 'backends=', 'threads=', 'repeats='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(2)
+
+    sizes = [(6000, 4000), (12000, 8000)]
+    backends = ['cpu', 'auto']
+    threads = sorted({1, os.cpu_count() or 1})
+    repeats = 3
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            print('Usage: python3 benchmarks/bench_decode.py [-s WxH,WxH,...] [-b cpu,auto,glfw,egl,osmesa] [-t threads,...] [-n repeats]')
+            sys.exit(2)
+        if o in ['-s', '--sizes']:
+            sizes = [tuple(int(x) for x in s.split('x')) for s in a.split(',')]
+        if o in ['-b', '--backends']:
+            backends = a.split(',')
+        if o in ['-t', '--threads']:
+            threads = [int(x) for x in a.split(',')]
+        if o in ['-n', '--repeats']:
+            repeats = int(a)
+
+    #(label, pyramid, decoding threads)
+    cases = [('mipmap', 'mipmap', 1)] + [('draft x{}'.format(n), 'draft', n) for n in threads]
+
+    print('{:>12} {:>8} {:>12} {:>10} {:>10} {:>12}'.format('size', 'backend', 'pyramid', 'min ms', 'median ms', 'peak +MB'))
+    with tempfile.TemporaryDirectory() as directory:
+        for width, height in sizes:
+            filename = writeStimulus(width, height, directory)
+            for backend in backends:
+                for label, pyramid, n in cases:
+                    results = [loadStats(filename, backend, pyramid, n) for _ in range(repeats)]
+                    times = sorted(r['ms'] for r in results)
+                    growth = min(r['peak'] - r['before'] for r in results)/2**20
+                    print('{:>12} {:>8} {:>12} {:>10.1f} {:>10.1f} {:>12.1f}'.format('{}x{}'.format(width, height), backend, label,
+                                                                                  times[0], times[len(times)//2], growth))
+    print('time of loadImgFromFile including the pyramid, peak +MB is the growth of the peak resident memory during the load')
+
+if __name__ == "__main__":
+    main()
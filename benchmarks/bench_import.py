@@ -0,0 +1,63 @@
+#Benchmark of the import and construction time of the foveate package, every step runs in a fresh interpreter
+#importing the package alone must not import OpenGL, the OpenGL renderers pay for it on first use
+#Usage: python3 benchmarks/bench_import.py [-n 5] [-b auto|glfw|egl|osmesa]
+import sys
+import json
+import getopt
+import subprocess
+from os.path import abspath, dirname, join
+
+SRC = join(dirname(dirname(abspath(__file__))), 'src')
+
+#(name, setup, timed statement)
+STEPS = [('import foveate', '', 'import foveate'),
+         ('import foveate.renderer', 'import foveate', 'import foveate.renderer'),
+         ('Foveate_CPU()', 'import foveate', 'foveate.Foveate_CPU()'),
+         ("createRenderer('classic')", 'import foveate', "foveate.createRenderer('classic', backend=BACKEND)"),
+         ("createRenderer('gp', lodMode='table')", 'import foveate', "foveate.createRenderer('gp', backend=BACKEND, lodMode='table')")]
+
+SCRIPT = """
+import sys, time, json
+sys.path.insert(0, {src!r})
+BACKEND = {backend!r}
+{setup}
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed*1e3, 'OpenGL': 'OpenGL' in sys.modules}}))
+"""
+
+
+def timeStep(setup, statement, backend):
+    script = SCRIPT.format(src=SRC, backend=backend, setup=setup, statement=statement)
+    result = subprocess.run([sys.executable, '-c', script], stdout=subprocess.PIPE, check=True)
+    return json.loads(result.stdout.decode().strip().splitlines()[-1])
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hn:b:', ['help', 'repeats=', 'backend='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(2)
+
+    repeats = 5
+    backend = 'auto'
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            print('Usage: python3 benchmarks/bench_import.py [-n repeats] [-b auto|glfw|egl|osmesa]')
+            sys.exit(2)
+        if o in ['-n', '--repeats']:
+            repeats = int(a)
+        if o in ['-b', '--backend']:
+            backend = a
+
+    print('{:>40} {:>10} {:>10} {:>8}'.format('step', 'min ms', 'median ms', 'OpenGL'))
+    for name, setup, statement in STEPS:
+        results = [timeStep(setup, statement, backend) for _ in range(repeats)]
+        times = sorted(r['ms'] for r in results)
+        print('{:>40} {:>10.1f} {:>10.1f} {:>8}'.format(name, times[0], times[len(times)//2], 'yes' if results[0]['OpenGL'] else 'no'))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#Benchmark of incremental rendering (setIncremental) vs drawing and reading back full frames, for a gaze point moving
+#a few pixels per frame on a fixed image, every frame is drawn and read back with readImage
+#Usage: python3 benchmarks/bench_incremental.py [-m gp,classic] [-b egl,cpu] [-s 1024x768,1920x1080,3840x2160] [-n 40] [-p 3.6]
+import sys
+import time
+import getopt
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from foveate import gl_context
+gl_context.configurePlatform()
+import numpy as np
+from PIL import Image
+
+import foveate
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+
+#gaze positions moving step pixels per frame along a slow spiral around the image center
+def gazePath(width, height, numFrames, step):
+    points = []
+    angle, radius = 0.0, min(width, height)/8
+    for _ in range(numFrames):
+        angle += step/radius
+        points.append((height/2 + radius*np.sin(angle), width/2 + radius*np.cos(angle)))
+    return points
+
+
+#ms per frame and the frames read back
+def timeFrames(fov, points):
+    fov.moveGaze(points[0])
+    fov.run()
+    fov.readImage()
+    frames = []
+    start = time.perf_counter()
+    for point in points[1:]:
+        fov.moveGaze(point)
+        fov.run()
+        frames.append(np.array(fov.readImage()))
+    return (time.perf_counter() - start)/(len(points) - 1)*1e3, frames
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hm:b:s:n:p:', ['help', 'models=', 'backends=', 'sizes=', 'numFrames=', 'step='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(2)
+
+    models = ['gp', 'classic']
+    backends = ['egl', 'cpu']
+    sizes = [(1024, 768), (1920, 1080), (3840, 2160)]
+    numFrames = 40
+    step = 3.6
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            print('Usage: python3 benchmarks/bench_incremental.py [-m gp,classic] [-b auto,glfw,egl,osmesa,cpu] [-s WxH,WxH,...] [-n numFrames] [-p pixels per frame]')
+            sys.exit(2)
+        if o in ['-m', '--models']:
+            models = a.split(',')
+        if o in ['-b', '--backends']:
+            backends = a.split(',')
+        if o in ['-s', '--sizes']:
+            sizes = [tuple(int(x) for x in s.split('x')) for s in a.split(',')]
+        if o in ['-n', '--numFrames']:
+            numFrames = int(a)
+        if o in ['-p', '--step']:
+            step = float(a)
+
+    with Image.open(join(ROOT, 'images', 'Yarbus_Shishkin.jpg')) as img:
+        source = img.convert('RGB')
+
+    print('{:>8} {:>8} {:>12} {:>10} {:>10} {:>9} {:>8} {:>9}'.format('model', 'backend', 'size', 'full ms', 'incr ms', 'speedup',
+                                                                       'drawn', 'max diff'))
+    for model in models:
+        for backend in backends:
+            fov = foveate.createRenderer(model, backend=backend, visualize=False, viewDist=0.6, pix2deg=32)
+            for width, height in sizes:
+                fov.loadImgFromArray(np.asarray(source.resize((width, height), Image.BICUBIC)))
+                points = gazePath(width, height, numFrames, step)
+                fov.setIncremental(False)
+                fullMs, fullFrames = timeFrames(fov, points)
+                fov.setIncremental(True)
+                incrementalMs, frames = timeFrames(fov, points)
+                drawn = fov.incremental.drawn - 1
+                diff = max(int(np.max(np.abs(a.astype(np.int16) - b))) for a, b in zip(frames, fullFrames))
+                print('{:>8} {:>8} {:>12} {:>10.1f} {:>10.1f} {:>8.2f}x {:>8} {:>9d}'.format(model, backend, '{}x{}'.format(width, height), fullMs,
+                                                                                     incrementalMs, fullMs/incrementalMs,
+                                                                                     '{}/{}'.format(drawn, numFrames - 1), diff))
+            if hasattr(fov, 'context'):
+                fov.context.terminate()
+    print('ms per frame including readImage, drawn: frames drawn by the incremental renderer, max diff: largest difference in 8-bit levels from the full frames')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#Benchmark of the Geisler & Perry renderer with the level of detail computed per pixel (lodMode='shader')
+#vs looked up in a precomputed radial table (lodMode='table'), for a moving gaze point on a fixed image
+#speedup is shader ms/table ms, below 1 the table is slower (with llvmpipe about 0.3x from 1920x1080 to 7680x4320)
+#Usage: python3 benchmarks/bench_lod.py [-s 1920x1080,3840x2160,7680x4320] [-n 20]
+import sys
+import time
+import getopt
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from foveate import gl_context
+gl_context.configurePlatform()
+import numpy as np
+from OpenGL.GL import glFinish
+
+from foveate import Foveate_GP_OGL
+
+MODES = ['shader', 'table']
+
+
+#ms per frame for numFrames gaze positions on a circle around the image center
+def timeFrames(fov, numFrames):
+    angles = np.linspace(0, 2*np.pi, numFrames, endpoint=False)
+    radius = min(fov.img_width, fov.img_height)/4
+    points = [(fov.img_height/2 + radius*np.sin(a), fov.img_width/2 + radius*np.cos(a)) for a in angles]
+
+    fov.run()
+    glFinish()
+    start = time.perf_counter()
+    for point in points:
+        fov.updateGaze(point)
+        fov.run()
+    glFinish()
+    return (time.perf_counter() - start)/numFrames*1e3
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hs:n:', ['help', 'sizes=', 'numFrames='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(2)
+
+    sizes = [(1920, 1080), (3840, 2160), (7680, 4320)]
+    numFrames = 20
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            print('Usage: python3 benchmarks/bench_lod.py [-s WxH,WxH,...] [-n numFrames]')
+            sys.exit(2)
+        if o in ['-s', '--sizes']:
+            sizes = [tuple(int(x) for x in s.split('x')) for s in a.split(',')]
+        if o in ['-n', '--numFrames']:
+            numFrames = int(a)
+
+    renderers = {mode: Foveate_GP_OGL(viewDist=0.6, pix2deg=32, visualize=False, lodMode=mode) for mode in MODES}
+
+    rng = np.random.default_rng(0)
+    print('{:>12} {:>12} {:>12} {:>9} {:>10} {:>9}'.format('size', 'shader ms', 'table ms', 'speedup', 'mean diff', 'max diff'))
+    for width, height in sizes:
+        img = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        times = {}
+        outputs = {}
+        for mode, fov in renderers.items():
+            #every renderer has its own context
+            fov.context.makeCurrent()
+            fov.loadImgFromArray(img)
+            times[mode] = timeFrames(fov, numFrames)
+            outputs[mode] = fov.foveate_batch(img, [(height/3, width/3)])[0].astype(np.int16)
+        diff = np.abs(outputs['shader'] - outputs['table'])
+        print('{:>12} {:>12.2f} {:>12.2f} {:>8.2f}x {:>10.4f} {:>9d}'.format('{}x{}'.format(width, height), times['shader'], times['table'],
+                                                                          times['shader']/times['table'], diff.mean(), diff.max()))
+
+    for fov in renderers.values():
+        fov.context.terminate()
+
+if __name__ == "__main__":
+    main()
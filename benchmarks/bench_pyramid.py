@@ -0,0 +1,72 @@
+#Benchmark of the image pyramids: time to upload an image and build its pyramid with glGenerateMipmap, the GPU Gaussian
+#builder and the numpy Gaussian fallback, and time to draw a frame with each pyramid
+#Usage: python3 benchmarks/bench_pyramid.py [-s 1920x1080,3840x2160] [-n 10]
+import sys
+import time
+import getopt
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from foveate import gl_context
+gl_context.configurePlatform()
+import numpy as np
+from OpenGL.GL import glFinish
+
+import foveate
+from foveate.pyramid import gaussianPyramid
+
+
+#ms per call of fn, after one warm up call
+def timeCalls(fn, repeats):
+    fn()
+    glFinish()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    glFinish()
+    return (time.perf_counter() - start)/repeats*1e3
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hs:n:', ['help', 'sizes=', 'repeats='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(2)
+
+    sizes = [(1920, 1080), (3840, 2160)]
+    repeats = 10
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            print('Usage: python3 benchmarks/bench_pyramid.py [-s WxH,WxH,...] [-n repeats]')
+            sys.exit(2)
+        if o in ['-s', '--sizes']:
+            sizes = [tuple(int(x) for x in s.split('x')) for s in a.split(',')]
+        if o in ['-n', '--repeats']:
+            repeats = int(a)
+
+    renderers = {pyramid: foveate.createRenderer('gp', pyramid=pyramid, viewDist=0.6, pix2deg=32) for pyramid in foveate.PYRAMIDS}
+
+    rng = np.random.default_rng(0)
+    print('{:>12} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}'.format('size', 'mipmap', 'gaussian', 'numpy', 'draw mip', 'draw gauss', 'draw lapl'))
+    for width, height in sizes:
+        img = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        load = {}
+        draw = {}
+        for pyramid, fov in renderers.items():
+            #every renderer has its own context
+            fov.context.makeCurrent()
+            load[pyramid] = timeCalls(lambda: fov.loadImgFromArray(img), repeats)
+            draw[pyramid] = timeCalls(fov.draw, repeats)
+        numpyTime = timeCalls(lambda: gaussianPyramid(img), max(1, repeats//5))
+        print('{:>12} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}'.format('{}x{}'.format(width, height), load['mipmap'], load['gaussian'],
+                                                                                      numpyTime, draw['mipmap'], draw['gaussian'], draw['laplacian']))
+    print('load and draw times in ms, numpy is the CPU fallback of the gaussian pyramid without the upload')
+
+    for fov in renderers.values():
+        fov.context.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#Benchmark of the batch loop in main() with synchronous saveImage vs asynchronous saveImageAsync (PBO ring)
+#Usage: python3 benchmarks/bench_readback.py [-i inputDir] [-s 3840x2160] [-n 16] [-g]
+#without -i, n synthetic JPEG images of the given size are generated in a temporary directory
+#with llvmpipe the asynchronous loop is 0-5% faster, as the draw dominates the frame and the readback is a few percent of it
+import sys
+import time
+import getopt
+import tempfile
+from os import listdir, makedirs
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from foveate import gl_context
+gl_context.configurePlatform()
+import numpy as np
+from PIL import Image
+
+from foveate import Foveate_OGL, Foveate_GP_OGL
+
+
+def runLoop(fov_ogl, inputDir, imageList, outputDir, asynchronous):
+    start = time.perf_counter()
+    for imgName in imageList:
+        fov_ogl.loadImgFromFile(imgFilename=join(inputDir, imgName))
+        fov_ogl.run()
+        if asynchronous:
+            fov_ogl.saveImageAsync(join(outputDir, imgName))
+        else:
+            fov_ogl.saveImage(join(outputDir, imgName))
+    if asynchronous:
+        fov_ogl.flushImages()
+    return len(imageList)/(time.perf_counter() - start)
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hi:s:n:g', ['help', 'inputDir=', 'size=', 'numImages=', 'gp'])
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(2)
+
+    inputDir = None
+    width, height = 3840, 2160
+    numImages = 16
+    gp = False
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            print('Usage: python3 benchmarks/bench_readback.py [-i inputDir] [-s WxH] [-n numImages] [-g]')
+            sys.exit(2)
+        if o in ['-i', '--inputDir']:
+            inputDir = a
+        if o in ['-s', '--size']:
+            width, height = [int(x) for x in a.split('x')]
+        if o in ['-n', '--numImages']:
+            numImages = int(a)
+        if o in ['-g', '--gp']:
+            gp = True
+
+    tmpDir = tempfile.TemporaryDirectory()
+    if inputDir is None:
+        inputDir = join(tmpDir.name, 'input')
+        makedirs(inputDir)
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 256, (height//8, width//8, 3), dtype=np.uint8)
+        for i in range(numImages):
+            img = Image.fromarray(np.roll(base, i, axis=1)).resize((width, height), Image.BILINEAR)
+            img.save(join(inputDir, 'img{:03d}.jpg'.format(i)), quality=90)
+
+    imageList = [f for f in sorted(listdir(inputDir)) if any(f.endswith(ext) for ext in ['jpg', 'jpeg', 'bmp', 'png', 'gif'])]
+    outputDir = join(tmpDir.name, 'output')
+    makedirs(outputDir)
+
+    if gp:
+        fov_ogl = Foveate_GP_OGL(viewDist=0.6, pix2deg=32, visualize=False)
+    else:
+        fov_ogl = Foveate_OGL(visualize=False)
+
+    #warm up shader compilation and buffer allocation
+    runLoop(fov_ogl, inputDir, imageList[:1], outputDir, False)
+
+    syncFps = runLoop(fov_ogl, inputDir, imageList, outputDir, False)
+    asyncFps = runLoop(fov_ogl, inputDir, imageList, outputDir, True)
+    print('{} images from {}'.format(len(imageList), inputDir))
+    print('saveImage:      {:.2f} fps'.format(syncFps))
+    print('saveImageAsync: {:.2f} fps ({:+.1f}%)'.format(asyncFps, 100*(asyncFps/syncFps - 1)))
+
+    fov_ogl.context.terminate()
+
+if __name__ == "__main__":
+    main()
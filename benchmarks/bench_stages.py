@@ -0,0 +1,236 @@
+#Benchmark of every pipeline stage (decode, upload, mipmap, draw, readback, encode, see foveate/profiling.py) of the
+#classic and Geisler&Perry renderers over a grid of image sizes and numbers of gaze points per image
+#every repetition loads a JPEG file, then moves the gaze, renders and saves the frame for each gaze point, the stage times
+#are collected with setInstrumentation, results are written as JSON or CSV and can be compared with an earlier run
+#Usage: python3 benchmarks/bench_stages.py [-s 640x480,1920x1080] [-g 1,8] [-n 5] [-o results.json] [-c baseline.json]
+import sys
+import csv
+import json
+import time
+import getopt
+import platform
+import datetime
+import tempfile
+import subprocess
+from collections import defaultdict
+from os.path import abspath, dirname, join, splitext
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, join(ROOT, 'src'))
+
+import numpy as np
+from PIL import Image
+
+import foveate
+from foveate import gl_context
+
+FIELDS = ['model', 'width', 'height', 'gazeCount', 'stage', 'clock', 'count', 'meanMs', 'medianMs', 'minMs']
+
+
+def usage():
+    print('Usage: python3 benchmarks/bench_stages.py [options]')
+    print('Options:')
+    print('-h, --help\t\t', 'Displays this help')
+    print('-m, --models\t\t', 'Foveation models, default: classic,gp')
+    print('-s, --sizes\t\t', 'Image sizes, default: 640x480,1920x1080')
+    print('-g, --gazeCounts\t', 'Numbers of gaze points per image, default: 1,8')
+    print('-n, --repeats\t\t', 'Repetitions per size and gaze count (after one warm up), default: 5')
+    print('-b, --backend\t\t', 'Renderer backend: auto, egl, osmesa, glfw or cpu, default: auto')
+    print('-l, --lodMode\t\t', 'LOD computation of the OpenGL renderers: shader or table, default: shader')
+    print('-y, --pyramid\t\t', 'Image pyramid: mipmap, gaussian or laplacian, default: mipmap')
+    print('-f, --format\t\t', 'Format of the saved frames: png or jpg, default: png')
+    print('-o, --output\t\t', 'Write the results to a .json or .csv file')
+    print('-c, --compare\t\t', 'Compare the median times with the results of an earlier run (.json or .csv)')
+
+
+#synthetic test image: smooth gradients with noise, so that JPEG decoding and PNG encoding do real work
+def makeImage(width, height, rng):
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)
+    img = np.stack([x[np.newaxis, :] + 0*y[:, np.newaxis], y[:, np.newaxis] + 0*x[np.newaxis, :],
+                    (x[np.newaxis, :] + y[:, np.newaxis])/2], axis=2)
+    img += rng.normal(0, 20, img.shape).astype(np.float32)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+#time the repetitions of one configuration, returns the times per stage and clock and the wall time per repetition
+def runConfig(fov, imgFilename, outFilename, gazePoints, repeats):
+    times = defaultdict(list)
+
+    def collect(stage, seconds, info):
+        times[(stage, info['clock'])].append(seconds)
+
+    totals = []
+    for repeat in range(repeats + 1):
+        #the first repetition warms up the pooled textures and the caches and is not measured
+        fov.setInstrumentation(collect if repeat > 0 else None)
+        start = time.perf_counter()
+        fov.loadImgFromFile(imgFilename=imgFilename)
+        for point in gazePoints:
+            fov.moveGaze(point)
+            fov.run()
+            fov.saveImage(outFilename)
+        fov.flushInstrumentation()
+        if repeat > 0:
+            totals.append(time.perf_counter() - start)
+    fov.setInstrumentation(None)
+    times[('total', 'cpu')] = totals
+    return times
+
+
+def summarize(values):
+    values = np.asarray(values)*1e3
+    return {'count': len(values), 'meanMs': float(values.mean()), 'medianMs': float(np.median(values)), 'minMs': float(values.min())}
+
+
+def gitCommit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def glRenderer(fov):
+    if fov.backend == 'cpu':
+        return 'cpu'
+    from OpenGL.GL import glGetString, GL_RENDERER
+    return glGetString(GL_RENDERER).decode()
+
+
+def writeResults(filename, metadata, rows):
+    if splitext(filename)[1].lower() == '.csv':
+        with open(filename, 'w', newline='') as f:
+            for key, value in metadata.items():
+                f.write('#{}: {}\n'.format(key, value))
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(filename, 'w') as f:
+            json.dump({'metadata': metadata, 'results': rows}, f, indent=1)
+
+
+def readResults(filename):
+    if splitext(filename)[1].lower() == '.csv':
+        with open(filename, newline='') as f:
+            rows = list(csv.DictReader(line for line in f if not line.startswith('#')))
+        for row in rows:
+            for field in ['width', 'height', 'gazeCount']:
+                row[field] = int(row[field])
+            row['medianMs'] = float(row['medianMs'])
+        return rows
+    with open(filename) as f:
+        return json.load(f)['results']
+
+
+def rowKey(row):
+    return (row['model'], row['width'], row['height'], row['gazeCount'], row['stage'], row['clock'])
+
+
+def compareResults(rows, baseline):
+    baseline = {rowKey(row): row for row in baseline}
+    print()
+    print('{:>8} {:>10} {:>6} {:>9} {:>4} {:>10} {:>10} {:>7}'.format('model', 'size', 'gazes', 'stage', 'clk', 'base ms', 'now ms', 'ratio'))
+    for row in rows:
+        base = baseline.get(rowKey(row))
+        if base is None:
+            continue
+        ratio = row['medianMs']/base['medianMs'] if base['medianMs'] > 0 else float('nan')
+        print('{:>8} {:>10} {:>6} {:>9} {:>4} {:>10.3f} {:>10.3f} {:>7.2f}'.format(row['model'], '{}x{}'.format(row['width'], row['height']), row['gazeCount'],
+                                                                               row['stage'], row['clock'], base['medianMs'], row['medianMs'], ratio))
+    print('ratio is now/base of the median times, above 1 is slower')
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hm:s:g:n:b:l:y:f:o:c:', ['help', 'models=', 'sizes=', 'gazeCounts=', 'repeats=', 'backend=',
+                                                                        'lodMode=', 'pyramid=', 'format=', 'output=', 'compare='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    models = ['classic', 'gp']
+    sizes = [(640, 480), (1920, 1080)]
+    gazeCounts = [1, 8]
+    repeats = 5
+    backend = 'auto'
+    lodMode = 'shader'
+    pyramid = 'mipmap'
+    imgFormat = 'png'
+    output = None
+    compare = None
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            usage()
+            sys.exit(2)
+        if o in ['-m', '--models']:
+            models = a.split(',')
+        if o in ['-s', '--sizes']:
+            sizes = [tuple(int(x) for x in s.split('x')) for s in a.split(',')]
+        if o in ['-g', '--gazeCounts']:
+            gazeCounts = [int(x) for x in a.split(',')]
+        if o in ['-n', '--repeats']:
+            repeats = int(a)
+        if o in ['-b', '--backend']:
+            backend = a
+        if o in ['-l', '--lodMode']:
+            lodMode = a
+        if o in ['-y', '--pyramid']:
+            pyramid = a
+        if o in ['-f', '--format']:
+            imgFormat = a
+        if o in ['-o', '--output']:
+            output = a
+        if o in ['-c', '--compare']:
+            compare = a
+
+    if backend != 'cpu':
+        gl_context.configurePlatform(backend)
+    renderers = {model: foveate.createRenderer(model, backend=backend, lodMode=lodMode, pyramid=pyramid, viewDist=0.6, pix2deg=32)
+                 for model in models}
+
+    rng = np.random.default_rng(0)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpDir:
+        outFilename = join(tmpDir, 'out.' + imgFormat)
+        print('{:>8} {:>10} {:>6} '.format('model', 'size', 'gazes') + ' '.join('{:>9}'.format(s) for s in foveate.STAGES + ['total']))
+        for width, height in sizes:
+            imgFilename = join(tmpDir, '{}x{}.jpg'.format(width, height))
+            Image.fromarray(makeImage(width, height, rng)).save(imgFilename, quality=90)
+            for gazeCount in gazeCounts:
+                gazePoints = np.column_stack([rng.uniform(0, height, gazeCount), rng.uniform(0, width, gazeCount)])
+                for model, fov in renderers.items():
+                    if fov.backend != 'cpu':
+                        #every renderer has its own context
+                        fov.context.makeCurrent()
+                    times = runConfig(fov, imgFilename, outFilename, gazePoints, repeats)
+                    for (stage, clock), values in times.items():
+                        rows.append(dict(model=model, width=width, height=height, gazeCount=gazeCount, stage=stage, clock=clock, **summarize(values)))
+
+                    #median per image (decode, upload, mipmap) or per frame (draw, readback, encode), gpu time if there is one
+                    medians = {}
+                    for row in rows[-len(times):]:
+                        if row['stage'] not in medians or row['clock'] == 'gpu':
+                            medians[row['stage']] = row['medianMs']
+                    print('{:>8} {:>10} {:>6} '.format(model, '{}x{}'.format(width, height), gazeCount) +
+                          ' '.join('{:>9.3f}'.format(medians[s]) if s in medians else '{:>9}'.format('-') for s in foveate.STAGES + ['total']))
+    print('median ms per image (decode, upload, mipmap), per frame (draw, readback, encode) and per repetition (total)')
+
+    if output is not None:
+        metadata = {'commit': gitCommit(), 'date': datetime.datetime.now().isoformat(timespec='seconds'), 'renderer': glRenderer(next(iter(renderers.values()))),
+                    'backend': backend, 'lodMode': lodMode, 'pyramid': pyramid, 'format': imgFormat, 'repeats': repeats,
+                    'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform()}
+        writeResults(output, metadata, rows)
+        print('results written to', output)
+
+    if compare is not None:
+        compareResults(rows, readResults(compare))
+
+    for fov in renderers.values():
+        if fov.backend != 'cpu':
+            fov.context.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#Benchmark of texture upload time per megapixel: per-pixel list(getdata()) conversion vs direct upload
+#vs upload into a pooled texture with immutable storage (glTexSubImage2D, no reallocation)
+#Usage: python3 benchmarks/bench_upload.py [-s 1024x768,1920x1080,3840x2160] [-n 3] [-m RGB]
+import sys
+import time
+import getopt
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'src'))
+
+from foveate import gl_context
+gl_context.configurePlatform()
+import numpy as np
+from OpenGL.GL import *
+from PIL import Image
+
+from foveate import Foveate_OGL
+from foveate.image_utils import imageToArray
+from foveate.gl_utils import ResourcePool, TEXTURE_FORMATS, setUnpackAlignment, setSwizzle, channelCount
+
+
+#upload path used before: one Python tuple per pixel
+def uploadLegacy(img):
+    width, height = img.size
+    img_data = np.array(list(img.getdata()), np.uint8)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0, GL_RGB, GL_UNSIGNED_BYTE, img_data)
+    glGenerateMipmap(GL_TEXTURE_2D)
+
+
+#direct upload of the decoded array into a texture reallocated by glTexImage2D for every image
+def uploadDirect(img):
+    img_data = imageToArray(img)
+    height, width = img_data.shape[:2]
+    channels = channelCount(img_data)
+    internalFormat, pixelFormat = TEXTURE_FORMATS[channels]
+    setUnpackAlignment(width, channels)
+    glTexImage2D(GL_TEXTURE_2D, 0, internalFormat, width, height, 0, pixelFormat, GL_UNSIGNED_BYTE, img_data)
+    setSwizzle(channels)
+    glGenerateMipmap(GL_TEXTURE_2D)
+
+
+def uploadPooled(pool):
+    return lambda img: pool.uploadTexture(imageToArray(img))
+
+
+def timeUpload(uploadFn, img, repeats):
+    times = []
+    for i in range(repeats):
+        glFinish()
+        start = time.perf_counter()
+        uploadFn(img)
+        glFinish()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hs:n:m:', ['help', 'sizes=', 'repeats=', 'mode='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(2)
+
+    sizes = [(1024, 768), (1920, 1080), (3840, 2160)]
+    repeats = 3
+    mode = 'RGB'
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            print('Usage: python3 benchmarks/bench_upload.py [-s WxH,WxH,...] [-n repeats] [-m RGB|RGBA|L|P]')
+            sys.exit(2)
+        if o in ['-s', '--sizes']:
+            sizes = [tuple(int(x) for x in s.split('x')) for s in a.split(',')]
+        if o in ['-n', '--repeats']:
+            repeats = int(a)
+        if o in ['-m', '--mode']:
+            mode = a
+
+    fov_ogl = Foveate_OGL(visualize=False)
+    texture = glGenTextures(1)
+    pool = ResourcePool()
+
+    rng = np.random.default_rng(0)
+    print('{:>12} {:>6} {:>14} {:>14} {:>14} {:>9}'.format('size', 'mode', 'legacy ms/MP', 'direct ms/MP', 'pooled ms/MP', 'speedup'))
+    for width, height in sizes:
+        img = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)).convert(mode)
+        megapixels = width*height/1e6
+        #the legacy path only ever handled RGB data correctly, so it is always given an RGB image
+        glBindTexture(GL_TEXTURE_2D, texture)
+        legacy = timeUpload(uploadLegacy, img.convert('RGB'), repeats)/megapixels
+        direct = timeUpload(uploadDirect, img, repeats)/megapixels
+        pooled = timeUpload(uploadPooled(pool), img, repeats)/megapixels
+        print('{:>12} {:>6} {:>14.2f} {:>14.2f} {:>14.2f} {:>8.1f}x'.format('{}x{}'.format(width, height), mode, legacy*1e3, direct*1e3, pooled*1e3, legacy/pooled))
+
+    fov_ogl.context.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#Compare the CPU renderers (foveate/cpu.py) with reference outputs and report per-image timing
+#reference outputs are rendered with OpenGL if it is available, otherwise the default renders in examples/ are used
+#exits with status 1 if the mean absolute difference of any image exceeds the tolerance
+#Usage: python3 benchmarks/compare_backends.py [-r gl|examples] [-t tolerance]
+import sys
+import time
+import getopt
+from os.path import abspath, dirname, join
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, join(ROOT, 'src'))
+
+import numpy as np
+from PIL import Image
+
+from foveate import Foveate_CPU, Foveate_GP_CPU
+
+#(model, image, default render in examples/)
+CASES = [('classic', 'Yarbus_scaled.jpg', 'Yarbus_scaled_default.jpg'),
+         ('gp', 'Yarbus_Shishkin.jpg', 'Yarbus_Shishkin_gp_default.jpg')]
+
+#default tolerances (mean absolute difference in 8-bit levels), the examples are JPEG compressed
+TOLERANCES = {'gl': 2.0, 'examples': 8.0}
+
+
+def createRenderer(model, backend):
+    if backend == 'cpu':
+        if model == 'classic':
+            return Foveate_CPU()
+        return Foveate_GP_CPU(viewDist=0.6, pix2deg=32)
+
+    from foveate import gl_context
+    gl_context.configurePlatform()
+    if model == 'classic':
+        from foveate import Foveate_OGL
+        return Foveate_OGL(visualize=False)
+    from foveate import Foveate_GP_OGL
+    return Foveate_GP_OGL(viewDist=0.6, pix2deg=32, visualize=False)
+
+
+def render(model, backend, imgFilename):
+    fov = createRenderer(model, backend)
+    fov.loadImgFromFile(imgFilename=imgFilename)
+    start = time.perf_counter()
+    #foveate_batch reads the result back into an array for both backends
+    output = fov.foveate_batch(imgFilename, [fov.gazePosition])[0]
+    elapsed = time.perf_counter() - start
+    if backend != 'cpu':
+        fov.context.terminate()
+    return output, elapsed
+
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hr:t:', ['help', 'reference=', 'tolerance='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        sys.exit(2)
+
+    reference = None
+    tolerance = None
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            print('Usage: python3 benchmarks/compare_backends.py [-r gl|examples] [-t tolerance]')
+            sys.exit(2)
+        if o in ['-r', '--reference']:
+            reference = a
+        if o in ['-t', '--tolerance']:
+            tolerance = float(a)
+
+    if reference is None:
+        try:
+            render(CASES[0][0], 'gl', join(ROOT, 'images', CASES[0][1]))
+            reference = 'gl'
+        except Exception as err:
+            print('OpenGL is not available ({}), comparing with the renders in examples/'.format(err))
+            reference = 'examples'
+    if tolerance is None:
+        tolerance = TOLERANCES[reference]
+
+    failed = False
+    print('{:>8} {:>22} {:>10} {:>10} {:>8} {:>6}'.format('model', 'image', 'cpu s', 'mean diff', 'max diff', 'result'))
+    for model, imgName, exampleName in CASES:
+        imgFilename = join(ROOT, 'images', imgName)
+        output, elapsed = render(model, 'cpu', imgFilename)
+        if reference == 'gl':
+            expected, _ = render(model, 'gl', imgFilename)
+        else:
+            expected = np.asarray(Image.open(join(ROOT, 'examples', exampleName)).convert('RGB'))
+
+        diff = np.abs(output.astype(np.int16) - expected.astype(np.int16))
+        ok = diff.mean() <= tolerance
+        failed = failed or not ok
+        print('{:>8} {:>22} {:>10.2f} {:>10.3f} {:>8d} {:>6}'.format(model, imgName, elapsed, diff.mean(), diff.max(), 'ok' if ok else 'FAIL'))
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
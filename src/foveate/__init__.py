@@ -0,0 +1,40 @@
+#Foveation transforms of images with OpenGL shaders or numpy
+#importing the package does not import OpenGL: the OpenGL renderers are loaded on first access (e.g. foveate.Foveate_OGL)
+#or by createRenderer, which selects the PyOpenGL platform of the requested backend first
+from . import gl_context
+from .models import FoveationModel, ClassicModel, GeislerPerryModel, MODELS, createModel, computeDotPitch
+from .cpu import CPURenderer, Foveate_CPU, Foveate_GP_CPU
+from .pyramid import PYRAMIDS, gaussianPyramid
+from .lodmap import lodMap, eccentricityMap, gazeDistance
+from .codec import encodeFoveated, decodeFoveated
+from .dataset import FoveationTransform, FoveatedLoader
+from .profiling import STAGES, Profiler
+from .cache import PyramidCache
+from .sinks import createSink, EncoderPool
+
+#names provided by foveate.renderer, which imports OpenGL
+GL_NAMES = ['GLRenderer', 'Foveate_OGL', 'Foveate_GP_OGL']
+
+
+def __getattr__(name):
+    if name == 'TiledRenderer':
+        from . import tiled
+        return tiled.TiledRenderer
+    if name in GL_NAMES:
+        from . import renderer
+        return getattr(renderer, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+#create a renderer for model (a name from MODELS or a FoveationModel) with backend 'cpu' or an OpenGL backend
+#(auto, glfw, egl, osmesa) and a pyramid from PYRAMIDS, parameters are passed to the model (e.g. gazeRadius, viewDist, pix2deg)
+#cache is an optional PyramidCache or its directory, outputSize (width, height) renders at that resolution
+def createRenderer(model='classic', backend='auto', gazePosition=(-1, -1), visualize=False, lodMode='shader', pyramid='mipmap', cache=None,
+                   outputSize=None, **parameters):
+    model = createModel(model, **parameters)
+    if backend == 'cpu':
+        return CPURenderer(model, gazePosition=gazePosition, visualize=visualize, pyramid=pyramid, cache=cache, outputSize=outputSize)
+    gl_context.configurePlatform(backend)
+    from .renderer import GLRenderer
+    return GLRenderer(model, gazePosition=gazePosition, visualize=visualize, backend=backend, lodMode=lodMode, pyramid=pyramid, cache=cache,
+                      outputSize=outputSize)
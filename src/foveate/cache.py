@@ -0,0 +1,149 @@
+#on-disk cache of decoded images with their pyramid levels, shared by runs of the renderers (no OpenGL dependency)
+#an entry is keyed by the content hash of the image (file bytes or pixels) and the kind of pyramid, and stored as
+#one raw file: a header followed by the uint8 pixels of every level from full size down to 1x1, level sizes are those
+#of glGenerateMipmap, entries are memory mapped on load, so levels can be uploaded to the texture without a copy
+#entries are written to a temporary file and renamed, so several processes can share a directory,
+#least recently used entries (by modification time, which is updated on every hit) are deleted above maxBytes
+import os
+import struct
+import hashlib
+import tempfile
+import numpy as np
+
+#magic, version, width, height, channels, number of levels
+HEADER = struct.Struct('<4sIIIII')
+MAGIC = b'FVPY'
+VERSION = 1
+
+#default size cap of a PyramidCache
+CACHE_MAX_BYTES = 4*2**30
+
+
+#content hash of an image file, read in blocks without decoding it
+def fileDigest(filename):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+#content hash of a uint8 numpy array (shape included) or a PIL image (mode, size and pixels)
+def arrayDigest(img):
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(img, np.ndarray):
+        digest.update(repr((img.shape, img.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(img).data)
+    else:
+        digest.update(repr((img.mode, img.size)).encode())
+        digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def levelShapes(width, height, channels, count):
+    shapes = []
+    for level in range(count):
+        shape = (max(1, height >> level), max(1, width >> level))
+        shapes.append(shape if channels == 1 else shape + (channels,))
+    return shapes
+
+
+class PyramidCache:
+    def __init__(self, directory, maxBytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def stats(self):
+        entries = self.entries()
+        return {'entries': len(entries), 'bytes': sum(size for _, _, size in entries), 'maxBytes': self.maxBytes,
+                'hits': self.hits, 'misses': self.misses, 'stores': self.stores, 'evictions': self.evictions}
+
+    #file name of the entry of an image digest (fileDigest or arrayDigest) and a pyramid kind, e.g. 'mipmap'
+    #with the name of the OpenGL renderer, as glGenerateMipmap differs between drivers
+    def path(self, digest, kind):
+        name = hashlib.blake2b('{}/{}'.format(digest, kind).encode(), digest_size=20).hexdigest()
+        return os.path.join(self.directory, name + '.pyr')
+
+    #(modification time, path, bytes) of all entries, oldest first
+    def entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pyr'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((info.st_mtime, path, info.st_size))
+        return sorted(entries)
+
+    #levels of an entry as read-only memory mapped arrays, None if it is not cached
+    def load(self, digest, kind):
+        path = self.path(digest, kind)
+        try:
+            data = np.memmap(path, np.uint8, 'r')
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+
+        magic, version, width, height, channels, count = HEADER.unpack(bytes(data[:HEADER.size]))
+        if magic != MAGIC or version != VERSION:
+            self.misses += 1
+            return None
+        levels = []
+        offset = HEADER.size
+        for shape in levelShapes(width, height, channels, count):
+            size = int(np.prod(shape))
+            levels.append(data[offset:offset + size].reshape(shape))
+            offset += size
+        self.hits += 1
+        return levels
+
+    #store the levels (HxW or HxWxC uint8 arrays from full size down) of an image, then evict old entries
+    def store(self, digest, kind, levels):
+        height, width = levels[0].shape[:2]
+        channels = 1 if levels[0].ndim == 2 else levels[0].shape[2]
+        if [level.shape for level in levels] != levelShapes(width, height, channels, len(levels)):
+            raise ValueError('Level sizes do not halve from {}x{}'.format(width, height))
+
+        fd, tmpPath = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            os.chmod(tmpPath, 0o644)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, width, height, channels, len(levels)))
+                for level in levels:
+                    f.write(np.ascontiguousarray(level, np.uint8).data)
+            os.replace(tmpPath, self.path(digest, kind))
+        except BaseException:
+            os.remove(tmpPath)
+            raise
+        self.stores += 1
+        self.evict()
+
+    #delete least recently used entries until the cache fits into maxBytes
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries[:-1]:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, path, _ in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
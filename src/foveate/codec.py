@@ -0,0 +1,163 @@
+#foveated multiresolution coding of images, as in Geisler & Perry's low-bandwidth system (no OpenGL dependency)
+#the encoder computes the level of detail of every pixel (lodmap.lodMap, the same map as the shaders) and keeps,
+#of each pyramid level, only the blocks of texels that trilinear sampling at that level of detail reads:
+#the fovea needs full resolution blocks, the periphery only blocks of the coarse levels, which are 4x smaller per level
+#the kept blocks of a level are packed into one image and compressed with JPEG or PNG, the decoder unpacks them into
+#sparse pyramid levels and samples them like the CPU renderer (cpu.samplePyramid), with PNG it reproduces the
+#CPU render of the image exactly
+#a container is HEADER, a JSON description (size, model, gaze, pyramid, block size, format and per level the byte
+#counts), then for every level from full size to 1x1 its block mask (np.packbits, row major) and its packed blocks
+import io
+import json
+import math
+import struct
+import numpy as np
+from PIL import Image
+from .image_utils import imageToArray, arrayToRGB
+from .models import createModel, fixationArrays
+from .lodmap import lodMap
+from .pyramid import checkPyramid, gaussianPyramid, GAUSSIAN_PYRAMIDS
+from .jpeg import isDraftable, draftPyramid
+from .cpu import buildPyramid, samplePyramid
+
+#magic, version, length of the JSON description
+HEADER = struct.Struct('<4sII')
+MAGIC = b'FVMR'
+VERSION = 1
+
+#compression of the packed blocks
+CODEC_FORMATS = ['jpg', 'png']
+
+#side of the blocks in texels, 16 is the MCU of JPEG with chroma subsampling, so packing does not mix blocks in an MCU
+BLOCK_SIZE = 16
+
+
+#first and last texel (wrapped, GL_REPEAT) of a level of size texels read along one axis at the pixel coordinates
+#coords of an image of imageSize pixels, computed as in cpu.sampleLevel and sampleLevelCubic
+def texelRange(coords, imageSize, size, cubic):
+    first = np.floor(((coords + 0.5)/imageSize)*size - 0.5).astype(np.intp)
+    if cubic:
+        return (first - 1) % size, (first + 2) % size
+    return first % size, (first + 1) % size
+
+
+#block masks (one bool array per level, blocks of blockSize texels) of the texels that cpu.samplePyramid reads
+#with the per-pixel level of detail lod: every pixel reads level floor(lod) and the next coarser one
+def neededBlocks(lod, shapes, blockSize=BLOCK_SIZE, cubic=False):
+    height, width = lod.shape
+    maxLevel = len(shapes) - 1
+    base = np.floor(lod).astype(np.intp)
+    masks = []
+    for d, (levelHeight, levelWidth) in enumerate(shapes):
+        mask = np.zeros((-(-levelHeight//blockSize), -(-levelWidth//blockSize)), bool)
+        ys, xs = np.nonzero((base == d) | (base == d - 1) if d < maxLevel else base >= d - 1)
+        if len(ys) > 0:
+            #a filter spans at most 4 texels, so its blocks are those of its first and last texel
+            rows = texelRange(ys, height, levelHeight, cubic and d > 0)
+            cols = texelRange(xs, width, levelWidth, cubic and d > 0)
+            for row in rows:
+                for col in cols:
+                    mask[row//blockSize, col//blockSize] = True
+        masks.append(mask)
+    return masks
+
+
+#kept blocks of a level (rows, cols from np.nonzero of its mask) side by side in a grid of ceil(sqrt(n)) columns,
+#blocks at the right and bottom edges of the level are padded by repeating their last texels
+def packBlocks(level, rows, cols, blockSize):
+    padded = np.pad(level, ((0, -level.shape[0] % blockSize), (0, -level.shape[1] % blockSize), (0, 0)), mode='edge')
+    blocks = padded.reshape(padded.shape[0]//blockSize, blockSize, padded.shape[1]//blockSize, blockSize, 3)[rows, :, cols]
+    gridCols = math.ceil(math.sqrt(len(blocks)))
+    gridRows = -(-len(blocks)//gridCols)
+    grid = np.zeros((gridRows*gridCols, blockSize, blockSize, 3), np.uint8)
+    grid[:len(blocks)] = blocks
+    return grid.reshape(gridRows, gridCols, blockSize, blockSize, 3).transpose(0, 2, 1, 3, 4).reshape(gridRows*blockSize, gridCols*blockSize, 3)
+
+
+def unpackBlocks(grid, count, blockSize):
+    gridRows, gridCols = grid.shape[0]//blockSize, grid.shape[1]//blockSize
+    return grid.reshape(gridRows, blockSize, gridCols, blockSize, 3).transpose(0, 2, 1, 3, 4).reshape(-1, blockSize, blockSize, 3)[:count]
+
+
+def compressImage(data, fmt, quality):
+    stream = io.BytesIO()
+    if fmt == 'jpg':
+        Image.fromarray(data).save(stream, format='JPEG', quality=quality)
+    else:
+        Image.fromarray(data).save(stream, format='PNG', optimize=True)
+    return stream.getvalue()
+
+
+#encode an image (PIL image or uint8 array) for a gaze configuration into a container (bytes), model is a FoveationModel
+#or a name from MODELS created with parameters (e.g. gazeRadius, viewDist, pix2deg), gazePosition, scales, weights and
+#mode are those of lodMap (default: the image center), pyramid is mipmap (as built by the CPU backend), gaussian,
+#laplacian or draft (levels of a PIL image of a JPEG file decoded at reduced scale), fmt is jpg (lossy, quality 1-95) or png (lossless)
+def encodeFoveated(img, model='classic', gazePosition=None, scales=None, weights=None, mode='min', pyramid='mipmap',
+                   blockSize=BLOCK_SIZE, fmt='jpg', quality=75, **parameters):
+    checkPyramid(pyramid)
+    if fmt not in CODEC_FORMATS:
+        raise ValueError('Unknown format {!r}, expected one of {}'.format(fmt, ', '.join(CODEC_FORMATS)))
+    if blockSize < 4:
+        raise ValueError('Blocks must be at least 4 texels wide, the width of the cubic filter')
+    if pyramid == 'draft' and isDraftable(img):
+        levels = [arrayToRGB(level) for level in draftPyramid(img.filename)]
+    else:
+        img_data = arrayToRGB(imageToArray(img))
+        levels = gaussianPyramid(img_data) if pyramid in GAUSSIAN_PYRAMIDS else buildPyramid(img_data)
+    height, width = levels[0].shape[:2]
+    model = createModel(model, **parameters)
+    points, scales, weights = fixationArrays((height/2, width/2) if gazePosition is None else gazePosition, scales, weights)
+
+    lod = lodMap(model, width, height, points, scales, weights, mode=mode, exact=True)
+    masks = neededBlocks(lod, [level.shape[:2] for level in levels], blockSize, cubic=pyramid == 'laplacian')
+
+    payload = []
+    description = {'width': width, 'height': height, 'pyramid': pyramid, 'blockSize': blockSize, 'format': fmt, 'mode': mode,
+                   'model': model.name, 'parameters': {name: getattr(model, name) for name in model.parameters},
+                   'gaze': points.tolist(), 'scales': scales.tolist(), 'weights': weights.tolist(), 'levels': []}
+    for level, mask in zip(levels, masks):
+        rows, cols = np.nonzero(mask)
+        maskBytes = np.packbits(mask).tobytes()
+        data = compressImage(packBlocks(level, rows, cols, blockSize), fmt, quality) if len(rows) > 0 else b''
+        description['levels'].append({'blocks': len(rows), 'maskBytes': len(maskBytes), 'dataBytes': len(data)})
+        payload += [maskBytes, data]
+
+    header = json.dumps(description, separators=(',', ':')).encode()
+    return b''.join([HEADER.pack(MAGIC, VERSION, len(header)), header] + payload)
+
+
+#JSON description of a container and the offset of its first level
+def readDescription(data):
+    magic, version, length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not a foveated multiresolution container (version {})'.format(VERSION))
+    return json.loads(bytes(data[HEADER.size:HEADER.size + length])), HEADER.size + length
+
+
+#sparse pyramid of a container, texels of the blocks that were not kept are 0
+def decodePyramid(data):
+    description, offset = readDescription(data)
+    blockSize = description['blockSize']
+    width, height = description['width'], description['height']
+    levels = []
+    for d, entry in enumerate(description['levels']):
+        shape = (max(1, height >> d), max(1, width >> d))
+        gridShape = (-(-shape[0]//blockSize), -(-shape[1]//blockSize))
+        mask = np.unpackbits(np.frombuffer(data, np.uint8, entry['maskBytes'], offset), count=gridShape[0]*gridShape[1]).astype(bool)
+        offset += entry['maskBytes']
+        padded = np.zeros((gridShape[0], gridShape[1], blockSize, blockSize, 3), np.uint8)
+        if entry['blocks'] > 0:
+            grid = np.asarray(Image.open(io.BytesIO(data[offset:offset + entry['dataBytes']])).convert('RGB'))
+            rows, cols = np.nonzero(mask.reshape(gridShape))
+            padded[rows, cols] = unpackBlocks(grid, entry['blocks'], blockSize)
+        offset += entry['dataBytes']
+        levels.append(padded.transpose(0, 2, 1, 3, 4).reshape(gridShape[0]*blockSize, gridShape[1]*blockSize, 3)[:shape[0], :shape[1]])
+    return description, levels
+
+
+#reconstruct the foveated image (H x W x 3 uint8) of a container made by encodeFoveated
+def decodeFoveated(data):
+    description, levels = decodePyramid(data)
+    lod = lodMap(createModel(description['model'], **description['parameters']), description['width'], description['height'],
+                 description['gaze'], description['scales'], description['weights'], mode=description['mode'], exact=True)
+    return samplePyramid(levels, lod, cubic=description['pyramid'] == 'laplacian')
@@ -0,0 +1,361 @@
+#CPU implementation of the foveation models in numpy, for machines without a usable OpenGL
+#it reproduces the fragment shader of the OpenGL renderer: a mip pyramid is built like glGenerateMipmap and
+#every output pixel is sampled with trilinear filtering (GL_LINEAR_MIPMAP_LINEAR, GL_REPEAT) at the level of detail
+#given by the model, without Python loops over pixels
+import numpy as np
+from PIL import Image
+from .image_utils import imageSize, imageToArray, arrayToRGB, writeImage
+from .models import ClassicModel, GeislerPerryModel, FIXATION_MODES, fixationArrays
+from .lodmap import gazeDistance, lodMap, radialProfile, checkOutputSize, outputScale, minificationLod
+from .incremental import IncrementalState, LOD_TOLERANCE
+from .pyramid import checkPyramid, gaussianPyramid, GAUSSIAN_PYRAMIDS
+from .jpeg import isDraftable, draftPyramid
+from .profiling import Profiler, NULL_STAGE
+from .cache import PyramidCache, fileDigest, arrayDigest
+
+
+#linearly resample data along one axis to newSize samples taken at the centers of the new texels
+def resampleAxis(data, newSize, axis):
+    size = data.shape[axis]
+    coords = (np.arange(newSize, dtype=np.float32) + 0.5)*(size/newSize) - 0.5
+    i0 = np.floor(coords)
+    weights = (coords - i0).reshape([-1 if a == axis else 1 for a in range(data.ndim)])
+    i0 = np.clip(i0.astype(np.intp), 0, size - 1)
+    i1 = np.minimum(i0 + 1, size - 1)
+    return np.take(data, i0, axis=axis)*(1 - weights) + np.take(data, i1, axis=axis)*weights
+
+
+#mip pyramid of a HxWxC uint8 image down to 1x1, each level is half the size of the previous one (rounded down)
+#and is sampled bilinearly from it (a 2x2 box filter for even sizes), levels are stored as 8-bit like GL_RGB8
+def buildPyramid(img_data):
+    pyramid = [img_data]
+    while max(pyramid[-1].shape[:2]) > 1:
+        level = pyramid[-1].astype(np.float32)
+        height, width = level.shape[:2]
+        level = resampleAxis(level, max(1, height//2), axis=0)
+        level = resampleAxis(level, max(1, width//2), axis=1)
+        pyramid.append(np.floor(level + 0.5).astype(np.uint8))
+    return pyramid
+
+
+#bilinear sample (GL_LINEAR, GL_REPEAT) of a pyramid level at normalized texture coordinates u, v (1D arrays)
+def sampleLevel(level, u, v):
+    height, width = level.shape[:2]
+    s = u*width - 0.5
+    t = v*height - 0.5
+    x0 = np.floor(s)
+    y0 = np.floor(t)
+    fx = (s - x0)[:, np.newaxis]
+    fy = (t - y0)[:, np.newaxis]
+    x0 = x0.astype(np.intp) % width
+    y0 = y0.astype(np.intp) % height
+    x1 = (x0 + 1) % width
+    y1 = (y0 + 1) % height
+    top = level[y0, x0]*(1 - fx) + level[y0, x1]*fx
+    bottom = level[y1, x0]*(1 - fx) + level[y1, x1]*fx
+    return top*(1 - fy) + bottom*fy
+
+
+#cubic B-spline sample (GL_REPEAT) of a pyramid level at normalized texture coordinates u, v (1D arrays)
+def sampleLevelCubic(level, u, v):
+    height, width = level.shape[:2]
+    axes = []
+    for size, coords in [(width, u), (height, v)]:
+        p = coords*size - 0.5
+        i = np.floor(p)
+        f = p - i
+        weights = [(1 - f)**3/6, (4 - 6*f**2 + 3*f**3)/6, (1 + 3*f + 3*f**2 - 3*f**3)/6, f**3/6]
+        indices = [(i.astype(np.intp) + k - 1) % size for k in range(4)]
+        axes.append((weights, indices))
+    (xWeights, xs), (yWeights, ys) = axes
+
+    output = 0
+    for yw, y in zip(yWeights, ys):
+        for xw, x in zip(xWeights, xs):
+            output = output + level[y, x]*(yw*xw)[:, np.newaxis]
+    return output
+
+
+#sample the pyramid at every pixel of the output with a per-pixel level of detail (HxW array of the image size, or of
+#the output size when rendering at another resolution), equivalent to textureLod(imageTex, outTexCoords, lod) with GL_LINEAR_MIPMAP_LINEAR filtering,
+#or to samplePyramid of the 'laplacian' pyramid in the shader if cubic is True
+#with region (row0, row1, col0, col1), only the pixels in that box are sampled and returned
+def samplePyramid(pyramid, lod, cubic=False, region=None):
+    height, width = lod.shape
+    maxLevel = len(pyramid) - 1
+    if region is not None:
+        row0, row1, col0, col1 = region
+        lod = lod[row0:row1, col0:col1]
+    lod = np.clip(np.nan_to_num(lod, nan=0.0, neginf=0.0, posinf=maxLevel), 0, maxLevel)
+    base = np.floor(lod).astype(np.intp)
+    frac = lod - base
+
+    output = np.empty(lod.shape + pyramid[0].shape[2:], np.float32)
+    for d in range(maxLevel + 1):
+        ys, xs = np.nonzero(base == d)
+        if len(ys) == 0:
+            continue
+        if region is None:
+            u = (xs + 0.5)/width
+            v = (ys + 0.5)/height
+        else:
+            u = (xs + col0 + 0.5)/width
+            v = (ys + row0 + 0.5)/height
+        color = sampleLevelCubic(pyramid[d], u, v) if cubic and d > 0 else sampleLevel(pyramid[d], u, v)
+        if d < maxLevel:
+            f = frac[ys, xs][:, np.newaxis]
+            coarse = sampleLevelCubic(pyramid[d + 1], u, v) if cubic else sampleLevel(pyramid[d + 1], u, v)
+            color = color*(1 - f) + coarse*f
+        output[ys, xs] = color
+    return np.floor(output + 0.5).astype(np.uint8)
+
+
+#CPU renderer of any foveation model, with the same interface as GLRenderer
+class CPURenderer:
+    def __init__(self, model, gazePosition=(-1, -1), visualize = False, pyramid = 'mipmap', cache = None, outputSize = None):
+        if visualize:
+            raise ValueError('The CPU backend cannot show images, use visualize=False')
+        checkPyramid(pyramid)
+        self.model = model
+        self.outputSize = checkOutputSize(outputSize)
+        self.pyramidType = pyramid
+        self.cache = PyramidCache(cache) if isinstance(cache, str) else cache
+        self.imgDigest = None
+        self.gazePosition = gazePosition
+        self.fixations = fixationArrays(gazePosition)
+        self.fixationMode = 'min'
+        self.visualize = visualize
+        self.backend = 'cpu'
+        self.output = None
+        self.profiler = None
+        self.sink = None
+        self.incremental = None
+
+    #same as GLRenderer.setSink
+    def setSink(self, sink):
+        self.sink = sink
+
+    #same as GLRenderer.setInstrumentation, all stages are timed on the CPU and there is no upload or readback
+    def setInstrumentation(self, callback):
+        self.profiler = None if callback is None else Profiler(callback)
+
+    def flushInstrumentation(self):
+        pass
+
+    def profileStage(self, name):
+        return NULL_STAGE if self.profiler is None else self.profiler.stage(name)
+
+    #load image from array (PIL image or HxW, HxWx3, HxWx4 uint8 numpy array)
+    def loadImgFromArray(self, img = None):
+        self.img = img if isinstance(img, np.ndarray) else img.copy()
+        self.imgDigest = None if self.cache is None else arrayDigest(self.img)
+        self.loadImg()
+
+    #load image from file
+    def loadImgFromFile(self, imgFilename='images/Yarbus_scaled.jpg'):
+        self.img = Image.open(imgFilename)
+        self.imgDigest = None if self.cache is None else fileDigest(imgFilename)
+        self.loadImg()
+
+    def loadImg(self):
+        self.img_width, self.img_height = imageSize(self.img)
+        if self.profiler is not None:
+            self.profiler.setImage(getattr(self.img, 'filename', None), self.img_width, self.img_height)
+        self.model.configure(self.img_width, self.img_height)
+        self.updateTexture()
+        self.out_width, self.out_height = self.outputSize or (self.img_width, self.img_height)
+        if self.incremental is not None:
+            self.incremental.reset()
+        if np.ndim(self.gazePosition) == 1 and self.gazePosition[0] < 0:
+            self.moveGaze((self.img_height/2, self.img_width/2))
+        else:
+            self.moveGaze(self.gazePosition, *self.fixations[1:])
+
+    #build the mip pyramid, the CPU counterpart of uploading the texture and generating mipmaps
+    #with a cache, the pyramid of an image seen before is memory mapped from it instead
+    def updateTexture(self):
+        cacheKind = 'numpy ' + ('gaussian' if self.pyramidType in GAUSSIAN_PYRAMIDS else self.pyramidType)
+        if self.imgDigest is not None:
+            self.pyramid = self.cache.load(self.imgDigest, cacheKind)
+            if self.pyramid is not None:
+                self.img_height, self.img_width = self.pyramid[0].shape[:2]
+                return
+
+        if self.pyramidType == 'draft' and isDraftable(self.img):
+            with self.profileStage('decode'):
+                self.pyramid = [arrayToRGB(level) for level in draftPyramid(self.img.filename)]
+            self.img_height, self.img_width = self.pyramid[0].shape[:2]
+        else:
+            with self.profileStage('decode'):
+                img_data = imageToArray(self.img)
+            self.img_height, self.img_width = img_data.shape[:2]
+            with self.profileStage('mipmap'):
+                self.pyramid = self.buildPyramid(arrayToRGB(img_data))
+        if self.imgDigest is not None:
+            self.cache.store(self.imgDigest, cacheKind, self.pyramid)
+
+    def buildPyramid(self, img_data):
+        return gaussianPyramid(img_data) if self.pyramidType in GAUSSIAN_PYRAMIDS else buildPyramid(img_data)
+
+    #same as GLRenderer.setOutputSize
+    def setOutputSize(self, outputSize):
+        self.outputSize = checkOutputSize(outputSize)
+        if hasattr(self, 'pyramid'):
+            self.out_width, self.out_height = self.outputSize or (self.img_width, self.img_height)
+        self.output = None
+        if self.incremental is not None:
+            self.incremental.reset()
+
+    #same as GLRenderer.setIncremental, only the changed box of the output is sampled again
+    def setIncremental(self, enabled=True, lodTolerance=LOD_TOLERANCE, gazeThreshold=0):
+        self.incremental = IncrementalState(lodTolerance, gazeThreshold) if enabled else None
+
+    #same as GLRenderer.moveGaze
+    def moveGaze(self, newGazePosition, scales=None, weights=None):
+        self.gazePosition = newGazePosition
+        self.fixations = fixationArrays(newGazePosition, scales, weights)
+
+    #same as GLRenderer.setFixationMode
+    def setFixationMode(self, mode):
+        if mode not in FIXATION_MODES:
+            raise ValueError('Unknown fixation mode {!r}, expected one of {}'.format(mode, ', '.join(FIXATION_MODES)))
+        self.fixationMode = mode
+
+    #same as GLRenderer.lodMap, run samples the pyramid with the exact map
+    def lodMap(self, exact=None):
+        return lodMap(self.model, self.img_width, self.img_height, *self.fixations, mode=self.fixationMode, exact=exact, outputSize=self.outputSize)
+
+    def run(self):
+        cubic = self.pyramidType == 'laplacian'
+        with self.profileStage('draw'):
+            if self.incremental is None:
+                self.output = samplePyramid(self.pyramid, self.lodMap(exact=True), cubic=cubic)
+                return self.output
+            region = self.incremental.update(self.fixations, (self.model.key(), self.fixationMode), lambda maxDistance: radialProfile(self.model, maxDistance),
+                                             self.out_width, self.out_height, outputScale(self.img_width, self.img_height, self.outputSize))
+            self.incremental.takeDirty()
+            if region is not None:
+                if self.output is None or self.output.shape[:2] != (self.out_height, self.out_width):
+                    self.output = np.empty((self.out_height, self.out_width, 3), np.uint8)
+                row0, row1, col0, col1 = region
+                self.output[row0:row1, col0:col1] = samplePyramid(self.pyramid, self.lodMap(exact=True), cubic=cubic, region=region)
+        return self.output
+
+    #same as GLRenderer.renderInto
+    def renderInto(self, out):
+        if out.shape != (self.out_height, self.out_width, 3) or out.dtype != np.uint8:
+            raise ValueError('Expected a {}x{}x3 uint8 array, got {} {}'.format(self.out_height, self.out_width, out.dtype, out.shape))
+        with self.profileStage('draw'):
+            out[:] = samplePyramid(self.pyramid, self.lodMap(exact=True), cubic=self.pyramidType == 'laplacian')
+        return out
+
+    #same as GLRenderer.readImage
+    def readImage(self):
+        return self.output
+
+    def saveImage(self, filename):
+        with self.profileStage('encode'):
+            if self.sink is None:
+                writeImage(filename, self.output)
+            else:
+                self.sink.write(filename, self.output)
+
+    #rendering on the CPU is synchronous, so images are passed to writer(filename, frame) immediately
+    def saveImageAsync(self, filename, writer=None):
+        if writer is None:
+            self.saveImage(filename)
+            return
+        with self.profileStage('encode'):
+            writer(filename, self.output)
+
+    def flushImages(self, writer=None):
+        if self.sink is not None:
+            self.sink.flush()
+
+    #same as GLRenderer.foveate_batch
+    def foveate_batch(self, image, gaze_points, pointParameters=None):
+        if isinstance(image, str):
+            self.loadImgFromFile(imgFilename=image)
+        else:
+            self.loadImgFromArray(image)
+
+        gaze_points = np.asarray(gaze_points, dtype=np.float32).reshape(-1, 2)
+        pointParameters = {name: np.broadcast_to(np.asarray(values, np.float32), (len(gaze_points),))
+                           for name, values in (pointParameters or {}).items()}
+        saved = {name: getattr(self.model, name) for name in pointParameters}
+        gazePosition = self.gazePosition
+        fixations = self.fixations
+
+        output = np.empty((len(gaze_points), self.out_height, self.out_width, 3), np.uint8)
+        for i in range(len(gaze_points)):
+            for name, values in pointParameters.items():
+                setattr(self.model, name, float(values[i]))
+            self.moveGaze(gaze_points[i])
+            output[i] = self.run()
+
+        for name, value in saved.items():
+            setattr(self.model, name, value)
+        self.moveGaze(gazePosition, *fixations[1:])
+        return output
+
+    #same as GLRenderer.foveate_array, images are foveated one after another
+    def foveate_array(self, images, gaze_points=None, layers=None):
+        output = None
+        for i, img in enumerate(images):
+            with self.profileStage('decode'):
+                img_data = imageToArray(Image.open(img) if isinstance(img, str) else img)
+            height, width = img_data.shape[:2]
+            if output is None:
+                size = (width, height)
+                outWidth, outHeight = self.outputSize or size
+                output = np.empty((len(images), outHeight, outWidth, 3), np.uint8)
+                self.model.configure(width, height)
+                if self.profiler is not None:
+                    self.profiler.setImage(None, width, height)
+            elif (width, height) != size:
+                raise ValueError('Image {} is {}x{}, expected {}x{}'.format(i, width, height, *size))
+            gazePosition = (height/2, width/2) if gaze_points is None else gaze_points[i]
+            with self.profileStage('mipmap'):
+                pyramid = self.buildPyramid(arrayToRGB(img_data))
+            with self.profileStage('draw'):
+                lod = self.model.radialLod(gazeDistance(width, height, gazePosition, self.outputSize))
+                lod = np.fmax(lod, np.float32(minificationLod(width, height, self.outputSize)))
+                output[i] = samplePyramid(pyramid, lod, cubic=self.pyramidType == 'laplacian')
+
+        if hasattr(self, 'pyramid'):
+            self.model.configure(self.img_width, self.img_height)
+            if self.profiler is not None:
+                self.profiler.setImage(getattr(self.img, 'filename', None), self.img_width, self.img_height)
+        return output
+
+
+#classic model on the CPU, same interface as Foveate_OGL
+class Foveate_CPU(CPURenderer):
+    def __init__(self, gazeRadius=25, gazePosition=(-1, -1), visualize = False, pyramid = 'mipmap', cache = None, outputSize = None):
+        CPURenderer.__init__(self, ClassicModel(gazeRadius), gazePosition=gazePosition, visualize=visualize, pyramid=pyramid, cache=cache,
+                             outputSize=outputSize)
+
+    @property
+    def gazeRadius(self):
+        return self.model.gazeRadius
+
+    def updateGaze(self, newGazeRadius, newGazePosition, weights=None):
+        if np.ndim(newGazeRadius) > 0:
+            self.moveGaze(newGazePosition, np.asarray(newGazeRadius, np.float32)/np.float32(self.model.gazeRadius), weights)
+            return
+        self.model.gazeRadius = newGazeRadius
+        self.moveGaze(newGazePosition, weights=weights)
+
+    def foveate_batch(self, image, gaze_points, gaze_radii=None):
+        return CPURenderer.foveate_batch(self, image, gaze_points, None if gaze_radii is None else {'gazeRadius': gaze_radii})
+
+
+#Geisler & Perry model on the CPU, same interface as Foveate_GP_OGL
+class Foveate_GP_CPU(CPURenderer):
+    def __init__(self, dotPitch = -1, viewDist = -1, pix2deg = -1, gazePosition=(-1, -1), visualize = False, pyramid = 'mipmap', cache = None,
+                 outputSize = None):
+        CPURenderer.__init__(self, GeislerPerryModel(dotPitch, viewDist, pix2deg), gazePosition=gazePosition, visualize=visualize, pyramid=pyramid,
+                             cache=cache, outputSize=outputSize)
+
+    def updateGaze(self, newGazePosition, scales=None, weights=None):
+        self.moveGaze(newGazePosition, scales, weights)
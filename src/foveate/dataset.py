@@ -0,0 +1,193 @@
+#foveation as a training time augmentation, without writing images to disk (no OpenGL dependency until first use)
+#FoveationTransform foveates one image at a supplied or random gaze point and renders it directly into a new array
+#(renderInto), which is returned as is, as a torch tensor sharing its memory or as a DLPack capsule for other frameworks
+#FoveatedLoader runs a transform on a background thread that owns the renderer and its OpenGL context and keeps up to
+#prefetch samples (or batches) ready, so that foveation overlaps the training step, OpenGL and numpy release the GIL
+#renderers are created on first use in the thread (or data loader worker process) that calls the transform,
+#since an OpenGL context can only be used by the thread that created it
+import threading
+import queue
+import numpy as np
+from PIL import Image
+from .image_utils import imageSize
+
+#output types of the transforms: numpy arrays, torch tensors (torch.from_numpy) or DLPack capsules (array.__dlpack__)
+OUTPUTS = ['numpy', 'torch', 'dlpack']
+
+
+#uniformly distributed gaze point (row, column) at least margin pixels inside a width x height image
+def randomGaze(width, height, rng, margin=0):
+    return (rng.uniform(margin, max(margin, height - margin)), rng.uniform(margin, max(margin, width - margin)))
+
+
+#width and height of a sample (filename, PIL image or array), only the header of an image file is read
+def sampleSize(sample):
+    if isinstance(sample, str):
+        with Image.open(sample) as img:
+            return imageSize(img)
+    return imageSize(sample)
+
+
+#array, tensor or capsule of output type for a H x W x 3 or N x H x W x 3 uint8 array, all sharing its memory
+def convertOutput(frames, output):
+    if output == 'torch':
+        import torch
+        return torch.from_numpy(frames)
+    if output == 'dlpack':
+        return frames.__dlpack__()
+    return frames
+
+
+class FoveationTransform:
+    #model, backend, pyramid, lodMode and parameters (e.g. gazeRadius, viewDist, pix2deg) are those of createRenderer,
+    #gaze is the default gaze point: None (image center), 'random' (randomGaze with margin) or a function
+    #gaze(width, height, rng) returning (row, column), seed seeds the random gaze points, with outputSize (width, height)
+    #images of any size are rendered directly at that size (e.g. the input size of a network), gaze points stay in image pixels
+    def __init__(self, model='classic', backend='auto', gaze='random', margin=0, pyramid='mipmap', lodMode='shader', output='numpy',
+                 seed=None, outputSize=None, **parameters):
+        if output not in OUTPUTS:
+            raise ValueError('Unknown output {!r}, expected one of {}'.format(output, ', '.join(OUTPUTS)))
+        self.model = model
+        self.backend = backend
+        self.gaze = gaze
+        self.margin = margin
+        self.pyramid = pyramid
+        self.lodMode = lodMode
+        self.output = output
+        self.outputSize = outputSize
+        self.parameters = parameters
+        self.rng = np.random.default_rng(seed)
+        self.renderer = None
+
+    def createRenderer(self):
+        from . import createRenderer
+        return createRenderer(self.model, backend=self.backend, visualize=False, lodMode=self.lodMode, pyramid=self.pyramid, outputSize=self.outputSize,
+                              **self.parameters)
+
+    #gaze point (row, column) of an image for a supplied gaze, or the default one if gaze is None
+    def gazeFor(self, width, height, gaze=None):
+        if gaze is None:
+            gaze = self.gaze
+        if gaze is None:
+            return (height/2, width/2)
+        if isinstance(gaze, str):
+            if gaze != 'random':
+                raise ValueError('Unknown gaze {!r}, expected None, random, a function or (row, column)'.format(gaze))
+            return randomGaze(width, height, self.rng, self.margin)
+        if callable(gaze):
+            return gaze(width, height, self.rng)
+        return gaze
+
+    #foveate image (filename, PIL image or uint8 array) at gaze into out (a new H x W x 3 uint8 array of the image or output size by default),
+    #returns the raw array and the gaze point (row, column)
+    def foveate(self, image, gaze=None, out=None):
+        if self.renderer is None:
+            self.renderer = self.createRenderer()
+        #files are loaded by name, so that the renderer can decode them as its pyramid needs (e.g. 'draft'),
+        #the gaze point is chosen for the size of the loaded image
+        if isinstance(image, str):
+            self.renderer.loadImgFromFile(image)
+        else:
+            self.renderer.loadImgFromArray(image)
+        gaze = self.gazeFor(self.renderer.img_width, self.renderer.img_height, gaze)
+        self.renderer.moveGaze(gaze)
+        if out is None:
+            out = np.empty((self.renderer.out_height, self.renderer.out_width, 3), np.uint8)
+        return self.renderer.renderInto(out), gaze
+
+    #foveated image of the output type
+    def __call__(self, image, gaze=None):
+        return convertOutput(self.foveate(image, gaze)[0], self.output)
+
+    #destroy the renderer and its context, has to be called by the thread that used it,
+    #a new renderer is created on the next call
+    def close(self):
+        if self.renderer is not None and hasattr(self.renderer, 'context'):
+            self.renderer.context.terminate()
+        self.renderer = None
+
+
+class FoveatedLoader:
+    #iterate over samples (filenames, PIL images or arrays) foveated by transform, yielding (image, gaze, label)
+    #or with batchSize, (images, gazes, labels) with N x H x W x 3 images rendered in place (all images of a batch must
+    #have the same size, unless the transform has an outputSize), gazes is one gaze point per sample or None for the default of the transform, labels are
+    #passed through, up to prefetch items are rendered ahead on a background thread
+    def __init__(self, samples, transform, gazes=None, labels=None, batchSize=None, shuffle=False, prefetch=2, seed=None):
+        self.samples = samples
+        self.transform = transform
+        self.gazes = gazes
+        self.labels = labels
+        self.batchSize = batchSize
+        self.shuffle = shuffle
+        self.prefetch = prefetch
+        self.rng = np.random.default_rng(seed)
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def __len__(self):
+        if self.batchSize is None:
+            return len(self.samples)
+        return -(-len(self.samples)//self.batchSize)
+
+    def batches(self):
+        order = self.rng.permutation(len(self.samples)) if self.shuffle else np.arange(len(self.samples))
+        step = self.batchSize or 1
+        return [order[start:start + step] for start in range(0, len(order), step)]
+
+    def render(self, indices):
+        gazes = [None if self.gazes is None else self.gazes[i] for i in indices]
+        labels = [None if self.labels is None else self.labels[i] for i in indices]
+        if self.batchSize is None:
+            frame, gaze = self.transform.foveate(self.samples[indices[0]], gazes[0])
+            return convertOutput(frame, self.transform.output), gaze, labels[0]
+
+        width, height = self.transform.outputSize or sampleSize(self.samples[indices[0]])
+        frames = np.empty((len(indices), height, width, 3), np.uint8)
+        points = [self.transform.foveate(self.samples[index], gaze, out=frame)[1] for index, gaze, frame in zip(indices, gazes, frames)]
+        return convertOutput(frames, self.transform.output), np.array(points), labels
+
+    #the worker thread creates its own renderer and puts items, then None (or the exception that stopped it) on the queue,
+    #a renderer the transform created on another thread is set aside meanwhile
+    def work(self, items, batches):
+        previous = self.transform.renderer
+        self.transform.renderer = None
+        try:
+            for indices in batches:
+                if self.stopped.is_set():
+                    break
+                items.put(self.render(indices))
+        except Exception as err:
+            items.put(err)
+        else:
+            items.put(None)
+        finally:
+            self.transform.close()
+            self.transform.renderer = previous
+
+    def __iter__(self):
+        if self.thread is not None:
+            raise RuntimeError('The loader is already being iterated, its transform has one renderer')
+        self.stopped.clear()
+        items = queue.Queue(maxsize=self.prefetch)
+        self.thread = threading.Thread(target=self.work, args=(items, self.batches()), daemon=True)
+        self.thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.stop(items)
+
+    def stop(self, items):
+        self.stopped.set()
+        #unblock the worker if it waits for a free slot
+        while self.thread.is_alive():
+            try:
+                items.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.thread = None
@@ -0,0 +1,305 @@
+#OpenGL context backends: a GLFW window (visible or hidden) as before, and headless EGL and OSMesa contexts
+#that need neither a display server nor, in the case of OSMesa (llvmpipe), a GPU
+#
+#PyOpenGL resolves GL functions through a platform (GLX, EGL, OSMesa) that is fixed when OpenGL is first imported,
+#so configurePlatform has to be called before "from OpenGL.GL import *"
+import os
+import sys
+import ctypes
+
+BACKENDS = ['glfw', 'egl', 'osmesa']
+
+#PyOpenGL platform needed by each backend, None keeps PyOpenGL's default (GLX, WGL, ...)
+PLATFORMS = {'glfw': None, 'egl': 'egl', 'osmesa': 'osmesa'}
+
+EGL_LIBRARIES = ['libEGL.so.1', 'libEGL.so']
+OSMESA_LIBRARIES = ['libOSMesa.so.8', 'libOSMesa.so.6', 'libOSMesa.so']
+
+
+def loadLibrary(names):
+    for name in names:
+        try:
+            return ctypes.CDLL(name)
+        except OSError:
+            pass
+    return None
+
+
+def hasDisplay():
+    if not sys.platform.startswith('linux'):
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+#resolve 'auto' to a concrete backend: the FOVEATE_GL_BACKEND environment variable if set, otherwise
+#GLFW when a window is requested or a display is available, EGL if libEGL can be loaded and OSMesa as the last resort
+def resolveBackend(backend='auto', visible=False):
+    if backend in [None, 'auto']:
+        backend = os.environ.get('FOVEATE_GL_BACKEND', 'auto')
+    if backend == 'auto':
+        if visible or hasDisplay():
+            return 'glfw'
+        if loadLibrary(EGL_LIBRARIES):
+            return 'egl'
+        if loadLibrary(OSMESA_LIBRARIES):
+            return 'osmesa'
+        return 'glfw'
+    if backend not in BACKENDS:
+        raise ValueError('Unknown OpenGL backend {!r}, expected one of {}'.format(backend, ', '.join(['auto'] + BACKENDS)))
+    return backend
+
+
+#select the PyOpenGL platform for backend, has no effect once OpenGL has been imported
+#an explicitly set PYOPENGL_PLATFORM is respected
+def configurePlatform(backend='auto'):
+    backend = resolveBackend(backend)
+    platform = PLATFORMS[backend]
+    if platform is not None and 'OpenGL.platform' not in sys.modules:
+        os.environ.setdefault('PYOPENGL_PLATFORM', platform)
+    return backend
+
+
+#whether the (loaded or configured) PyOpenGL platform can run backend, GLFW creates its context through EGL
+#when PyOpenGL uses the EGL platform
+def platformMatches(backend):
+    current = os.environ.get('PYOPENGL_PLATFORM')
+    if backend == 'glfw':
+        return current != 'osmesa'
+    return current == PLATFORMS[backend]
+
+
+#restart the running script with FOVEATE_GL_BACKEND set if OpenGL was already loaded for a platform that cannot run
+#backend (used by the command line scripts, which import OpenGL before parsing their options)
+def relaunchForBackend(backend, visible=False):
+    backend = resolveBackend(backend, visible)
+    if platformMatches(backend) or os.environ.get('FOVEATE_GL_BACKEND') == backend:
+        return
+    libraries = {'egl': EGL_LIBRARIES, 'osmesa': OSMESA_LIBRARIES}.get(backend)
+    if libraries and loadLibrary(libraries) is None:
+        raise RuntimeError('The {} backend is not available, failed to load {}'.format(backend, libraries[-1]))
+    os.environ['FOVEATE_GL_BACKEND'] = backend
+    if PLATFORMS[backend] is None:
+        os.environ.pop('PYOPENGL_PLATFORM', None)
+    else:
+        os.environ['PYOPENGL_PLATFORM'] = PLATFORMS[backend]
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+#create and make current an OpenGL 3.3+ context, only the glfw backend can show a window
+def createContext(backend='auto', width=1024, height=980, visible=False):
+    backend = resolveBackend(backend, visible)
+    if visible and backend != 'glfw':
+        raise ValueError('The {} backend is headless and cannot show a window, use the glfw backend'.format(backend))
+    if not platformMatches(backend):
+        raise RuntimeError('The {} backend cannot be used with the PyOpenGL platform {!r}, set FOVEATE_GL_BACKEND={} '
+                           'before OpenGL is imported'.format(backend, os.environ.get('PYOPENGL_PLATFORM'), backend))
+    return CONTEXTS[backend](width, height, visible)
+
+
+class GLFWContext:
+    name = 'glfw'
+
+    def __init__(self, width, height, visible):
+        import glfw
+        self.glfw = glfw
+
+        if not glfw.init():
+            raise RuntimeError('Failed to initialize GLFW!')
+        #we cannot create OpenGL context without some sort of window, so we just hide it if no visualization is needed
+        if not visible:
+            glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+        if os.environ.get('PYOPENGL_PLATFORM') == 'egl':
+            glfw.window_hint(glfw.CONTEXT_CREATION_API, glfw.EGL_CONTEXT_API)
+
+        self.window = glfw.create_window(width, height, "foveated", None, None)
+        if not self.window:
+            glfw.terminate()
+            raise RuntimeError('Failed to create GLFW window!')
+        self.makeCurrent()
+
+    def makeCurrent(self):
+        self.glfw.make_context_current(self.window)
+
+    def setSize(self, width, height):
+        self.glfw.set_window_size(self.window, width, height)
+
+    def swapBuffers(self):
+        self.glfw.swap_buffers(self.window)
+        self.glfw.poll_events()
+
+    #number of display refreshes to wait for in swapBuffers, 0 disables vsync
+    def setSwapInterval(self, interval):
+        self.glfw.swap_interval(interval)
+
+    def terminate(self):
+        self.glfw.terminate()
+
+
+#EGL constants
+EGL_EXTENSIONS = 0x3055
+EGL_NONE = 0x3038
+EGL_RED_SIZE = 0x3024
+EGL_GREEN_SIZE = 0x3023
+EGL_BLUE_SIZE = 0x3022
+EGL_ALPHA_SIZE = 0x3021
+EGL_SURFACE_TYPE = 0x3033
+EGL_PBUFFER_BIT = 0x0001
+EGL_RENDERABLE_TYPE = 0x3040
+EGL_OPENGL_BIT = 0x0008
+EGL_OPENGL_API = 0x30A2
+EGL_WIDTH = 0x3057
+EGL_HEIGHT = 0x3056
+EGL_CONTEXT_MAJOR_VERSION = 0x3098
+EGL_CONTEXT_MINOR_VERSION = 0x30FB
+EGL_CONTEXT_OPENGL_PROFILE_MASK = 0x30FD
+EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT = 0x0001
+EGL_PLATFORM_DEVICE_EXT = 0x313F
+EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+
+
+def intArray(values):
+    return (ctypes.c_int*len(values))(*values)
+
+
+#headless EGL context, uses a surfaceless display (Mesa) or the first EGL device (e.g. NVIDIA) when available
+#and renders without a surface if EGL_KHR_surfaceless_context is supported, with a small pbuffer otherwise
+class EGLContext:
+    name = 'egl'
+
+    def __init__(self, width, height, visible):
+        egl = loadLibrary(EGL_LIBRARIES)
+        if egl is None:
+            raise RuntimeError('Failed to load libEGL!')
+        self.egl = egl
+        for fn in ['eglGetDisplay', 'eglQueryString', 'eglGetProcAddress', 'eglCreateContext', 'eglCreatePbufferSurface']:
+            getattr(egl, fn).restype = ctypes.c_void_p
+        egl.eglQueryString.restype = ctypes.c_char_p
+        egl.eglGetDisplay.argtypes = [ctypes.c_void_p]
+        egl.eglQueryString.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        egl.eglGetProcAddress.argtypes = [ctypes.c_char_p]
+
+        self.display = self.getDisplay()
+        if not self.display or not egl.eglInitialize(self.display, None, None):
+            raise RuntimeError('Failed to initialize EGL display!')
+        egl.eglBindAPI(EGL_OPENGL_API)
+
+        config = ctypes.c_void_p()
+        numConfigs = ctypes.c_int()
+        attribs = intArray([EGL_SURFACE_TYPE, EGL_PBUFFER_BIT, EGL_RENDERABLE_TYPE, EGL_OPENGL_BIT,
+                            EGL_RED_SIZE, 8, EGL_GREEN_SIZE, 8, EGL_BLUE_SIZE, 8, EGL_ALPHA_SIZE, 8, EGL_NONE])
+        if not egl.eglChooseConfig(self.display, attribs, ctypes.byref(config), 1, ctypes.byref(numConfigs)) or numConfigs.value < 1:
+            raise RuntimeError('No suitable EGL config found!')
+
+        contextAttribs = intArray([EGL_CONTEXT_MAJOR_VERSION, 3, EGL_CONTEXT_MINOR_VERSION, 3,
+                                   EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT, EGL_NONE])
+        self.context = ctypes.c_void_p(egl.eglCreateContext(self.display, config, None, contextAttribs))
+        if not self.context:
+            raise RuntimeError('Failed to create EGL context!')
+
+        self.surface = None
+        extensions = egl.eglQueryString(self.display, EGL_EXTENSIONS) or b''
+        if b'EGL_KHR_surfaceless_context' not in extensions.split():
+            surfaceAttribs = intArray([EGL_WIDTH, width, EGL_HEIGHT, height, EGL_NONE])
+            self.surface = ctypes.c_void_p(egl.eglCreatePbufferSurface(self.display, config, surfaceAttribs))
+        self.makeCurrent()
+
+    def getDisplay(self):
+        egl = self.egl
+        clientExtensions = (egl.eglQueryString(None, EGL_EXTENSIONS) or b'').split()
+        getPlatformDisplay = None
+        if b'EGL_EXT_platform_base' in clientExtensions:
+            getPlatformDisplay = ctypes.CFUNCTYPE(ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)(
+                egl.eglGetProcAddress(b'eglGetPlatformDisplayEXT'))
+
+        if getPlatformDisplay and b'EGL_MESA_platform_surfaceless' in clientExtensions:
+            display = getPlatformDisplay(EGL_PLATFORM_SURFACELESS_MESA, None, None)
+            if display:
+                return ctypes.c_void_p(display)
+
+        if getPlatformDisplay and b'EGL_EXT_platform_device' in clientExtensions:
+            queryDevices = ctypes.CFUNCTYPE(ctypes.c_uint, ctypes.c_int, ctypes.POINTER(ctypes.c_void_p), ctypes.POINTER(ctypes.c_int))(
+                egl.eglGetProcAddress(b'eglQueryDevicesEXT'))
+            devices = (ctypes.c_void_p*8)()
+            numDevices = ctypes.c_int()
+            if queryDevices(8, devices, ctypes.byref(numDevices)) and numDevices.value > 0:
+                display = getPlatformDisplay(EGL_PLATFORM_DEVICE_EXT, devices[0], None)
+                if display:
+                    return ctypes.c_void_p(display)
+
+        return ctypes.c_void_p(egl.eglGetDisplay(None))
+
+    def makeCurrent(self):
+        if not self.egl.eglMakeCurrent(self.display, self.surface, self.surface, self.context):
+            raise RuntimeError('Failed to make EGL context current!')
+
+    def setSize(self, width, height):
+        pass
+
+    def swapBuffers(self):
+        pass
+
+    def setSwapInterval(self, interval):
+        pass
+
+    def terminate(self):
+        self.egl.eglMakeCurrent(self.display, None, None, None)
+        self.egl.eglDestroyContext(self.display, self.context)
+        if self.surface:
+            self.egl.eglDestroySurface(self.display, self.surface)
+        self.egl.eglTerminate(self.display)
+
+
+#OSMesa constants
+OSMESA_RGBA = 0x1908
+OSMESA_FORMAT = 0x22
+OSMESA_DEPTH_BITS = 0x30
+OSMESA_PROFILE = 0x33
+OSMESA_CORE_PROFILE = 0x34
+OSMESA_CONTEXT_MAJOR_VERSION = 0x36
+OSMESA_CONTEXT_MINOR_VERSION = 0x37
+GL_UNSIGNED_BYTE = 0x1401
+
+
+#pure software context (Mesa llvmpipe) rendering into client memory, works without any display or GPU
+#the renderers draw into their own framebuffer objects, so the default buffer is kept tiny
+class OSMesaContext:
+    name = 'osmesa'
+
+    def __init__(self, width, height, visible):
+        osmesa = loadLibrary(OSMESA_LIBRARIES)
+        if osmesa is None:
+            raise RuntimeError('Failed to load libOSMesa!')
+        self.osmesa = osmesa
+        osmesa.OSMesaCreateContextAttribs.restype = ctypes.c_void_p
+        osmesa.OSMesaCreateContextAttribs.argtypes = [ctypes.POINTER(ctypes.c_int), ctypes.c_void_p]
+        osmesa.OSMesaMakeCurrent.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        osmesa.OSMesaDestroyContext.argtypes = [ctypes.c_void_p]
+
+        attribs = intArray([OSMESA_FORMAT, OSMESA_RGBA, OSMESA_DEPTH_BITS, 0, OSMESA_PROFILE, OSMESA_CORE_PROFILE,
+                            OSMESA_CONTEXT_MAJOR_VERSION, 3, OSMESA_CONTEXT_MINOR_VERSION, 3, 0])
+        self.context = osmesa.OSMesaCreateContextAttribs(attribs, None)
+        if not self.context:
+            raise RuntimeError('Failed to create OSMesa context!')
+
+        self.width, self.height = 1, 1
+        self.buffer = (ctypes.c_ubyte*(self.width*self.height*4))()
+        self.makeCurrent()
+
+    def makeCurrent(self):
+        if not self.osmesa.OSMesaMakeCurrent(self.context, self.buffer, GL_UNSIGNED_BYTE, self.width, self.height):
+            raise RuntimeError('Failed to make OSMesa context current!')
+
+    def setSize(self, width, height):
+        pass
+
+    def swapBuffers(self):
+        pass
+
+    def setSwapInterval(self, interval):
+        pass
+
+    def terminate(self):
+        self.osmesa.OSMesaDestroyContext(self.context)
+
+
+CONTEXTS = {'glfw': GLFWContext, 'egl': EGLContext, 'osmesa': OSMesaContext}
@@ -0,0 +1,502 @@
+from OpenGL.GL import *
+import OpenGL.GL.shaders
+from OpenGL.raw.GL.VERSION.GL_1_0 import glReadPixels as glReadPixelsToBuffer
+from OpenGL.raw.GL.VERSION.GL_1_0 import glGetTexImage as glGetTexImageToBuffer
+from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v as glGetQueryObjectui64vToBuffer
+import numpy as np
+import ctypes
+import time
+from collections import deque, OrderedDict
+from .image_utils import imageSize, imageToArray
+
+#internal and pixel formats for 8-bit textures with 1, 3 and 4 channels
+TEXTURE_FORMATS = {1: (GL_R8, GL_RED),
+                   3: (GL_RGB8, GL_RGB),
+                   4: (GL_RGBA8, GL_RGBA)}
+
+
+#rows of tightly packed data are only 4-byte aligned if the row size is a multiple of 4
+def setUnpackAlignment(width, channels):
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 4 if (width*channels) % 4 == 0 else 1)
+
+
+#grayscale images are stored in the red channel, replicate it so that they are rendered gray
+def setSwizzle(channels):
+    if channels == 1:
+        swizzle = [GL_RED, GL_RED, GL_RED, GL_ONE]
+    else:
+        swizzle = [GL_RED, GL_GREEN, GL_BLUE, GL_ALPHA]
+    glTexParameteriv(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_RGBA, swizzle)
+
+
+def channelCount(img_data):
+    return 1 if img_data.ndim == 2 else img_data.shape[2]
+
+
+def mipLevels(width, height):
+    return max(width, height).bit_length()
+
+
+#estimated bytes of VRAM per pixel, drivers usually pad 3 channel formats to 4 bytes
+BYTES_PER_PIXEL = {GL_R8: 1, GL_RGB8: 4, GL_RGBA8: 4}
+
+#default VRAM budget of a ResourcePool
+POOL_MAX_BYTES = 512*2**20
+
+#kinds of pool entries holding a single texture, the others are framebuffers with a color buffer
+TEXTURE_KINDS = ['texture', 'arrayTexture']
+
+
+#textures and offscreen render targets reused across images, keyed by size and format
+#textures have immutable storage (glTexStorage2D) and are updated with glTexSubImage2D, so loading an image
+#of a size seen before does not reallocate anything, render targets are renderbuffers of exactly the image size,
+#limited only by GL_MAX_RENDERBUFFER_SIZE
+#texture arrays and layered targets of foveate_array are pooled the same way, keyed by size and number of layers
+#least recently used entries are deleted when the estimated VRAM use exceeds maxBytes
+class ResourcePool:
+    def __init__(self, maxBytes=POOL_MAX_BYTES):
+        self.maxBytes = maxBytes
+        #key -> (names, bytes), in order of use
+        self.entries = OrderedDict()
+        self.textureBytes = 0
+        self.targetBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        #last texture and target handed out, they are in use and never evicted
+        self.current = {}
+        self.immutable = bool(glTexStorage2D)
+
+    def stats(self):
+        return {'entries': len(self.entries), 'textureBytes': self.textureBytes, 'targetBytes': self.targetBytes,
+                'totalBytes': self.textureBytes + self.targetBytes, 'maxBytes': self.maxBytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def lookup(self, key):
+        self.current[key[0]] = key
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+        self.misses += 1
+        return None
+
+    def insert(self, key, names, size):
+        self.entries[key] = (names, size)
+        if key[0] in TEXTURE_KINDS:
+            self.textureBytes += size
+        else:
+            self.targetBytes += size
+        self.evict()
+
+    #delete least recently used entries until the pool fits into maxBytes, the bound texture and target are kept
+    def evict(self):
+        for key in list(self.entries):
+            if self.textureBytes + self.targetBytes <= self.maxBytes:
+                break
+            if key in self.current.values():
+                continue
+            names, size = self.entries.pop(key)
+            if key[0] in TEXTURE_KINDS:
+                glDeleteTextures([names])
+                self.textureBytes -= size
+            else:
+                glDeleteFramebuffers(1, [names[0]])
+                if key[0] == 'layeredTarget':
+                    glDeleteTextures([names[1]])
+                else:
+                    glDeleteRenderbuffers(1, [names[1]])
+                self.targetBytes -= size
+            self.evictions += 1
+
+    #bind a texture with storage for width x height images with the given number of channels and all mipmap levels
+    def texture(self, width, height, channels):
+        internalFormat, pixelFormat = TEXTURE_FORMATS[channels]
+        key = ('texture', width, height, internalFormat)
+        texture = self.lookup(key)
+        if texture is not None:
+            glBindTexture(GL_TEXTURE_2D, texture)
+            return texture
+
+        maxSize = int(glGetIntegerv(GL_MAX_TEXTURE_SIZE))
+        if width > maxSize or height > maxSize:
+            raise ValueError('Image size {}x{} exceeds GL_MAX_TEXTURE_SIZE ({}), render it in tiles (foveate.TiledRenderer)'.format(width, height, maxSize))
+        texture = int(glGenTextures(1))
+        glBindTexture(GL_TEXTURE_2D, texture)
+        levels = mipLevels(width, height)
+        if self.immutable:
+            glTexStorage2D(GL_TEXTURE_2D, levels, internalFormat, width, height)
+        else:
+            #without ARB_texture_storage every level is allocated once with glTexImage2D
+            for level in range(levels):
+                glTexImage2D(GL_TEXTURE_2D, level, internalFormat, max(1, width >> level), max(1, height >> level), 0,
+                             pixelFormat, GL_UNSIGNED_BYTE, None)
+        #texture wrapping params
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+        #texture filtering params
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        setSwizzle(channels)
+
+        size = sum(max(1, width >> l)*max(1, height >> l) for l in range(levels))*BYTES_PER_PIXEL[internalFormat]
+        self.insert(key, texture, size)
+        return texture
+
+    #upload image data into a pooled texture of its size and format and leave it bound,
+    #the mipmaps are rebuilt with glGenerateMipmap unless they are built separately (generateMipmap=False)
+    def uploadTexture(self, img_data, generateMipmap=True):
+        height, width = img_data.shape[:2]
+        channels = channelCount(img_data)
+        texture = self.texture(width, height, channels)
+        setUnpackAlignment(width, channels)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, TEXTURE_FORMATS[channels][1], GL_UNSIGNED_BYTE, img_data)
+        if generateMipmap:
+            glGenerateMipmap(GL_TEXTURE_2D)
+        return texture
+
+    #bind a framebuffer with a width x height RGBA8 color buffer, returns the framebuffer
+    def target(self, width, height):
+        key = ('target', width, height)
+        names = self.lookup(key)
+        if names is not None:
+            glBindFramebuffer(GL_FRAMEBUFFER, names[0])
+            return names[0]
+
+        maxSize = int(glGetIntegerv(GL_MAX_RENDERBUFFER_SIZE))
+        if width > maxSize or height > maxSize:
+            raise ValueError('Image size {}x{} exceeds GL_MAX_RENDERBUFFER_SIZE ({})'.format(width, height, maxSize))
+        FBO = int(glGenFramebuffers(1))
+        RBO = int(glGenRenderbuffers(1))
+        glBindFramebuffer(GL_FRAMEBUFFER, FBO)
+        glBindRenderbuffer(GL_RENDERBUFFER, RBO)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, RBO)
+        self.insert(key, (FBO, RBO), width*height*4)
+        return FBO
+
+    #bind a GL_TEXTURE_2D_ARRAY with storage for layers RGB images of width x height and all mipmap levels
+    def arrayTexture(self, width, height, layers):
+        key = ('arrayTexture', width, height, layers)
+        texture = self.lookup(key)
+        if texture is not None:
+            glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+            return texture
+
+        texture = int(glGenTextures(1))
+        glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+        levels = mipLevels(width, height)
+        if self.immutable:
+            glTexStorage3D(GL_TEXTURE_2D_ARRAY, levels, GL_RGB8, width, height, layers)
+        else:
+            for level in range(levels):
+                glTexImage3D(GL_TEXTURE_2D_ARRAY, level, GL_RGB8, max(1, width >> level), max(1, height >> level), layers, 0,
+                             GL_RGB, GL_UNSIGNED_BYTE, None)
+        #same sampling as the 2D textures
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_S, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+
+        size = sum(max(1, width >> l)*max(1, height >> l) for l in range(levels))*layers*BYTES_PER_PIXEL[GL_RGB8]
+        self.insert(key, texture, size)
+        return texture
+
+    #upload a K x H x W x 3 uint8 array into the first K layers of a pooled texture array with capacity layers
+    #with a single glTexSubImage3D, rebuild the mipmaps of all layers and leave the texture bound
+    def uploadArrayTexture(self, img_data, layers, generateMipmap=True):
+        count, height, width = img_data.shape[:3]
+        texture = self.arrayTexture(width, height, layers)
+        setUnpackAlignment(width, 3)
+        glTexSubImage3D(GL_TEXTURE_2D_ARRAY, 0, 0, 0, 0, width, height, count, GL_RGB, GL_UNSIGNED_BYTE, img_data)
+        if generateMipmap:
+            glGenerateMipmap(GL_TEXTURE_2D_ARRAY)
+        return texture
+
+    #bind a framebuffer with a layered color buffer, a RGBA8 texture array of layers x width x height,
+    #returns the framebuffer and the texture
+    def layeredTarget(self, width, height, layers):
+        key = ('layeredTarget', width, height, layers)
+        names = self.lookup(key)
+        if names is not None:
+            glBindFramebuffer(GL_FRAMEBUFFER, names[0])
+            return names
+
+        FBO = int(glGenFramebuffers(1))
+        texture = int(glGenTextures(1))
+        glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+        if self.immutable:
+            glTexStorage3D(GL_TEXTURE_2D_ARRAY, 1, GL_RGBA8, width, height, layers)
+        else:
+            glTexImage3D(GL_TEXTURE_2D_ARRAY, 0, GL_RGBA8, width, height, layers, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glBindFramebuffer(GL_FRAMEBUFFER, FBO)
+        glFramebufferTexture(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, texture, 0)
+        self.insert(key, (FBO, texture), width*height*layers*4)
+        return FBO, texture
+
+
+#read all layers of the texture array bound to GL_TEXTURE_2D_ARRAY with a single glGetTexImage into out
+#(layers x height x width x 3 uint8, C contiguous), rows are in OpenGL order (bottom row first)
+def readTextureArray(out):
+    glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    glGetTexImageToBuffer(GL_TEXTURE_2D_ARRAY, 0, GL_RGB, GL_UNSIGNED_BYTE, out.ctypes.data_as(ctypes.c_void_p))
+
+
+#read all mipmap levels of the texture bound to GL_TEXTURE_2D, a width x height image with 1, 3 or 4 channels,
+#returns a list of HxW(xC) uint8 arrays from full size down to 1x1
+def readLevels(width, height, channels):
+    glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    levels = []
+    for level in range(mipLevels(width, height)):
+        shape = (max(1, height >> level), max(1, width >> level))
+        data = np.empty(shape if channels == 1 else shape + (channels,), np.uint8)
+        glGetTexImageToBuffer(GL_TEXTURE_2D, level, TEXTURE_FORMATS[channels][1], GL_UNSIGNED_BYTE, data.ctypes.data_as(ctypes.c_void_p))
+        levels.append(data)
+    return levels
+
+
+#upload the levels of a pyramid computed on the CPU (e.g. pyramid.gaussianPyramid) into the bound texture
+def uploadLevels(levels, firstLevel=0):
+    for level, data in enumerate(levels, firstLevel):
+        height, width = data.shape[:2]
+        channels = channelCount(data)
+        setUnpackAlignment(width, channels)
+        glTexSubImage2D(GL_TEXTURE_2D, level, 0, 0, width, height, TEXTURE_FORMATS[channels][1], GL_UNSIGNED_BYTE, data)
+
+
+#fragment shader of PyramidBuilder, reduces sourceLevel of sourceTex by 2 along direction with the filter
+#of pyramid.reduceAxis, texels outside the level are clamped to the edge
+pyramid_fragment_shader = """
+    #version 330
+    out vec4 outColor;
+
+    uniform sampler2D sourceTex;
+    uniform int sourceLevel;
+    uniform ivec2 sourceSize;
+    uniform ivec2 direction; //(1, 0) reduces the rows, (0, 1) the columns
+
+    const float weights[6] = float[](0.03125, 0.15625, 0.3125, 0.3125, 0.15625, 0.03125);
+
+    void main()
+    {
+        ivec2 p = ivec2(gl_FragCoord.xy)*(ivec2(1) + direction);
+        vec4 sum = vec4(0.0);
+        for (int k = 0; k < 6; k++)
+        {
+            ivec2 q = clamp(p + direction*(k - 2), ivec2(0), sourceSize - 1);
+            sum += weights[k]*texelFetch(sourceTex, q, sourceLevel);
+        }
+        outColor = sum;
+    }
+    """
+
+
+#builds Gaussian pyramids (see pyramid.py) in the mipmap levels of pooled textures on the GPU,
+#every level is reduced along the rows into a float texture and along the columns into the next level,
+#two framebuffers are used in turn so that none of them is re-attached between passes
+#it draws the quad of the vertex array bound by the caller, which restores its program and bindings afterwards
+class PyramidBuilder:
+    def __init__(self, vertexShader):
+        self.shader = OpenGL.GL.shaders.compileProgram(OpenGL.GL.shaders.compileShader(vertexShader, GL_VERTEX_SHADER),
+                                                       OpenGL.GL.shaders.compileShader(pyramid_fragment_shader, GL_FRAGMENT_SHADER))
+        self.locs = {name: glGetUniformLocation(self.shader, name) for name in ['sourceTex', 'sourceLevel', 'sourceSize', 'direction']}
+        glUseProgram(self.shader)
+        glUniform1i(self.locs['sourceTex'], 0)
+
+        self.FBOs = [int(f) for f in np.atleast_1d(glGenFramebuffers(2))]
+        self.rowTexture = int(glGenTextures(1))
+        self.rowSize = (0, 0)
+        #internal format -> whether its levels are renderable, checked on first use
+        self.renderable = {}
+
+    #float texture for the result of the row pass of level 0, the largest one, storage only grows
+    def bindRowTexture(self, width, height):
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBOs[0])
+        if width > self.rowSize[0] or height > self.rowSize[1]:
+            self.rowSize = (max(width, self.rowSize[0]), max(height, self.rowSize[1]))
+            glBindTexture(GL_TEXTURE_2D, self.rowTexture)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA32F, self.rowSize[0], self.rowSize[1], 0, GL_RGBA, GL_FLOAT, None)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.rowTexture, 0)
+
+    def reduce(self, source, level, sourceSize, direction, targetSize):
+        glBindTexture(GL_TEXTURE_2D, source)
+        glUniform1i(self.locs['sourceLevel'], level)
+        glUniform2i(self.locs['sourceSize'], *sourceSize)
+        glUniform2i(self.locs['direction'], *direction)
+        glViewport(0, 0, targetSize[0], targetSize[1])
+        glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
+
+    #build levels 1 and up of texture (width x height, level 0 uploaded) on texture unit 0,
+    #returns False without drawing if the internal format cannot be rendered to
+    def build(self, texture, width, height, internalFormat):
+        glUseProgram(self.shader)
+        glActiveTexture(GL_TEXTURE0)
+        self.bindRowTexture(max(1, width//2), height)
+
+        for level in range(mipLevels(width, height) - 1):
+            newWidth, newHeight = max(1, width//2), max(1, height//2)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.FBOs[0])
+            self.reduce(texture, level, (width, height), (1, 0), (newWidth, height))
+
+            glBindFramebuffer(GL_FRAMEBUFFER, self.FBOs[1])
+            glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, texture, level + 1)
+            if internalFormat not in self.renderable:
+                self.renderable[internalFormat] = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+            if not self.renderable[internalFormat]:
+                glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, 0, 0)
+                glBindFramebuffer(GL_FRAMEBUFFER, 0)
+                glBindTexture(GL_TEXTURE_2D, texture)
+                return False
+            self.reduce(self.rowTexture, 0, (newWidth, height), (0, 1), (newWidth, newHeight))
+            width, height = newWidth, newHeight
+
+        #detach the texture, so that deleting it from the pool frees it
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBOs[1])
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, 0, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        return True
+
+
+#maximum number of pixels in a stacked batch target (same budget as a MAX_SIZE x MAX_SIZE renderbuffer)
+BATCH_MAX_PIXELS = 5000*5000
+
+
+#offscreen render target holding several frames of the same size stacked vertically,
+#frames are drawn one after another into their own strip and read back with a single glReadPixels
+class StackedTarget:
+    def __init__(self):
+        self.FBO = glGenFramebuffers(1)
+        self.RBO = glGenRenderbuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBO)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.RBO)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.RBO)
+        self.width, self.height = 0, 0
+        self.frameWidth, self.frameHeight = 0, 0
+
+    #bind the target for frames of the given size, returns how many of count frames fit at once
+    def bind(self, frameWidth, frameHeight, count):
+        maxSize = int(glGetIntegerv(GL_MAX_RENDERBUFFER_SIZE))
+        if frameWidth > maxSize or frameHeight > maxSize:
+            raise ValueError('Frame size {}x{} exceeds GL_MAX_RENDERBUFFER_SIZE ({})'.format(frameWidth, frameHeight, maxSize))
+        slots = max(1, min(count, maxSize//frameHeight, BATCH_MAX_PIXELS//(frameWidth*frameHeight)))
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBO)
+        #storage only grows, so that alternating image sizes do not reallocate it
+        if frameWidth > self.width or frameHeight*slots > self.height:
+            self.width = max(self.width, frameWidth)
+            self.height = max(self.height, frameHeight*slots)
+            glBindRenderbuffer(GL_RENDERBUFFER, self.RBO)
+            glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, self.width, self.height)
+        if not glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError('Batch framebuffer is incomplete')
+
+        self.frameWidth, self.frameHeight = frameWidth, frameHeight
+        return slots
+
+    #set the viewport to the strip of the given slot, returns vertical offset of the strip in window coordinates
+    def useSlot(self, slot):
+        offset = slot*self.frameHeight
+        glViewport(0, offset, self.frameWidth, self.frameHeight)
+        return offset
+
+    #read the first len(out) strips into out (N x H x W x 3 uint8), with the top row of each frame first
+    def read(self, out):
+        count = out.shape[0]
+        glReadBuffer(GL_COLOR_ATTACHMENT0)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        pixels = glReadPixels(0, 0, self.frameWidth, self.frameHeight*count, GL_RGB, GL_UNSIGNED_BYTE)
+        frames = np.frombuffer(pixels, np.uint8).reshape(count, self.frameHeight, self.frameWidth, 3)
+        out[:] = frames[:, ::-1]
+
+
+#ring of pixel pack buffers for asynchronous readback, glReadPixels into a buffer returns immediately
+#and the pixels are only mapped once the next frames have been submitted, so the transfer overlaps with them
+class PBOReader:
+    def __init__(self, numBuffers=2):
+        self.buffers = [int(b) for b in np.atleast_1d(glGenBuffers(numBuffers))]
+        self.sizes = [0]*numBuffers
+        self.pending = deque()
+        self.next = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def full(self):
+        return len(self.pending) == len(self.buffers)
+
+    #start reading width x height RGB pixels of the current read buffer into the next buffer of the ring
+    def start(self, width, height, tag=None):
+        if self.full():
+            raise RuntimeError('All pixel buffers are in use, call finish first')
+        index = self.next
+        self.next = (index + 1) % len(self.buffers)
+
+        size = width*height*3
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[index])
+        if size > self.sizes[index]:
+            glBufferData(GL_PIXEL_PACK_BUFFER, size, None, GL_STREAM_READ)
+            self.sizes[index] = size
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glReadPixelsToBuffer(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.pending.append((index, width, height, tag))
+
+    #map the oldest pending buffer and return callback(tag, frame), where frame is a H x W x 3 uint8 view
+    #of the mapped memory with the top row first (negative row stride), it is only valid during the callback
+    def finish(self, callback):
+        index, width, height, tag = self.pending.popleft()
+        size = width*height*3
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[index])
+        ptr = glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, size, GL_MAP_READ_BIT)
+        try:
+            if not ptr:
+                raise RuntimeError('Failed to map pixel buffer')
+            data = (ctypes.c_ubyte*size).from_address(ptr)
+            frame = np.frombuffer(data, np.uint8).reshape(height, width, 3)[::-1]
+            return callback(tag, frame)
+        finally:
+            if ptr:
+                glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+
+#GPU timer of profiling.Profiler: GL_TIME_ELAPSED queries whose results are collected once they are available,
+#so that timing does not stall the pipeline, queries cannot be nested
+class QueryTimer:
+    def __init__(self):
+        self.free = []
+        self.pending = deque()
+        self.active = None
+
+    def begin(self, tag):
+        if self.active is not None:
+            raise RuntimeError('Time queries cannot be nested')
+        query = self.free.pop() if self.free else int(np.atleast_1d(glGenQueries(1))[0])
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        self.active = (query, tag, time.perf_counter())
+
+    def end(self):
+        glEndQuery(GL_TIME_ELAPSED)
+        self.pending.append(self.active)
+        self.active = None
+
+    #call callback(tag, seconds) for the finished queries in the order they were issued, waits for all if wait is True
+    #results longer than the wall time since the query began are dropped (llvmpipe returns the time since boot
+    #for a query issued before anything was rendered in the context)
+    def collect(self, callback, wait=False):
+        while self.pending:
+            query, tag, start = self.pending[0]
+            if not wait and not glGetQueryObjectiv(query, GL_QUERY_RESULT_AVAILABLE):
+                break
+            #the 64-bit result is read into a ctypes integer, PyOpenGL cannot size the output array of the wrapper
+            elapsed = ctypes.c_uint64()
+            glGetQueryObjectui64vToBuffer(query, GL_QUERY_RESULT, ctypes.byref(elapsed))
+            self.pending.popleft()
+            self.free.append(query)
+            if elapsed.value*1e-9 <= time.perf_counter() - start:
+                callback(tag, elapsed.value*1e-9)
@@ -0,0 +1,63 @@
+#image conversion helpers shared by the OpenGL and the CPU renderers (no OpenGL dependency)
+import numpy as np
+from PIL import Image
+
+
+#size of a PIL image or a HxW(xC) numpy array as (width, height)
+def imageSize(img):
+    if isinstance(img, np.ndarray):
+        return img.shape[1], img.shape[0]
+    return img.size
+
+
+#convert a PIL image or a numpy array to a contiguous uint8 array of shape HxW, HxWx3 or HxWx4
+#pixel data is copied in one block (no per-pixel Python objects), contiguous uint8 arrays are used as is
+def imageToArray(img):
+    if isinstance(img, np.ndarray):
+        if img.dtype != np.uint8:
+            raise ValueError('Expected uint8 image array, got {}'.format(img.dtype))
+        if img.ndim == 3 and img.shape[2] == 1:
+            img = img[:, :, 0]
+        if not (img.ndim == 2 or (img.ndim == 3 and img.shape[2] in [3, 4])):
+            raise ValueError('Unsupported image array shape {}'.format(img.shape))
+        return np.ascontiguousarray(img)
+
+    if img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    elif img.mode == 'LA':
+        img = img.convert('RGBA')
+    elif img.mode not in ['RGB', 'RGBA', 'L']:
+        img = img.convert('RGB')
+    return np.asarray(img)
+
+
+#convert image data to HxWx3, as read back from the RGB color buffer (gray is replicated, alpha is dropped)
+def arrayToRGB(img_data):
+    if img_data.ndim == 2:
+        return np.repeat(img_data[:, :, np.newaxis], 3, axis=2)
+    return img_data[:, :, :3]
+
+
+#write a H x W x 3 frame (e.g. mapped by PBOReader) to an image file, options are passed to PIL (e.g. quality)
+def writeImage(filename, frame, **options):
+    if frame.strides[0] < 0:
+        #bottom-up rows are flipped by the raw decoder, copying the view with numpy would be much slower
+        image = Image.frombuffer('RGB', (frame.shape[1], frame.shape[0]), frame[::-1], 'raw', 'RGB', 0, -1)
+    else:
+        image = Image.fromarray(frame)
+    image.save(filename, **options)
+
+
+#split image files into runs of consecutive images of the same size with at most maxCount images each,
+#only the image headers are read
+def groupBySize(filenames, maxCount):
+    groups = []
+    lastSize = None
+    for filename in filenames:
+        with Image.open(filename) as img:
+            size = img.size
+        if size != lastSize or len(groups[-1]) == maxCount:
+            groups.append([])
+            lastSize = size
+        groups[-1].append(filename)
+    return groups
@@ -0,0 +1,146 @@
+#incremental rendering (setIncremental of the renderers), no OpenGL dependency
+#when the gaze moves a little, the level of detail of most pixels far from the old and the new gaze points is clamped or
+#almost unchanged, so only a box around the pixels whose level of detail may change by more than a tolerance is drawn
+#again and read back into a persistent frame, frames whose gaze points moved less than a threshold are not drawn
+#the box is found without a level of detail map: the level of detail of a gaze point only depends on the distance to it,
+#so when the point moves by shift pixels, the level of a pixel changes by at most shift times the largest slope of the
+#radial profile beyond the distance of the pixel to the nearer of the old and new point (the combination of several
+#points in models.combineFixationLods changes by at most the largest change of a point), and beyond a radius that depends
+#on the shift it changes by less than the tolerance, the box is the bounding box of the discs around the old and new points
+#a pixel keeps the level of detail of the gaze points it was last drawn with, so small changes add up until they are drawn:
+#the fixations of earlier frames are kept with the box they were drawn into, until a later box covers it
+import math
+import numpy as np
+from .lodmap import PROFILE_STEP
+
+#default tolerance in levels: a pixel blends two adjacent pyramid levels by the fraction of its level of detail, so it
+#differs from a full render by at most the tolerance times the difference of the levels (mostly a few gray levels)
+LOD_TOLERANCE = 1/32
+
+#number of earlier fixations kept, a frame with more is drawn in full
+MAX_DRAWN_FIXATIONS = 16
+
+
+#smallest box containing two boxes, either of which can be None
+def unionRegion(a, b):
+    if a is None or b is None:
+        return a if b is None else b
+    return min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+
+
+#overlap of two boxes, None if they do not overlap
+def intersectRegion(a, b):
+    if a is None or b is None:
+        return None
+    region = max(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), min(a[3], b[3])
+    return region if region[0] < region[1] and region[2] < region[3] else None
+
+
+#whether box a contains box b
+def containsRegion(a, b):
+    return a[0] <= b[0] and a[1] >= b[1] and a[2] <= b[2] and a[3] >= b[3]
+
+
+#largest distance in pixels that a gaze point moved between two fixation configurations (models.fixationArrays),
+#infinite if the number of points, their scales or their weights changed
+def gazeShift(old, new):
+    if len(old[0]) != len(new[0]) or not (np.array_equal(old[1], new[1]) and np.array_equal(old[2], new[2])):
+        return np.inf
+    return float(np.max(np.hypot(*(new[0] - old[0]).T)))
+
+
+#largest slope in levels per pixel of a radial profile (lodmap.radialProfile) beyond the distance of every sample
+def slopeBound(profile):
+    slopes = np.abs(np.diff(profile.astype(np.float64)))/PROFILE_STEP
+    return np.maximum.accumulate(slopes[::-1])[::-1]
+
+
+#distance beyond which the level of detail of a point changes by at most tolerance when the point moves by shift,
+#bound is the slopeBound of its profile, one sample further out covers the linear interpolation of the profile,
+#None if the profile is too steep everywhere
+def changeRadius(bound, shift, tolerance):
+    if shift == 0:
+        return 0.0
+    index = int(np.searchsorted(-bound, -tolerance/shift, side='left'))
+    if index == len(bound):
+        return None
+    return (index + 1)*PROFILE_STEP
+
+
+class IncrementalState:
+    def __init__(self, lodTolerance=LOD_TOLERANCE, gazeThreshold=0):
+        self.lodTolerance = lodTolerance
+        self.gazeThreshold = gazeThreshold
+        self.drawn = 0
+        self.skipped = 0
+        self.reset()
+
+    #forget the last frame (e.g. a new image was loaded), the next frame is drawn and read back in full
+    def reset(self):
+        #(fixations, box) of the frames whose pixels may still be in the persistent frame, oldest first
+        self.drawnFixations = []
+        self.fixations = None
+        self.key = None
+        self.dirty = None
+        self.bound = None
+        self.boundDistance = 0
+
+    #region (row0, row1, col0, col1) of a width x height frame to draw for fixations, or None if the frame can be kept,
+    #key identifies everything else the level of detail depends on (model parameters, fixation mode), profile(maxDistance)
+    #returns the radial profile of the model up to at least maxDistance, scale is the number of image pixels per output
+    #pixel (columns, rows) as in lodmap.outputScale, gaze points are in image pixels
+    def update(self, fixations, key, profile, width, height, scale=(1.0, 1.0)):
+        if self.drawnFixations and key == self.key and gazeShift(self.fixations, fixations) < self.gazeThreshold:
+            self.skipped += 1
+            return None
+        frame = (0, height, 0, width)
+        if not self.drawnFixations or key != self.key or len(self.drawnFixations) >= MAX_DRAWN_FIXATIONS:
+            region = frame
+            self.drawnFixations = []
+            if key != self.key:
+                self.bound = None
+        else:
+            region = None
+            for drawn, box in self.drawnFixations:
+                region = unionRegion(region, intersectRegion(box, self.changedBox(drawn, fixations, profile, width, height, scale)))
+            if region is None:
+                self.skipped += 1
+                return None
+        self.drawnFixations = [(f, box) for f, box in self.drawnFixations if not containsRegion(region, box)] + [(fixations, region)]
+        self.fixations = fixations
+        self.key = key
+        self.dirty = unionRegion(self.dirty, region)
+        self.drawn += 1
+        return region
+
+    #box of the output pixels whose level of detail may differ by more than the tolerance between two fixation configurations
+    def changedBox(self, old, new, profile, width, height, scale):
+        frame = (0, height, 0, width)
+        if not np.isfinite(gazeShift(old, new)):
+            return frame
+        points = np.concatenate([old[0], new[0]])
+        scales = np.concatenate([old[1], old[1]])
+        #the profile has to reach the farthest pixel of every point, in units of the point scale
+        corners = np.array([[0, 0], [0, width*scale[0]], [height*scale[1], 0], [height*scale[1], width*scale[0]]], np.float64)
+        maxDistance = float(np.max(np.hypot(*(corners[:, np.newaxis] - points[np.newaxis]).transpose(2, 0, 1))/scales))
+        if self.bound is None or maxDistance > self.boundDistance:
+            self.bound = slopeBound(profile(maxDistance))
+            self.boundDistance = maxDistance
+
+        box = None
+        for oldPoint, newPoint, pointScale in zip(old[0], new[0], old[1]):
+            radius = changeRadius(self.bound, math.hypot(*(newPoint - oldPoint))/pointScale, self.lodTolerance)
+            if radius is None:
+                return frame
+            if radius == 0:
+                continue
+            radius *= pointScale
+            for row, col in [oldPoint, newPoint]:
+                box = unionRegion(box, (math.floor((row - radius)/scale[1]), math.ceil((row + radius)/scale[1]),
+                                        math.floor((col - radius)/scale[0]), math.ceil((col + radius)/scale[0])))
+        return intersectRegion(box, frame)
+
+    #region drawn since the last call, which has to be read back, None if nothing was drawn
+    def takeDirty(self):
+        dirty, self.dirty = self.dirty, None
+        return dirty
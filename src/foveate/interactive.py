@@ -0,0 +1,125 @@
+#Real-time gaze-contingent display: the image is uploaded once and every frame only updates the gaze uniform
+#gaze comes from the mouse cursor (GLFW window) or from a replayed eye tracker log (also works headless)
+#frame times and gaze-to-photon latencies are reported at the end, latency is measured from the time a gaze sample
+#became available to the completion of the buffer swap of the first frame showing it (display scan-out not included)
+import time
+from collections import deque
+
+import numpy as np
+
+
+#collects durations in seconds and summarizes them in milliseconds, only the last maxSamples are kept if it is set
+class TimingStats:
+    def __init__(self, maxSamples=None):
+        self.samples = deque(maxlen=maxSamples)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        if not self.samples:
+            return {'count': 0}
+        ms = np.asarray(self.samples)*1e3
+        return {'count': len(ms), 'mean': float(ms.mean()), 'median': float(np.median(ms)), 'p95': float(np.percentile(ms, 95)),
+                'p99': float(np.percentile(ms, 99)), 'max': float(ms.max())}
+
+
+#gaze at the mouse cursor of the GLFW window, in image pixels
+class MouseGaze:
+    def __init__(self, fov):
+        if fov.context.name != 'glfw' or not fov.visualize:
+            raise ValueError('Mouse gaze needs a visible GLFW window, use the glfw backend with visualize=True')
+        self.fov = fov
+        self.glfw = fov.context.glfw
+        self.window = fov.context.window
+        self.position = None
+        self.timestamp = None
+        self.glfw.set_cursor_pos_callback(self.window, self.onCursor)
+
+    def onCursor(self, window, x, y):
+        #the window may be scaled by the window manager, cursor coordinates are in screen units
+        width, height = self.glfw.get_window_size(window)
+        self.position = (y*self.fov.img_height/max(height, 1), x*self.fov.img_width/max(width, 1))
+        self.timestamp = time.perf_counter()
+
+    #returns (gazePosition, timestamp) of the latest cursor event, or (None, None) if the cursor has not moved
+    def poll(self):
+        self.glfw.poll_events()
+        position, timestamp = self.position, self.timestamp
+        self.position = None
+        return position, timestamp
+
+    def done(self):
+        return self.glfw.window_should_close(self.window)
+
+
+#replays an eye tracker log in real time, like a tracker each sample becomes available at its own time
+#and the most recent one is used, times and points as returned by foveate_video.readGazeLog
+class ReplayGaze:
+    def __init__(self, fov, times, points, normalized=False, loop=False):
+        self.fov = fov
+        self.times = np.asarray(times, np.float64) - times[0]
+        self.points = np.asarray(points, np.float64)
+        if normalized:
+            self.points = self.points*(fov.img_width, fov.img_height)
+        self.loop = loop
+        self.start = None
+        self.next = 0
+
+    def poll(self):
+        now = time.perf_counter()
+        if self.start is None:
+            self.start = now
+        elapsed = now - self.start
+        if self.loop and elapsed > self.times[-1]:
+            self.start += self.times[-1]
+            self.next = 0
+            elapsed = now - self.start
+
+        index = int(np.searchsorted(self.times, elapsed, side='right')) - 1
+        if index < self.next:
+            return None, None
+        self.next = index + 1
+        x, y = self.points[index]
+        return (float(y), float(x)), self.start + self.times[index]
+
+    def done(self):
+        return not self.loop and self.next >= len(self.times)
+
+
+#redraw as fast as the display allows (swapInterval=1) or as fast as possible (swapInterval=0) until the gaze source
+#is done, the window is closed or duration seconds have passed, returns (frame time stats, latency stats)
+def runInteractive(fov, source, duration=None, swapInterval=1):
+    from OpenGL.GL import glFinish
+
+    fov.context.setSwapInterval(swapInterval)
+    frameTimes = TimingStats()
+    latencies = TimingStats()
+
+    start = last = time.perf_counter()
+    while not source.done():
+        position, timestamp = source.poll()
+        if position is not None:
+            fov.moveGaze(position)
+        fov.draw()
+        #wait until the frame has been swapped, otherwise frames queue up in the driver and add latency
+        glFinish()
+
+        now = time.perf_counter()
+        frameTimes.add(now - last)
+        last = now
+        if timestamp is not None:
+            latencies.add(now - timestamp)
+        if duration is not None and now - start > duration:
+            break
+
+    return frameTimes, latencies
+
+
+def printStats(name, stats):
+    s = stats.summary()
+    if s['count'] == 0:
+        print('{}: no samples'.format(name))
+        return
+    print('{}: {} samples, mean {:.2f} ms, median {:.2f} ms, p95 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms'.format(
+        name, s['count'], s['mean'], s['median'], s['p95'], s['p99'], s['max']))
@@ -0,0 +1,70 @@
+#pyramid 'draft': the coarse levels of JPEG files are decoded at reduced scale instead of being filtered from level 0
+#libjpeg can scale the inverse DCT of each 8x8 block by 1/2, 1/4 and 1/8 (PIL draft mode), which gives levels 1 to 3
+#about as sharp as the 2x2 box filter of glGenerateMipmap for a fraction of the decode time of the full image,
+#all levels are decoded from the file in parallel threads (PIL releases the GIL while decoding), coarser levels are
+#reduced from level 3 like cpu.buildPyramid, images that are not JPEG files get the mipmap levels of the renderers
+#level 0 is always decoded in full, libjpeg decodes the rows of baseline files in sequence and cannot skip regions
+#every scaled decode still reads all the entropy coded data, so on a single core the draft levels only pay off against
+#a pyramid built by numpy (CPU backend) and for large images, smaller files are decoded once like in the mipmap pyramid
+#this module does not import OpenGL
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from .image_utils import imageToArray
+from .pyramid import axisTaps, applyTaps
+
+#coarsest level decoded by DCT scaling (1/8)
+DRAFT_LEVELS = 3
+
+#default number of decoding threads, at most one per level and per core
+DRAFT_THREADS = min(DRAFT_LEVELS + 1, os.cpu_count() or 1)
+
+#smallest image (width*height) whose levels are decoded at reduced scale
+DRAFT_MIN_PIXELS = 1 << 23
+
+
+#True for a PIL image opened from a JPEG file of at least minPixels pixels, whose levels can be decoded at reduced scale
+def isDraftable(img, minPixels=DRAFT_MIN_PIXELS):
+    return (isinstance(img, Image.Image) and img.format == 'JPEG' and bool(getattr(img, 'filename', None))
+            and img.size[0]*img.size[1] >= minPixels)
+
+
+#level of a JPEG file decoded at 1/2^level of its size, as a HxW or HxWxC uint8 array cropped to the level size
+#of glGenerateMipmap (partial blocks at the right and bottom edges are dropped)
+def decodeLevel(filename, level):
+    with Image.open(filename) as img:
+        width, height = img.size
+        shape = (max(1, height >> level), max(1, width >> level))
+        if level > 0:
+            img.draft(img.mode, (shape[1], shape[0]))
+        data = imageToArray(img)
+    if data.shape[:2] != shape:
+        data = np.ascontiguousarray(data[:shape[0], :shape[1]])
+    return data
+
+
+#halve a level like cpu.buildPyramid (bilinear resampling, a 2x2 box filter for even sizes)
+def reduceLevel(data):
+    height, width = data.shape[:2]
+    rowIndices, rowWeights = axisTaps(height, max(1, height//2), 'mipmap')
+    colIndices, colWeights = axisTaps(width, max(1, width//2), 'mipmap')
+    level = applyTaps(applyTaps(data.astype(np.float32), rowIndices, rowWeights, 0), colIndices, colWeights, 1)
+    return np.floor(level + 0.5).astype(np.uint8)
+
+
+#all levels of a JPEG file down to 1x1, levels 0 to DRAFT_LEVELS decoded in parallel by threads (default DRAFT_THREADS)
+def draftPyramid(filename, threads=None):
+    if threads is None:
+        threads = DRAFT_THREADS
+    with Image.open(filename) as img:
+        width, height = img.size
+    count = min(DRAFT_LEVELS, max(width, height).bit_length() - 1) + 1
+    if threads > 1:
+        with ThreadPoolExecutor(min(threads, count)) as pool:
+            levels = list(pool.map(lambda level: decodeLevel(filename, level), range(count)))
+    else:
+        levels = [decodeLevel(filename, level) for level in range(count)]
+    while max(levels[-1].shape[:2]) > 1:
+        levels.append(reduceLevel(levels[-1]))
+    return levels
@@ -0,0 +1,115 @@
+#level of detail and eccentricity maps of a gaze configuration, computed without an image or rendering (no OpenGL dependency)
+#the level of detail only depends on the distance to the gaze point, so the model is evaluated once along a radial
+#profile (PROFILE_STEP pixels apart, up to the image diagonal) and the map is a linear lookup of the distance of every
+#pixel in the profile (a few times faster than evaluating the Geisler&Perry model and within ~1e-3 levels of it),
+#exact=True evaluates the model at every pixel instead, as the fragment shader does, by default models choose (profileLookup)
+#with an outputSize, the maps are computed at the centers of the output pixels mapped into the image (outputScale)
+import math
+import numpy as np
+from .models import createModel, numMipLevels, fixationArrays, combineFixationLods
+
+#distance in pixels between the samples of the radial profile
+PROFILE_STEP = 0.25
+
+
+#outputSize of the renderers as a (width, height) tuple of ints, None renders at the size of the image
+def checkOutputSize(outputSize):
+    if outputSize is None:
+        return None
+    if len(outputSize) != 2 or min(outputSize) < 1:
+        raise ValueError('Expected an output size (width, height) of at least 1x1 pixels, got {!r}'.format(outputSize))
+    return int(outputSize[0]), int(outputSize[1])
+
+
+#image pixels per output pixel (columns, rows) of a width x height image rendered at outputSize (width, height),
+#as set in the pixelScale uniform of the shaders
+def outputScale(width, height, outputSize=None):
+    if outputSize is None:
+        return 1.0, 1.0
+    return width/outputSize[0], height/outputSize[1]
+
+
+#finest level of detail of an image rendered at outputSize: an output pixel covers 2^level image pixels along the
+#axis that is reduced most, as the level a texture unit would choose for the minified quad, 0 for full or larger sizes
+def minificationLod(width, height, outputSize=None):
+    return max(0.0, math.log2(max(outputScale(width, height, outputSize))))
+
+
+#positions of the centers of the pixels along an axis relative to center, in image pixels, the axis has size output
+#pixels covering imageSize image pixels
+def pixelOffsets(imageSize, size, center):
+    if size == imageSize:
+        return np.arange(size, dtype=np.float32) + np.float32(0.5 - center)
+    return (np.arange(size, dtype=np.float32) + np.float32(0.5))*np.float32(imageSize/size) - np.float32(center)
+
+
+#distance of every pixel center to the gaze position (row, column) in pixels, as computed from gl_FragCoord in the shaders,
+#returns a H x W array, or an array of outputSize with the distances of the output pixels in image pixels
+def gazeDistance(width, height, gazePosition, outputSize=None):
+    outWidth, outHeight = (width, height) if outputSize is None else outputSize
+    dx = pixelOffsets(width, outWidth, gazePosition[1])
+    dy = pixelOffsets(height, outHeight, gazePosition[0])
+    return np.hypot(dx[np.newaxis, :], dy[:, np.newaxis])
+
+
+#level of detail of a configured model at distances 0, step, 2*step... up to at least maxDistance, negative levels
+#(finer than the image) and NaN are 0, as the sampler clamps them
+def radialProfile(model, maxDistance, step=PROFILE_STEP):
+    distance = np.arange(math.ceil(maxDistance/step) + 2, dtype=np.float32)*np.float32(step)
+    return np.maximum(np.nan_to_num(np.asarray(model.radialLod(distance), np.float32), nan=0.0, neginf=0.0), 0)
+
+
+#linear lookup of a radial profile at the distance of every pixel to the gaze point (row, column) divided by scale,
+#the value and the slope of the profile samples are packed into complex64, so that both are fetched by one gather
+def lookupProfile(profile, width, height, gazePosition, scale, outputSize=None):
+    samples = np.empty(len(profile) - 1, np.complex64)
+    samples.real = profile[:-1]
+    samples.imag = np.diff(profile)
+    step = np.float32(scale*PROFILE_STEP)
+    outWidth, outHeight = (width, height) if outputSize is None else outputSize
+    dx = pixelOffsets(width, outWidth, gazePosition[1])/step
+    dy = pixelOffsets(height, outHeight, gazePosition[0])/step
+    position = np.sqrt(dx[np.newaxis, :]**2 + dy[:, np.newaxis]**2)
+    index = position.astype(np.intp)
+    sample = np.take(samples, index, mode='clip')
+    position -= index
+    position *= sample.imag
+    position += sample.real
+    return position
+
+
+#level of detail of every pixel of a width x height image as sampled by the renderers (0 is the full resolution,
+#clamped to the coarsest level), model is a FoveationModel or a name from MODELS created with parameters
+#(e.g. gazeRadius, viewDist, pix2deg) and configured for the image size, gazePosition, scales, weights and mode
+#combine several gaze points as in GLRenderer.moveGaze and setFixationMode, default: the image center
+#returns a H x W float32 array, or an array of outputSize (width, height) for a renderer with that outputSize, where
+#distances stay in image pixels and the level of detail is at least minificationLod
+def lodMap(model, width, height, gazePosition=None, scales=None, weights=None, mode='min', exact=None, outputSize=None, **parameters):
+    model = createModel(model, **parameters)
+    model.configure(width, height)
+    points, scales, weights = fixationArrays((height/2, width/2) if gazePosition is None else gazePosition, scales, weights)
+
+    if exact or (exact is None and not model.profileLookup):
+        lods = [model.radialLod(gazeDistance(width, height, point, outputSize)/scale) for point, scale in zip(points, scales)]
+    else:
+        #the farthest pixel of any gaze point inside the image is at most one diagonal away
+        maxDistance = max(math.hypot(max(abs(col), abs(width - col)), max(abs(row), abs(height - row)))/scale
+                          for (row, col), scale in zip(points, scales))
+        profile = radialProfile(model, maxDistance)
+        lods = [lookupProfile(profile, width, height, point, scale, outputSize) for point, scale in zip(points, scales)]
+    maxLevel = numMipLevels(width, height) - 1
+    lod = combineFixationLods(lods, weights, mode)
+    minLevel = minificationLod(width, height, outputSize)
+    return np.clip(np.nan_to_num(lod, nan=0.0, neginf=0.0, posinf=maxLevel), minLevel, maxLevel).astype(np.float32)
+
+
+#eccentricity of every pixel in degrees of visual angle, for models with a viewing geometry (e.g. gp), returns a H x W float32 array
+#(or of outputSize, as lodMap)
+def eccentricityMap(model, width, height, gazePosition=None, outputSize=None, **parameters):
+    model = createModel(model, **parameters)
+    if not hasattr(model, 'eccentricity'):
+        raise ValueError('The {} model has no viewing geometry'.format(model.name))
+    model.configure(width, height)
+    if gazePosition is None:
+        gazePosition = (height/2, width/2)
+    return np.asarray(model.eccentricity(gazeDistance(width, height, gazePosition, outputSize)), np.float32)
@@ -0,0 +1,175 @@
+#Foveation models, used by the OpenGL and the CPU renderers
+#a model defines the level of detail (mipmap level) as a function of the distance to the gaze point in pixels,
+#once in GLSL for the fragment shader (lodFunction) and once in numpy (radialLod) for the CPU renderer and LOD tables
+#new models subclass FoveationModel and are added to MODELS, this module does not import OpenGL
+import math
+import numpy as np
+
+#constants from Geisler & Perry
+PI = 3.14159265359
+EPSILON2 = 2.3
+ALPHA = 0.106
+CTO = 0.015625
+
+
+def computeDotPitch(pix2deg=32, viewDist=0.6, imgWidth=1024):
+    inputSizeDeg = imgWidth/pix2deg
+    imgWidth_m = 2*viewDist*math.tan((inputSizeDeg*math.pi/180)/2)
+    dotPitch = imgWidth_m/imgWidth
+    return dotPitch
+
+
+def numMipLevels(width, height):
+    return 1+math.floor(math.log2(max(width, height)))
+
+
+class FoveationModel:
+    name = None
+    #constructor arguments, createModel passes only these
+    parameters = []
+    #GLSL declarations of the model uniforms and of float radialLod(float distance)
+    lodFunction = None
+    #level of detail maps (lodmap.py) look radialLod up in a radial profile instead of evaluating it per pixel
+    profileLookup = True
+
+    #called for every new image, before uniforms()
+    def configure(self, width, height):
+        self.width, self.height = width, height
+
+    #uniform name -> tuple of floats, set in the shader whenever an image is loaded or a parameter changes
+    def uniforms(self):
+        return {}
+
+    #numpy version of lodFunction for an array of distances in pixels
+    def radialLod(self, distance):
+        raise NotImplementedError
+
+    #everything the level of detail depends on, LOD tables are cached by this key
+    def key(self):
+        return (self.name,) + tuple(sorted(self.uniforms().items()))
+
+
+#level of detail is log2 of the distance in units of the fovea radius (shaders adapted from BlurredMipmapDemo in PsychToolBox)
+class ClassicModel(FoveationModel):
+    name = 'classic'
+    parameters = ['gazeRadius']
+    #log2 per pixel is cheaper than the lookup
+    profileLookup = False
+    lodFunction = """
+    uniform float gazeRadius;
+
+    float radialLod(float distance)
+    {
+        return log2(distance/gazeRadius);
+    }
+    """
+
+    def __init__(self, gazeRadius=25):
+        self.gazeRadius = gazeRadius
+
+    def uniforms(self):
+        return {'gazeRadius': (float(self.gazeRadius),)}
+
+    def radialLod(self, distance):
+        with np.errstate(divide='ignore'):
+            return np.log2(np.asarray(distance, np.float32)/np.float32(self.gazeRadius))
+
+
+#Geisler & Perry foveation transform adapted from https://github.com/dicarlolab/foveate/blob/master/foveate.m
+#dotPitch (meters per pixel) is derived from pix2deg and viewDist for every image, as the image width changes
+class GeislerPerryModel(FoveationModel):
+    name = 'gp'
+    parameters = ['dotPitch', 'viewDist', 'pix2deg']
+    lodFunction = """
+    uniform vec3 viewParameters; //dotPitch, viewDist and numLevels
+
+    float radialLod(float distance)
+    {
+        const float PI = 3.14159265359;
+        const float EPSILON2 = 2.3; //constant from Geisler & Perry
+        const float ALPHA = 0.106; //constant from Geisler & Perry
+        const float CTO = 0.015625; //constant from Geisler & Perry
+
+        float dotPitch = viewParameters[0];
+        float viewDist = viewParameters[1];
+        float numLevels = viewParameters[2];
+
+        float eradius = distance*dotPitch;
+        float ec = 180*atan(eradius/viewDist)/PI;
+        float eyefreqCones = EPSILON2/(ALPHA*(ec+EPSILON2))*log(1/CTO);
+        float maxfreq = PI/((atan((eradius+dotPitch)/viewDist) - atan((eradius-dotPitch)/viewDist))*180);
+        return max(0, min(numLevels, maxfreq/eyefreqCones));
+    }
+    """
+
+    def __init__(self, dotPitch=-1, viewDist=0.6, pix2deg=32):
+        self.dotPitch = dotPitch
+        self.viewDist = viewDist
+        self.pix2deg = pix2deg
+        self.numLevels = 0
+
+    def configure(self, width, height):
+        FoveationModel.configure(self, width, height)
+        self.numLevels = numMipLevels(width, height)
+        self.dotPitch = computeDotPitch(pix2deg=self.pix2deg, viewDist=self.viewDist, imgWidth=width)
+
+    def uniforms(self):
+        return {'viewParameters': (float(self.dotPitch), float(self.viewDist), float(self.numLevels))}
+
+    #eccentricity in degrees of visual angle at a distance in pixels from the gaze point
+    def eccentricity(self, distance):
+        eradius = np.asarray(distance, np.float32)*np.float32(self.dotPitch)
+        return 180*np.arctan(eradius/np.float32(self.viewDist))/np.float32(PI)
+
+    def radialLod(self, distance):
+        dotPitch = np.float32(self.dotPitch)
+        viewDist = np.float32(self.viewDist)
+        eradius = np.asarray(distance, np.float32)*dotPitch
+        ec = self.eccentricity(distance)
+        eyefreqCones = np.float32(EPSILON2/ALPHA)/(ec + np.float32(EPSILON2))*np.float32(math.log(1/CTO))
+        maxfreq = np.float32(PI)/((np.arctan((eradius + dotPitch)/viewDist) - np.arctan((eradius - dotPitch)/viewDist))*180)
+        return np.clip(maxfreq/eyefreqCones, 0, self.numLevels)
+
+
+MODELS = {'classic': ClassicModel, 'gp': GeislerPerryModel}
+
+#maximum number of gaze points combined in one pass (size of the gaze uniform array of the shader)
+MAX_FIXATIONS = 16
+
+#min: every pixel gets the finest level of detail over the fixations,
+#blend: the weighted mean of the resolutions (2^-lod) of the fixations
+FIXATION_MODES = ['min', 'blend']
+
+
+#gaze points of moveGaze as N x 2 (row, column) array, with a distance scale and a weight per point, gazePosition is
+#one (row, column) pair or a sequence of them, scales and weights are None (1), one value or one value per point,
+#the distance to a point is divided by its scale, so a scale of 2 doubles the size of its fovea
+def fixationArrays(gazePosition, scales=None, weights=None):
+    points = np.asarray(gazePosition, np.float64).reshape(-1, 2)
+    if not 1 <= len(points) <= MAX_FIXATIONS:
+        raise ValueError('Expected 1 to {} gaze points, got {}'.format(MAX_FIXATIONS, len(points)))
+    scales = np.broadcast_to(np.asarray(1 if scales is None else scales, np.float32), (len(points),))
+    weights = np.broadcast_to(np.asarray(1 if weights is None else weights, np.float32), (len(points),))
+    return points, scales, weights
+
+
+#combine the levels of detail of the fixations (one array per fixation) as the fragment shader does
+def combineFixationLods(lods, weights, mode='min'):
+    if mode not in FIXATION_MODES:
+        raise ValueError('Unknown fixation mode {!r}, expected one of {}'.format(mode, ', '.join(FIXATION_MODES)))
+    if len(lods) == 1:
+        return lods[0]
+    if mode == 'min':
+        return np.minimum.reduce(lods)
+    resolution = sum(weight*np.exp2(-np.maximum(lod, 0)) for lod, weight in zip(lods, weights))
+    return -np.log2(resolution/np.float32(sum(weights)))
+
+
+#create a model by name, parameters that the model does not use are ignored (e.g. gazeRadius for gp)
+def createModel(model='classic', **parameters):
+    if isinstance(model, FoveationModel):
+        return model
+    if model not in MODELS:
+        raise ValueError('Unknown model {!r}, expected one of {}'.format(model, ', '.join(MODELS)))
+    cls = MODELS[model]
+    return cls(**{k: v for k, v in parameters.items() if k in cls.parameters})
@@ -0,0 +1,182 @@
+#Batch driver that foveates large (optionally recursive) image directories with a pool of worker processes
+#every worker owns its own renderer (headless OpenGL context or the CPU backend) and hands the rendered images
+#to a writer thread through a bounded queue, so that decoding, rendering and encoding overlap
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from os import listdir, makedirs, walk
+from os.path import join, exists, relpath, dirname
+
+import numpy as np
+
+from .image_utils import writeImage
+from .pyramid import checkPyramid
+from .gl_context import BACKENDS
+from . import createRenderer
+
+IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'bmp', 'png', 'gif']
+
+#seconds between checks for workers that exited without posting their statistics
+RESULT_POLL = 1.0
+
+
+#image paths relative to inputDir, sorted, including subdirectories if recursive
+def listImages(inputDir, recursive=False):
+    if not recursive:
+        return sorted(f for f in listdir(inputDir) if any(f.endswith(ext) for ext in IMAGE_EXTENSIONS))
+    images = []
+    for root, dirs, files in walk(inputDir):
+        dirs.sort()
+        for f in sorted(files):
+            if any(f.endswith(ext) for ext in IMAGE_EXTENSIONS):
+                images.append(relpath(join(root, f), inputDir))
+    return images
+
+
+#statistics of a worker, error describes why it stopped early (None if it finished its tasks)
+def workerStats(workerId, pid, error=None):
+    return {'worker': workerId, 'pid': pid, 'images': 0, 'failed': 0, 'init': 0.0, 'load': 0.0, 'render': 0.0, 'write': 0.0,
+            'wall': 0.0, 'error': error}
+
+
+#worker process: takes (input, output) paths from tasks until it gets None and puts its timing statistics in results,
+#also when creating the renderer or rendering fails, so that runPool never waits for a worker that is gone
+def worker(workerId, options, tasks, results):
+    stats = workerStats(workerId, os.getpid())
+    start = time.perf_counter()
+    try:
+        foveateTasks(options, tasks, stats, start)
+    except Exception as err:
+        stats['error'] = '{}: {}'.format(type(err).__name__, err)
+        print('ERROR: Worker {} failed: {}'.format(workerId, stats['error']))
+    stats['wall'] = time.perf_counter() - start
+    results.put(stats)
+
+
+def foveateTasks(options, tasks, stats, start):
+    #OpenGL is only imported by workers that use it
+    fov = createRenderer(options['model'], backend=options['backend'], gazePosition=options['gazePosition'],
+                         gazeRadius=options['gazeRadius'], viewDist=options['viewDist'], pix2deg=options['pix2deg'],
+                         pyramid=options['pyramid'], cache=options['cacheDir'])
+    stats['init'] = time.perf_counter() - start
+
+    pending = queue.Queue(maxsize=options['queueSize'])
+
+    def writeLoop():
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            filename, frame = item
+            writeStart = time.perf_counter()
+            try:
+                writeImage(filename, frame)
+            except Exception as err:
+                print('ERROR: Failed to write {}: {}'.format(filename, err))
+                stats['failed'] += 1
+            stats['write'] += time.perf_counter() - writeStart
+
+    #frames passed to the writer may be views of mapped pixel buffers, so they are copied before being queued
+    #put blocks while the queue is full, which bounds the memory used by images waiting to be written
+    def enqueue(filename, frame):
+        pending.put((filename, np.ascontiguousarray(frame)))
+
+    writer = threading.Thread(target=writeLoop)
+    writer.start()
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            inputPath, outputPath = task
+            try:
+                loadStart = time.perf_counter()
+                #(-1, -1) means the center of every image, not of the first one
+                fov.gazePosition = options['gazePosition']
+                fov.loadImgFromFile(imgFilename=inputPath)
+                renderStart = time.perf_counter()
+                fov.run()
+                fov.saveImageAsync(outputPath, writer=enqueue)
+                stats['load'] += renderStart - loadStart
+                stats['render'] += time.perf_counter() - renderStart
+                stats['images'] += 1
+            except Exception as err:
+                print('ERROR: Failed to foveate {}: {}'.format(inputPath, err))
+                stats['failed'] += 1
+
+        fov.flushImages(writer=enqueue)
+    finally:
+        pending.put(None)
+        writer.join()
+    if options['backend'] != 'cpu':
+        fov.context.terminate()
+
+
+#foveate inputDir into outputDir with numWorkers processes, returns the statistics of all workers
+def runPool(inputDir, outputDir, options, numWorkers=None, recursive=False, resume=False):
+    if numWorkers is None:
+        numWorkers = os.cpu_count() or 1
+    #invalid options would make every worker fail after it has started
+    checkPyramid(options['pyramid'])
+    if options['backend'] not in ['auto', 'cpu'] + BACKENDS:
+        raise ValueError('Unknown backend {!r}, expected one of {}'.format(options['backend'], ', '.join(['auto', 'cpu'] + BACKENDS)))
+
+    images = listImages(inputDir, recursive)
+    tasks = [(join(inputDir, img), join(outputDir, img)) for img in images]
+    skipped = 0
+    if resume:
+        remaining = [t for t in tasks if not exists(t[1])]
+        skipped = len(tasks) - len(remaining)
+        tasks = remaining
+
+    for outputSubdir in set(dirname(t[1]) for t in tasks):
+        makedirs(outputSubdir, exist_ok=True)
+
+    numWorkers = max(1, min(numWorkers, len(tasks)))
+    #spawn gives every worker a fresh interpreter, OpenGL state must not be inherited through fork
+    ctx = multiprocessing.get_context('spawn')
+    taskQueue = ctx.Queue()
+    resultQueue = ctx.Queue()
+    for task in tasks:
+        taskQueue.put(task)
+    for i in range(numWorkers):
+        taskQueue.put(None)
+
+    start = time.perf_counter()
+    workers = [ctx.Process(target=worker, args=(i, options, taskQueue, resultQueue)) for i in range(numWorkers)]
+    for w in workers:
+        w.start()
+    stats = {}
+    while len(stats) < numWorkers:
+        try:
+            s = resultQueue.get(timeout=RESULT_POLL)
+            stats[s['worker']] = s
+        except queue.Empty:
+            #a worker that was killed or crashed in native code exits without statistics, the results of
+            #workers that exited normally are already in the queue
+            for i, w in enumerate(workers):
+                if i not in stats and w.exitcode is not None and resultQueue.empty():
+                    stats[i] = workerStats(i, w.pid, 'exited with code {}'.format(w.exitcode))
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    stats = [stats[i] for i in sorted(stats)]
+    return {'workers': stats, 'images': sum(s['images'] for s in stats), 'failed': sum(s['failed'] for s in stats),
+            'errors': sum(s['error'] is not None for s in stats), 'skipped': skipped, 'elapsed': elapsed}
+
+
+def printReport(report):
+    for s in report['workers']:
+        if s['error'] is not None:
+            print('worker {} (pid {}): stopped after {} images, {}'.format(s['worker'], s['pid'], s['images'], s['error']))
+            continue
+        rate = s['images']/s['wall'] if s['wall'] > 0 else 0
+        print('worker {} (pid {}): {} images, {:.2f} images/s, init {:.2f}s, load {:.2f}s, render {:.2f}s, write {:.2f}s'.format(
+            s['worker'], s['pid'], s['images'], rate, s['init'], s['load'], s['render'], s['write']))
+    rate = report['images']/report['elapsed'] if report['elapsed'] > 0 else 0
+    print('total: {} images in {:.2f}s, {:.2f} images/s ({} failed, {} skipped, {} workers stopped early)'.format(
+        report['images'], report['elapsed'], rate, report['failed'], report['skipped'], report['errors']))
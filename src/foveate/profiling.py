@@ -0,0 +1,80 @@
+#timers of the pipeline stages of the renderers, enabled with setInstrumentation(callback) (no OpenGL dependency)
+#callback(stage, seconds, info) is called once per timed stage, info holds the input image (filename or None),
+#its width and height and the clock: 'cpu' is the wall time of the Python call (perf_counter), 'gpu' the time the GPU
+#spent on the commands of the stage (GL_TIME_ELAPSED query), gpu times are reported once the query result is available
+import time
+
+#decode: image file to pixels, upload: pixels to texture level 0, mipmap: pyramid levels, draw: foveation pass,
+#readback: pixels of the rendered frame to memory, encode: frame to image file
+STAGES = ['decode', 'upload', 'mipmap', 'draw', 'readback', 'encode']
+
+
+#stage of a renderer without instrumentation
+class NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_STAGE = NullStage()
+
+
+class CPUStage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.report(self.name, time.perf_counter() - self.start, 'cpu')
+        return False
+
+
+#gpuTimer has begin(tag), end() and collect(callback(tag, seconds), wait), see gl_utils.QueryTimer
+class GPUStage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.gpuTimer.begin((self.name, dict(self.profiler.info)))
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.gpuTimer.end()
+        return False
+
+
+class Profiler:
+    def __init__(self, callback, gpuTimer=None):
+        self.callback = callback
+        self.gpuTimer = gpuTimer
+        self.info = {'image': None, 'width': 0, 'height': 0}
+
+    #describe the image the following stages work on
+    def setImage(self, image, width, height):
+        self.info = {'image': image, 'width': width, 'height': height}
+
+    #context manager timing the stage, with the gpu timer if gpu is True and there is one
+    def stage(self, name, gpu=False):
+        self.poll()
+        if gpu and self.gpuTimer is not None:
+            return GPUStage(self, name)
+        return CPUStage(self, name)
+
+    def report(self, name, seconds, clock, info=None):
+        info = dict(self.info if info is None else info)
+        info['clock'] = clock
+        self.callback(name, seconds, info)
+
+    #report the gpu times that are available, all of them if wait is True
+    def poll(self, wait=False):
+        if self.gpuTimer is not None:
+            self.gpuTimer.collect(lambda tag, seconds: self.report(tag[0], seconds, 'gpu', tag[1]), wait)
+
+    def flush(self):
+        self.poll(wait=True)
@@ -0,0 +1,98 @@
+#Gaussian image pyramids in numpy, the reference for the GPU pyramid builder (gl_utils.PyramidBuilder)
+#and its fallback when a texture format cannot be rendered to, this module does not import OpenGL
+#every level is reduced from the previous one first along the rows, then along the columns, with the 6-tap binomial
+#filter (1 5 10 10 5 1)/32 centered between two texels (a Gaussian with sigma ~1.1 texels of the finer level),
+#texels outside the image are clamped to the edge and the level sizes are those of glGenerateMipmap
+from os.path import join
+import numpy as np
+
+#pyramid of the renderers: glGenerateMipmap (driver dependent, usually a 2x2 box filter), Gaussian, Gaussian
+#with coarse levels expanded by a cubic B-spline when blending between levels, as in Laplacian pyramid reconstruction,
+#or mipmap levels of JPEG files decoded at reduced scale (see jpeg.py)
+PYRAMIDS = ['mipmap', 'gaussian', 'laplacian', 'draft']
+
+#pyramids with Gaussian levels, the others have mipmap levels
+GAUSSIAN_PYRAMIDS = ['gaussian', 'laplacian']
+
+GAUSSIAN_WEIGHTS = np.array([1, 5, 10, 10, 5, 1], np.float32)/32
+
+
+def checkPyramid(pyramid):
+    if pyramid not in PYRAMIDS:
+        raise ValueError('Unknown pyramid {!r}, expected one of {}'.format(pyramid, ', '.join(PYRAMIDS)))
+
+
+#reduce float32 data by 2 (rounded down, at least 1) along axis, texel i of the result is centered
+#between texels 2i and 2i+1 of data
+def reduceAxis(data, axis):
+    size = data.shape[axis]
+    newSize = max(1, size//2)
+    output = np.zeros(data.shape[:axis] + (newSize,) + data.shape[axis + 1:], np.float32)
+    for k, weight in enumerate(GAUSSIAN_WEIGHTS):
+        index = np.clip(2*np.arange(newSize) + k - 2, 0, size - 1)
+        output += weight*np.take(data, index, axis=axis)
+    return output
+
+
+#Gaussian pyramid of a HxW or HxWxC uint8 image down to 1x1, levels are stored as 8-bit like the textures
+def gaussianPyramid(img_data):
+    pyramid = [img_data]
+    while max(pyramid[-1].shape[:2]) > 1:
+        level = reduceAxis(pyramid[-1].astype(np.float32), axis=1)
+        level = reduceAxis(level, axis=0)
+        pyramid.append(np.floor(level + 0.5).astype(np.uint8))
+    return pyramid
+
+
+#texels of the finer level and their weights for every texel of a level reduced from size to newSize texels along
+#one axis, as N x K index and weight arrays: the bilinear resampling of cpu.buildPyramid for 'mipmap'
+#and the binomial filter of reduceAxis for 'gaussian'
+def axisTaps(size, newSize, kind):
+    if kind == 'mipmap':
+        coords = (np.arange(newSize, dtype=np.float32) + 0.5)*(size/newSize) - 0.5
+        i0 = np.floor(coords)
+        weights = coords - i0
+        i0 = np.clip(i0.astype(np.intp), 0, size - 1)
+        i1 = np.minimum(i0 + 1, size - 1)
+        return np.stack([i0, i1], axis=1), np.stack([1 - weights, weights], axis=1)
+    indices = np.stack([np.clip(2*np.arange(newSize) + k - 2, 0, size - 1) for k in range(len(GAUSSIAN_WEIGHTS))], axis=1)
+    return indices, np.broadcast_to(GAUSSIAN_WEIGHTS, indices.shape)
+
+
+#sum of the taps along axis of float32 data, indices are relative to the first texel of data
+def applyTaps(data, indices, weights, axis):
+    shape = [1]*data.ndim
+    shape[axis] = -1
+    output = 0
+    for k in range(indices.shape[1]):
+        output = output + np.take(data, indices[:, k], axis=axis)*weights[:, k].reshape(shape)
+    return output
+
+
+#build the levels of a pyramid below level0 (HxWx3 uint8, e.g. memory mapped) out of core: every level is computed
+#in strips of rows of at most about stripBytes of float data and written to a memory mapped file levelN.npy
+#in directory, kind 'mipmap' gives the levels of cpu.buildPyramid and 'gaussian' those of gaussianPyramid
+#returns all levels including level0
+def buildPyramidFiles(level0, kind, directory, stripBytes=64*2**20):
+    levels = [level0]
+    while max(levels[-1].shape[:2]) > 1:
+        source = levels[-1]
+        height, width, channels = source.shape
+        newHeight, newWidth = max(1, height//2), max(1, width//2)
+        level = np.lib.format.open_memmap(join(directory, 'level{}.npy'.format(len(levels))), 'w+', np.uint8, (newHeight, newWidth, channels))
+        rowIndices, rowWeights = axisTaps(height, newHeight, kind)
+        colIndices, colWeights = axisTaps(width, newWidth, kind)
+        stripRows = max(1, stripBytes//(width*channels*4*(rowIndices.shape[1] + 1)))
+        for start in range(0, newHeight, stripRows):
+            indices = rowIndices[start:start + stripRows]
+            first = indices.min()
+            strip = np.asarray(source[first:indices.max() + 1], np.float32)
+            #same order of the axes as cpu.buildPyramid and gaussianPyramid, so that the levels are identical
+            if kind == 'mipmap':
+                strip = applyTaps(applyTaps(strip, indices - first, rowWeights[start:start + stripRows], 0), colIndices, colWeights, 1)
+            else:
+                strip = applyTaps(applyTaps(strip, colIndices, colWeights, 1), indices - first, rowWeights[start:start + stripRows], 0)
+            level[start:start + len(indices)] = np.floor(strip + 0.5).astype(np.uint8)
+        level.flush()
+        levels.append(level)
+    return levels
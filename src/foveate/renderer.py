@@ -0,0 +1,860 @@
+#OpenGL renderer shared by all foveation models: the image is uploaded as a mipmapped texture and a full screen quad
+#is drawn with a fragment shader that samples the texture at the level of detail given by the model
+#(see models.py) for the distance of every pixel to the gaze point
+#importing this module imports OpenGL, the PyOpenGL platform is selected for the default backend first
+from . import gl_context
+gl_context.configurePlatform() #has to be done before OpenGL is imported
+from OpenGL.GL import *
+import OpenGL.GL.shaders
+import numpy as np
+from PIL import Image
+import ctypes
+import math
+import time
+from .gl_utils import ResourcePool, StackedTarget, PBOReader, PyramidBuilder, QueryTimer, BATCH_MAX_PIXELS, TEXTURE_FORMATS
+from .gl_utils import readTextureArray, readLevels, uploadLevels, channelCount, mipLevels
+from .image_utils import imageSize, imageToArray, arrayToRGB, writeImage
+from .pyramid import checkPyramid, gaussianPyramid, GAUSSIAN_PYRAMIDS
+from .jpeg import isDraftable, draftPyramid
+from .models import ClassicModel, GeislerPerryModel, MAX_FIXATIONS, FIXATION_MODES, fixationArrays
+from .lodmap import lodMap, radialProfile, checkOutputSize, outputScale, minificationLod
+from .incremental import IncrementalState, LOD_TOLERANCE
+from .profiling import Profiler, NULL_STAGE
+from .cache import PyramidCache, fileDigest, arrayDigest
+
+
+#shaders below are adapted from BlurredMipmapDemo in PsychToolBox
+#(C) 2012 Mario Kleiner - Licensed under MIT license.
+
+vertex_shader = """
+    #version 330
+    layout(location = 0) in vec3 position;
+    layout(location = 1) in vec3 color;
+    layout(location = 2) in vec2 inTexCoords;
+
+    out vec2 outTexCoords;
+    uniform bool flipRows; //draw the image upside down, so that it is read back with the top row first
+
+    void main()
+    {
+        gl_Position = vec4(position.x, flipRows ? -position.y : position.y, position.z, 1.0f);
+        outTexCoords = inTexCoords;
+    }
+    """
+
+#LOD_FUNCTION is replaced by the lodFunction of the model or by table_lod_function,
+#SAMPLE_FUNCTION by the function sampling the pyramid at a level of detail
+fragment_shader = """
+    #version 330
+    in vec2 outTexCoords;
+
+    out vec4 outColor;
+    uniform sampler2D imageTex;
+    uniform vec4 gazePoints[MAX_FIXATIONS]; //gaze positions in window coordinates, distance scale and weight of the fixations
+    uniform int gazeCount;
+    uniform bool blendFixations; //weighted mean of the resolutions of the fixations instead of the finest level
+    uniform vec2 pixelScale; //image pixels per output pixel, gl_FragCoord is converted to image pixels
+    uniform float minLod; //finest level of detail the output resolution can show (minificationLod)
+
+    LOD_FUNCTION
+
+    SAMPLE_FUNCTION
+
+    float fixationLod(int i)
+    {
+        return radialLod(distance(gl_FragCoord.xy*pixelScale, gazePoints[i].xy)/gazePoints[i].z);
+    }
+
+    void main()
+    {
+        float lod = fixationLod(0);
+        if (blendFixations && gazeCount > 1)
+        {
+            float resolution = 0.0;
+            float weights = 0.0;
+            for (int i = 0; i < gazeCount; i++)
+            {
+                resolution += gazePoints[i].w*exp2(-max(fixationLod(i), 0.0));
+                weights += gazePoints[i].w;
+            }
+            lod = -log2(resolution/weights);
+        }
+        else
+        {
+            for (int i = 1; i < gazeCount; i++)
+                lod = min(lod, fixationLod(i));
+        }
+        outColor = samplePyramid(outTexCoords, max(lod, minLod));
+    }
+    """.replace('MAX_FIXATIONS', str(MAX_FIXATIONS))
+
+#trilinear filtering between the two nearest levels (pyramid 'mipmap' and 'gaussian')
+linear_sample_function = """
+    vec4 samplePyramid(vec2 texCoords, float lod)
+    {
+        return textureLod(imageTex, texCoords, lod);
+    }
+    """
+
+#pyramid 'laplacian': levels 1 and up are expanded to the image resolution with a cubic B-spline (close to the
+#Gaussian expand of a Laplacian pyramid) instead of bilinearly before blending, level 0 is sampled at its texel centers
+#texels are fetched without filtering and level sizes are derived from level 0, so that the result does not depend
+#on how the driver filters or handles levels that differ between neighbouring pixels
+laplacian_sample_function = """
+    uniform float maxLevel;
+
+    //cubic B-spline interpolation of a level, wrapped at the edges as GL_REPEAT
+    vec4 sampleCubic(vec2 texCoords, int level)
+    {
+        ivec2 size = max(textureSize(imageTex, 0) >> level, ivec2(1));
+        vec2 p = texCoords*vec2(size) - 0.5;
+        vec2 i = floor(p);
+        vec2 f = p - i;
+        vec2 weights[4] = vec2[]((1.0 - f)*(1.0 - f)*(1.0 - f)/6.0,
+                                 (4.0 - 6.0*f*f + 3.0*f*f*f)/6.0,
+                                 (1.0 + 3.0*f + 3.0*f*f - 3.0*f*f*f)/6.0,
+                                 f*f*f/6.0);
+        vec4 sum = vec4(0.0);
+        for (int y = 0; y < 4; y++)
+            for (int x = 0; x < 4; x++)
+                sum += weights[x].x*weights[y].y*texelFetch(imageTex, (ivec2(i) + ivec2(x - 1, y - 1) + size) % size, level);
+        return sum;
+    }
+
+    vec4 samplePyramid(vec2 texCoords, float lod)
+    {
+        lod = clamp(lod, 0.0, maxLevel);
+        int level = int(lod);
+        vec4 fine = level == 0 ? texelFetch(imageTex, ivec2(texCoords*vec2(textureSize(imageTex, 0))), 0) : sampleCubic(texCoords, level);
+        if (float(level) == maxLevel)
+            return fine;
+        return mix(fine, sampleCubic(texCoords, level + 1), lod - float(level));
+    }
+    """
+
+#level of detail read from a precomputed radial table (lodMode='table'),
+#entry i of lodTex holds the level of detail at a distance of i pixels from the gaze point
+#with llvmpipe this is about 3 times slower than evaluating the model per pixel (benchmarks/bench_lod.py), so 'shader'
+#stays the default, a uniform buffer table and texelFetch were not faster either
+table_lod_function = """
+    uniform sampler1D lodTex;
+    uniform float lodTableSize;
+
+    float radialLod(float distance)
+    {
+        return texture(lodTex, (distance + 0.5)/lodTableSize).r;
+    }
+    """
+
+LOD_MODES = ['shader', 'table']
+
+#maximum number of images rendered by one draw call of foveate_array, size of the gaze array in the uniform buffer
+ARRAY_MAX_LAYERS = 256
+
+#shaders of foveate_array: the quad is drawn once per image with instancing, the geometry shader sends every
+#instance to its layer of the layered target and the fragment shader reads the gaze position of the layer
+#from a uniform buffer and samples the same layer of the image texture array
+array_vertex_shader = """
+    #version 330
+    layout(location = 0) in vec3 position;
+    layout(location = 2) in vec2 inTexCoords;
+
+    out vec2 vertexTexCoords;
+    flat out int vertexLayer;
+
+    void main()
+    {
+        gl_Position = vec4(position, 1.0f);
+        vertexTexCoords = inTexCoords;
+        vertexLayer = gl_InstanceID;
+    }
+    """
+
+array_geometry_shader = """
+    #version 330
+    layout(triangles) in;
+    layout(triangle_strip, max_vertices = 3) out;
+
+    in vec2 vertexTexCoords[];
+    flat in int vertexLayer[];
+    out vec2 outTexCoords;
+    flat out int layer;
+
+    void main()
+    {
+        for (int i = 0; i < 3; i++)
+        {
+            gl_Position = gl_in[i].gl_Position;
+            gl_Layer = vertexLayer[i];
+            outTexCoords = vertexTexCoords[i];
+            layer = vertexLayer[i];
+            EmitVertex();
+        }
+        EndPrimitive();
+    }
+    """
+
+array_fragment_shader = """
+    #version 330
+    in vec2 outTexCoords;
+    flat in int layer;
+
+    out vec4 outColor;
+    uniform sampler2DArray imageTex;
+    uniform vec2 pixelScale;
+    uniform float minLod;
+    layout(std140) uniform LayerParameters
+    {
+        vec4 layerGaze[MAX_LAYERS]; //gaze position of every layer in window coordinates of the image
+    };
+
+    LOD_FUNCTION
+
+    void main()
+    {
+        float lod = radialLod(distance(gl_FragCoord.xy*pixelScale, layerGaze[layer].xy));
+        outColor = textureLod(imageTex, vec3(outTexCoords, layer), max(lod, minLod));
+    }
+    """.replace('MAX_LAYERS', str(ARRAY_MAX_LAYERS))
+
+
+class GLRenderer:
+
+    #model is a FoveationModel, lodMode is 'shader' (level of detail computed per pixel by the model's lodFunction)
+    #or 'table' (looked up in a radial table computed once per model configuration)
+    #pyramid is 'mipmap' (glGenerateMipmap), 'gaussian' (built on the GPU, see pyramid.py), 'laplacian'
+    #(gaussian, with coarse levels expanded by a cubic B-spline before blending) or 'draft' (coarse levels of JPEG
+    #files decoded at reduced scale, see jpeg.py, glGenerateMipmap for other images)
+    #cache is a PyramidCache or its directory, loaded images and their pyramid levels are then read from it
+    #instead of being decoded and built again (see cache.py)
+    #outputSize (width, height) renders every image at that resolution instead of its own (see setOutputSize)
+    def __init__(self, model, gazePosition=(-1, -1), visualize = True, backend = 'auto', lodMode = 'shader', pyramid = 'mipmap', cache = None,
+                 outputSize = None):
+        if lodMode not in LOD_MODES:
+            raise ValueError('Unknown lodMode {}, use shader or table'.format(lodMode))
+        checkPyramid(pyramid)
+        self.model = model
+        self.outputSize = checkOutputSize(outputSize)
+        self.pixelScale = (1.0, 1.0)
+        self.gazePosition = gazePosition
+        self.fixations = fixationArrays(gazePosition)
+        self.lodMode = lodMode
+        self.pyramid = pyramid
+        self.pyramidBuilder = None
+        self.cache = PyramidCache(cache) if isinstance(cache, str) else cache
+        self.imgDigest = None
+
+        self.visualize = visualize
+        self.backend = backend
+        self.batchTarget = None
+        self.reader = None
+        self.arrayShader = None
+        self.profiler = None
+        self.sink = None
+        self.incremental = None
+        self.frame = None
+
+        self.initContext()
+        self.initBuffers()
+
+    #create the OpenGL context, a GLFW window (hidden if no visualization is needed) or a headless EGL/OSMesa context
+    def initContext(self):
+        self.context = gl_context.createContext(self.backend, 1024, 980, visible=self.visualize)
+        self.backend = self.context.name
+
+    def initBuffers(self):
+        # Below is the code with coordinates for textured quad, these are fixed
+        #          positions        colors        texture coords
+        quad = [   -1, -1, 0.0,  1.0, 0.0, 0.0,  0.0, 1.0,
+                    1, -1, 0.0,  0.0, 1.0, 0.0,  1.0, 1.0,
+                    1,  1, 0.0,  0.0, 0.0, 1.0,  1.0, 0.0,
+                   -1,  1, 0.0,  1.0, 1.0, 1.0,  0.0, 0.0]
+
+        quad = np.array(quad, dtype = np.float32)
+
+        indices = [0, 1, 2,
+                   2, 3, 0]
+        indices = np.array(indices, dtype= np.uint32)
+
+        #vertex array object is required by core profile contexts (EGL, OSMesa)
+        self.VAO = glGenVertexArrays(1)
+        glBindVertexArray(self.VAO)
+
+        #(program, uniform name) -> location, filled on first use
+        self.uniformLocs = {}
+        self.shader = self.compileProgram(vertex_shader, fragment_shader)
+        #model key -> (texture, size)
+        self.lodTables = {}
+
+        VBO = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, VBO)
+        glBufferData(GL_ARRAY_BUFFER, 128, quad, GL_STATIC_DRAW)
+
+        EBO = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, EBO)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, 24, indices, GL_STATIC_DRAW)
+
+        #position = glGetAttribLocation(shader, "position")
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 32, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+
+        #color = glGetAttribLocation(shader, "color")
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 32, ctypes.c_void_p(12))
+        glEnableVertexAttribArray(1)
+
+        #texCoords = glGetAttribLocation(shader, "inTexCoords")
+        glVertexAttribPointer(2, 2, GL_FLOAT, GL_FALSE, 32, ctypes.c_void_p(24))
+        glEnableVertexAttribArray(2)
+
+        self.gazePointsLoc = glGetUniformLocation(self.shader, 'gazePoints')
+        self.gazeCountLoc = glGetUniformLocation(self.shader, 'gazeCount')
+        self.fixationMode = 'min'
+
+        #textures and render targets are allocated per image size on first use and reused afterwards
+        self.pool = ResourcePool()
+        self.texture = None
+        self.FBO = None
+
+    #compile and use a program with the LOD function of the model (or the LOD table) and assign its texture units,
+    #image on texture unit 0, LOD table on unit 1
+    def compileProgram(self, vertexShader, fragmentShader, geometryShader=None):
+        lodFunction = table_lod_function if self.lodMode == 'table' else self.model.lodFunction
+        sampleFunction = laplacian_sample_function if self.pyramid == 'laplacian' else linear_sample_function
+        fragmentShader = fragmentShader.replace('LOD_FUNCTION', lodFunction).replace('SAMPLE_FUNCTION', sampleFunction)
+        shaders = [OpenGL.GL.shaders.compileShader(vertexShader, GL_VERTEX_SHADER),
+                   OpenGL.GL.shaders.compileShader(fragmentShader, GL_FRAGMENT_SHADER)]
+        if geometryShader is not None:
+            shaders.append(OpenGL.GL.shaders.compileShader(geometryShader, GL_GEOMETRY_SHADER))
+        #the samplers of the table program share unit 0 until the units are assigned below, which fails validation at link time
+        program = OpenGL.GL.shaders.compileProgram(*shaders, validate=self.lodMode != 'table')
+
+        self.useProgram(program)
+        glUniform1i(self.uniformLocation('imageTex'), 0)
+        if self.lodMode == 'table':
+            glUniform1i(self.uniformLocation('lodTex'), 1)
+        return program
+
+    def useProgram(self, program):
+        self.program = program
+        glUseProgram(program)
+
+    #location of a uniform of the current program
+    def uniformLocation(self, name):
+        key = (self.program, name)
+        if key not in self.uniformLocs:
+            self.uniformLocs[key] = glGetUniformLocation(self.program, name)
+        return self.uniformLocs[key]
+
+    #write the images of saveImage, saveImageAsync and flushImages to sink (see sinks.py, e.g. an EncoderPool
+    #that encodes on other threads), None writes them with PIL on the calling thread as before
+    def setSink(self, sink):
+        self.sink = sink
+
+    #time the pipeline stages (see profiling.py) and call callback(stage, seconds, info) for each, None disables it
+    #gpu times arrive with a delay, flushImages and flushInstrumentation report the ones still pending
+    def setInstrumentation(self, callback):
+        self.flushInstrumentation()
+        self.profiler = None if callback is None else Profiler(callback, QueryTimer())
+
+    def flushInstrumentation(self):
+        if self.profiler is not None:
+            self.profiler.flush()
+
+    #context manager timing a stage if instrumentation is enabled
+    def profileStage(self, name, gpu=False):
+        return NULL_STAGE if self.profiler is None else self.profiler.stage(name, gpu)
+
+    #load image from array (PIL image or HxW, HxWx3, HxWx4 uint8 numpy array)
+    def loadImgFromArray(self, img = None):
+        self.img = img if isinstance(img, np.ndarray) else img.copy()
+        self.imgDigest = None if self.cache is None else arrayDigest(self.img)
+        self.loadImg()
+
+    #load image from file
+    def loadImgFromFile(self, imgFilename='images/Yarbus_scaled.jpg'):
+        self.img = Image.open(imgFilename)
+        self.imgDigest = None if self.cache is None else fileDigest(imgFilename)
+        self.loadImg()
+
+    def loadImg(self):
+        self.img_width, self.img_height = imageSize(self.img)
+        if self.profiler is not None:
+            self.profiler.setImage(getattr(self.img, 'filename', None), self.img_width, self.img_height)
+
+        self.updateOutput()
+        if self.visualize:
+            self.context.setSize(self.out_width, self.out_height)
+
+        self.model.configure(self.img_width, self.img_height)
+        self.updateModel()
+        if np.ndim(self.gazePosition) == 1 and self.gazePosition[0] < 0:
+            self.moveGaze((self.img_height/2, self.img_width/2))
+        else:
+            self.moveGaze(self.gazePosition, *self.fixations[1:])
+        self.updateTexture()
+
+    #render images at outputSize (width, height) instead of their own size, e.g. the input size of a network, None
+    #renders at the image size again: the viewport, render target and readback have the output size, so fill, readback
+    #and any later resize shrink with it, while gaze points, gazeRadius and dotPitch stay in image pixels, as the shader
+    #maps the output pixels back to the image, and the level of detail is at least the level whose texels are as large
+    #as an output pixel (lodmap.minificationLod), so that minified regions are not aliased
+    def setOutputSize(self, outputSize):
+        self.outputSize = checkOutputSize(outputSize)
+        self.frame = None
+        if self.texture is None:
+            return
+        self.updateOutput()
+        if self.visualize:
+            self.context.setSize(self.out_width, self.out_height)
+        else:
+            self.FBO = self.pool.target(self.out_width, self.out_height)
+        if self.incremental is not None:
+            self.incremental.reset()
+
+    #size of the rendered frames and the uniforms converting output pixels to image pixels for the loaded image
+    def updateOutput(self):
+        self.out_width, self.out_height = self.outputSize or (self.img_width, self.img_height)
+        self.pixelScale = outputScale(self.img_width, self.img_height, self.outputSize)
+        self.setUniforms({'pixelScale': self.pixelScale, 'minLod': (minificationLod(self.img_width, self.img_height, self.outputSize),)})
+
+    #redraw only the bounding box of the pixels whose level of detail can have changed by more than lodTolerance levels
+    #since they were last drawn (with a scissor test) and read back only the boxes drawn since the last readImage into a
+    #persistent frame, frames whose gaze points moved less than gazeThreshold pixels are not drawn (see incremental.py)
+    #the frame returned by readImage is then reused, enabled=False draws and reads back full frames again
+    def setIncremental(self, enabled=True, lodTolerance=LOD_TOLERANCE, gazeThreshold=0):
+        if enabled and self.visualize:
+            raise ValueError('Incremental rendering needs an offscreen renderer, use visualize=False')
+        self.incremental = IncrementalState(lodTolerance, gazeThreshold) if enabled else None
+        self.frame = None
+
+    #set the model uniforms (or bind its LOD table), has to be called after model parameters are changed
+    def updateModel(self):
+        if self.lodMode == 'table':
+            self.updateLodTable()
+        else:
+            self.setUniforms(self.model.uniforms())
+
+    def setUniforms(self, values):
+        for name, value in values.items():
+            [glUniform1f, glUniform2f, glUniform3f, glUniform4f][len(value) - 1](self.uniformLocation(name), *value)
+
+    #bind the LOD table of the current model configuration, the table is computed once per model key
+    #and covers distances up to the image diagonal, so moving the gaze only changes a uniform
+    def updateLodTable(self):
+        key = self.model.key()
+        size = math.ceil(math.hypot(self.model.width, self.model.height)) + 2
+        texture, tableSize = self.lodTables.get(key, (None, 0))
+
+        glActiveTexture(GL_TEXTURE1)
+        if texture is None:
+            texture = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_1D, texture)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        else:
+            glBindTexture(GL_TEXTURE_1D, texture)
+        if size > tableSize:
+            lod = np.asarray(self.model.radialLod(np.arange(size, dtype=np.float32)), np.float32)
+            glTexImage1D(GL_TEXTURE_1D, 0, GL_R32F, size, 0, GL_RED, GL_FLOAT, lod)
+            tableSize = size
+        self.lodTables[key] = (texture, tableSize)
+        glActiveTexture(GL_TEXTURE0)
+
+        glUniform1f(self.uniformLocation('lodTableSize'), float(tableSize))
+
+    #move the gaze to (row, column) in image pixels, or to several such points (at most MAX_FIXATIONS) that are combined
+    #in one pass as set by setFixationMode, scales and weights are one value or one per point (see models.fixationArrays)
+    def moveGaze(self, newGazePosition, scales=None, weights=None):
+        self.gazePosition = newGazePosition
+        self.fixations = fixationArrays(newGazePosition, scales, weights)
+        self.uploadGaze(*self.fixations)
+
+    #level of detail of every pixel for the loaded image, the current gaze point(s) and model parameters, as sampled
+    #by the shader, computed in numpy without rendering (from a radial profile unless exact is True, see lodmap.py)
+    def lodMap(self, exact=None):
+        return lodMap(self.model, self.img_width, self.img_height, *self.fixations, mode=self.fixationMode, exact=exact, outputSize=self.outputSize)
+
+    #set the gaze uniform array, all points in one call, gl_FragCoord counts rows from the bottom (shifted by offset
+    #output rows), the shader compares the points with gl_FragCoord converted to image pixels
+    def uploadGaze(self, points, scales, weights, offset=0):
+        gaze = np.empty((len(points), 4), np.float32)
+        gaze[:, 0] = points[:, 1]
+        gaze[:, 1] = self.img_height - points[:, 0] + offset*self.pixelScale[1]
+        gaze[:, 2] = scales
+        gaze[:, 3] = weights
+        glUniform4fv(self.gazePointsLoc, len(gaze), gaze)
+        glUniform1i(self.gazeCountLoc, len(gaze))
+
+    #how the levels of detail of several gaze points are combined, one of FIXATION_MODES
+    def setFixationMode(self, mode):
+        if mode not in FIXATION_MODES:
+            raise ValueError('Unknown fixation mode {!r}, expected one of {}'.format(mode, ', '.join(FIXATION_MODES)))
+        self.fixationMode = mode
+        glUniform1i(glGetUniformLocation(self.shader, 'blendFixations'), int(mode == 'blend'))
+
+    def updateTexture(self):
+        if self.imgDigest is None or not self.loadCachedTexture():
+            levels = None
+            with self.profileStage('decode'):
+                if self.pyramid == 'draft' and isDraftable(self.img):
+                    levels = draftPyramid(self.img.filename)
+                    img_data = levels[0]
+                else:
+                    img_data = imageToArray(self.img)
+            self.img_height, self.img_width = img_data.shape[:2]
+            with self.profileStage('upload'):
+                self.texture = self.pool.uploadTexture(img_data, generateMipmap=False)
+                if levels is not None:
+                    uploadLevels(levels[1:], firstLevel=1)
+            with self.profileStage('mipmap', gpu=True):
+                if self.pyramid in ['mipmap', 'draft'] and levels is None:
+                    glGenerateMipmap(GL_TEXTURE_2D)
+                elif self.pyramid in GAUSSIAN_PYRAMIDS:
+                    self.buildPyramid(img_data)
+            if self.imgDigest is not None:
+                glBindTexture(GL_TEXTURE_2D, self.texture)
+                self.cache.store(self.imgDigest, self.cacheKind(), readLevels(self.img_width, self.img_height, channelCount(img_data)))
+        if self.pyramid == 'laplacian':
+            glUniform1f(self.uniformLocation('maxLevel'), float(mipLevels(self.img_width, self.img_height) - 1))
+        if not self.visualize:
+            self.FBO = self.pool.target(self.out_width, self.out_height)
+        if self.incremental is not None:
+            self.incremental.reset()
+
+    #kind of the cached pyramids, glGenerateMipmap and the GPU pyramid builder depend on the driver
+    def cacheKind(self):
+        return '{} {} {}'.format('gaussian' if self.pyramid in GAUSSIAN_PYRAMIDS else self.pyramid, glGetString(GL_RENDERER).decode(), glGetString(GL_VERSION).decode())
+
+    #upload the cached levels of the loaded image, returns False if it is not in the cache
+    #the levels are memory mapped, so the upload also reads them from disk if they are not in the page cache
+    def loadCachedTexture(self):
+        levels = self.cache.load(self.imgDigest, self.cacheKind())
+        if levels is None:
+            return False
+        self.img_height, self.img_width = levels[0].shape[:2]
+        with self.profileStage('upload'):
+            self.texture = self.pool.texture(self.img_width, self.img_height, channelCount(levels[0]))
+            uploadLevels(levels)
+        return True
+
+    #build the Gaussian pyramid of the bound texture on the GPU, or on the CPU if its format is not renderable
+    def buildPyramid(self, img_data):
+        if self.pyramidBuilder is None:
+            self.pyramidBuilder = PyramidBuilder(vertex_shader)
+        internalFormat = TEXTURE_FORMATS[channelCount(img_data)][0]
+        if not self.pyramidBuilder.build(self.texture, self.img_width, self.img_height, internalFormat):
+            uploadLevels(gaussianPyramid(img_data)[1:], firstLevel=1)
+        glUseProgram(self.program)
+
+    #rendered image as a H x W x 3 uint8 array with the top row first (a bottom-up view of the pixels read back)
+    def readImage(self):
+        if self.visualize:
+            glReadBuffer(GL_FRONT)
+        else:
+            glReadBuffer(GL_COLOR_ATTACHMENT0)
+
+        if self.incremental is not None:
+            return self.readIncremental()
+
+        with self.profileStage('readback'):
+            glPixelStorei(GL_PACK_ALIGNMENT, 1)
+            pixels = glReadPixels(0,0,self.out_width,self.out_height,GL_RGB,GL_UNSIGNED_BYTE)
+        return np.frombuffer(pixels, np.uint8).reshape(self.out_height, self.out_width, 3)[::-1]
+
+    #read the region drawn since the last readImage into the persistent frame
+    def readIncremental(self):
+        region = self.incremental.takeDirty()
+        if self.frame is None or self.frame.shape[:2] != (self.out_height, self.out_width):
+            self.frame = np.empty((self.out_height, self.out_width, 3), np.uint8)
+            region = (0, self.out_height, 0, self.out_width)
+        if region is not None:
+            row0, row1, col0, col1 = region
+            with self.profileStage('readback'):
+                glPixelStorei(GL_PACK_ALIGNMENT, 1)
+                pixels = glReadPixels(col0, self.out_height - row1, col1 - col0, row1 - row0, GL_RGB, GL_UNSIGNED_BYTE)
+            self.frame[row0:row1, col0:col1] = np.frombuffer(pixels, np.uint8).reshape(row1 - row0, col1 - col0, 3)[::-1]
+        return self.frame
+
+    #draw the current gaze and read the image directly into out (H x W x 3 C contiguous uint8 array, top row first),
+    #without intermediate copies: the quad is drawn upside down, so that glReadPixels writes the rows in image order
+    def renderInto(self, out):
+        if out.shape != (self.out_height, self.out_width, 3) or out.dtype != np.uint8 or not out.flags.c_contiguous:
+            raise ValueError('Expected a contiguous {}x{}x3 uint8 array, got {} {}'.format(self.out_height, self.out_width, out.dtype, out.shape))
+        if self.incremental is not None:
+            self.incremental.reset()
+        points, scales, weights = self.fixations
+        flipped = points.copy()
+        flipped[:, 0] = self.img_height - points[:, 0]
+        glUniform1i(self.uniformLocation('flipRows'), 1)
+        self.uploadGaze(flipped, scales, weights)
+
+        glViewport(0, 0, self.out_width, self.out_height)
+        with self.profileStage('draw', gpu=True):
+            glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
+        glReadBuffer(GL_BACK if self.visualize else GL_COLOR_ATTACHMENT0)
+        with self.profileStage('readback'):
+            glPixelStorei(GL_PACK_ALIGNMENT, 1)
+            glReadPixels(0, 0, self.out_width, self.out_height, GL_RGB, GL_UNSIGNED_BYTE, out)
+
+        glUniform1i(self.uniformLocation('flipRows'), 0)
+        self.uploadGaze(points, scales, weights)
+        return out
+
+    def saveImage(self, filename):
+        frame = self.readImage()
+        with self.profileStage('encode'):
+            if self.sink is None:
+                writeImage(filename, frame)
+            else:
+                self.sink.write(filename, frame)
+
+    #save the rendered image without waiting for the GPU, pixels are read into a ring of pixel buffers
+    #and the image is written once the transfer has completed, during a later call or in flushImages
+    #writer(filename, frame) is called with a H x W x 3 view of the pixels that is only valid during the call,
+    #by default the write of the sink (setSink) or writeImage
+    def saveImageAsync(self, filename, writer=None):
+        if self.reader is None:
+            self.reader = PBOReader()
+
+        if self.visualize:
+            glReadBuffer(GL_FRONT)
+        else:
+            glReadBuffer(GL_COLOR_ATTACHMENT0)
+
+        info = None if self.profiler is None else dict(self.profiler.info)
+        self.reader.start(self.out_width, self.out_height, (filename, info))
+        #keep one buffer free for the next frame
+        while self.reader.full():
+            self.finishImage(writer)
+
+    #write all images still pending from saveImageAsync and wait until the sink has written them
+    def flushImages(self, writer=None):
+        while self.reader:
+            self.finishImage(writer)
+        if self.sink is not None:
+            self.sink.flush()
+        self.flushInstrumentation()
+
+    #write the oldest pending image, with instrumentation the writer is timed as encode
+    #and the rest (waiting for the transfer and mapping the buffer) as readback
+    def finishImage(self, writer=None):
+        if writer is None:
+            writer = writeImage if self.sink is None else self.sink.write
+        times = {}
+
+        def write(tag, frame):
+            filename, info = tag
+            start = time.perf_counter()
+            writer(filename, frame)
+            times['encode'] = time.perf_counter() - start
+            times['info'] = info
+
+        start = time.perf_counter()
+        self.reader.finish(write)
+        if self.profiler is not None and times['info'] is not None:
+            self.profiler.report('readback', time.perf_counter() - start - times['encode'], 'cpu', times['info'])
+            self.profiler.report('encode', times['encode'], 'cpu', times['info'])
+
+    #foveate one image at many gaze points, image is a filename, PIL image or uint8 numpy array
+    #gaze_points are (row, column) pairs as in moveGaze, pointParameters optionally maps model parameter names
+    #to a value per point (e.g. {'gazeRadius': radii} for the classic model)
+    #the texture is uploaded once and all points are rendered offscreen, returns N x H x W x 3 uint8 array
+    def foveate_batch(self, image, gaze_points, pointParameters=None):
+        if isinstance(image, str):
+            self.loadImgFromFile(imgFilename=image)
+        else:
+            self.loadImgFromArray(image)
+
+        gaze_points = np.asarray(gaze_points, dtype=np.float32).reshape(-1, 2)
+        pointParameters = {name: np.broadcast_to(np.asarray(values, np.float32), (len(gaze_points),))
+                           for name, values in (pointParameters or {}).items()}
+        saved = {name: getattr(self.model, name) for name in pointParameters}
+
+        output = np.empty((len(gaze_points), self.out_height, self.out_width, 3), np.uint8)
+
+        if self.batchTarget is None:
+            self.batchTarget = StackedTarget()
+        slots = self.batchTarget.bind(self.out_width, self.out_height, len(gaze_points))
+
+        for start in range(0, len(gaze_points), slots):
+            count = min(slots, len(gaze_points) - start)
+            for slot in range(count):
+                offset = self.batchTarget.useSlot(slot)
+                if pointParameters:
+                    for name, values in pointParameters.items():
+                        setattr(self.model, name, float(values[start + slot]))
+                    self.updateModel()
+                self.uploadGaze(gaze_points[start + slot:start + slot + 1], 1, 1, offset)
+                with self.profileStage('draw', gpu=True):
+                    glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
+            with self.profileStage('readback'):
+                self.batchTarget.read(output[start:start + count])
+
+        #restore the regular render target, model parameters and gaze
+        glBindFramebuffer(GL_FRAMEBUFFER, 0 if self.visualize else self.FBO)
+        for name, value in saved.items():
+            setattr(self.model, name, value)
+        if saved:
+            self.updateModel()
+        self.moveGaze(self.gazePosition, *self.fixations[1:])
+        return output
+
+    #compile the program of foveate_array and create the uniform buffer with the gaze positions of the layers
+    def initArrayProgram(self):
+        self.arrayShader = self.compileProgram(array_vertex_shader, array_fragment_shader, array_geometry_shader)
+        glUniformBlockBinding(self.arrayShader, glGetUniformBlockIndex(self.arrayShader, 'LayerParameters'), 0)
+        self.arrayUBO = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.arrayUBO)
+        glBufferData(GL_UNIFORM_BUFFER, ARRAY_MAX_LAYERS*16, None, GL_DYNAMIC_DRAW)
+        glBindBufferBase(GL_UNIFORM_BUFFER, 0, self.arrayUBO)
+        self.maxArrayLayers = min(ARRAY_MAX_LAYERS, int(glGetIntegerv(GL_MAX_ARRAY_TEXTURE_LAYERS)))
+
+    #foveate many images of the same size, each at its own gaze point (row, column), by default the image center
+    #images is a list of filenames, PIL images or uint8 arrays, or a K x H x W (x C) uint8 array
+    #up to layers images are packed into a mipmapped texture array and rendered into a layered target with one
+    #instanced draw call, the gaze positions are passed in a uniform buffer and all layers are read back at once
+    #model parameters are shared by all images, the loaded image and gaze are kept, returns K x H x W x 3 uint8 array
+    #(of the outputSize if one is set)
+    def foveate_array(self, images, gaze_points=None, layers=None):
+        if self.pyramid != 'mipmap':
+            raise ValueError('foveate_array only supports the mipmap pyramid')
+        if self.arrayShader is None:
+            self.initArrayProgram()
+
+        width, height = imageSize(Image.open(images[0]) if isinstance(images[0], str) else images[0])
+        if gaze_points is None:
+            gaze_points = [(height/2, width/2)]*len(images)
+        gaze_points = np.asarray(gaze_points, dtype=np.float32).reshape(-1, 2)
+        if len(gaze_points) != len(images):
+            raise ValueError('Expected {} gaze points, got {}'.format(len(images), len(gaze_points)))
+
+        outWidth, outHeight = self.outputSize or (width, height)
+        capacity = min(len(images), layers or self.maxArrayLayers, self.maxArrayLayers, max(1, BATCH_MAX_PIXELS//(width*height)))
+        output = np.empty((len(images), outHeight, outWidth, 3), np.uint8)
+        frames = np.empty((capacity, height, width, 3), np.uint8)
+        #the layers are read back into the same frames at the image size
+        rendered = frames if (outWidth, outHeight) == (width, height) else np.empty((capacity, outHeight, outWidth, 3), np.uint8)
+        gaze = np.zeros((capacity, 4), np.float32)
+
+        if self.profiler is not None:
+            self.profiler.setImage(None, width, height)
+        self.useProgram(self.arrayShader)
+        self.model.configure(width, height)
+        self.updateModel()
+        self.setUniforms({'pixelScale': outputScale(width, height, self.outputSize), 'minLod': (minificationLod(width, height, self.outputSize),)})
+        glBindBufferBase(GL_UNIFORM_BUFFER, 0, self.arrayUBO)
+        glViewport(0, 0, outWidth, outHeight)
+
+        for start in range(0, len(images), capacity):
+            count = min(capacity, len(images) - start)
+            for i in range(count):
+                img = images[start + i]
+                with self.profileStage('decode'):
+                    img_data = imageToArray(Image.open(img) if isinstance(img, str) else img)
+                if img_data.shape[:2] != (height, width):
+                    raise ValueError('Image {} is {}x{}, expected {}x{}'.format(start + i, img_data.shape[1], img_data.shape[0], width, height))
+                frames[i] = arrayToRGB(img_data)
+            gaze[:count, 0] = gaze_points[start:start + count, 1]
+            gaze[:count, 1] = height - gaze_points[start:start + count, 0]
+            glBufferSubData(GL_UNIFORM_BUFFER, 0, gaze.nbytes, gaze)
+
+            FBO, target = self.pool.layeredTarget(outWidth, outHeight, capacity)
+            if not glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE:
+                raise RuntimeError('Layered framebuffer is incomplete')
+            #the target texture is read back through unit 0 as well, so the images are bound after it
+            with self.profileStage('upload'):
+                self.pool.uploadArrayTexture(frames[:count], capacity, generateMipmap=False)
+            with self.profileStage('mipmap', gpu=True):
+                glGenerateMipmap(GL_TEXTURE_2D_ARRAY)
+            with self.profileStage('draw', gpu=True):
+                glDrawElementsInstanced(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None, count)
+
+            glBindTexture(GL_TEXTURE_2D_ARRAY, target)
+            with self.profileStage('readback'):
+                readTextureArray(rendered)
+            output[start:start + count] = rendered[:count, ::-1]
+
+        #restore the regular program, render target and model configuration of the loaded image
+        self.useProgram(self.shader)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBO or 0)
+        if self.texture is not None:
+            self.model.configure(self.img_width, self.img_height)
+            self.updateModel()
+            if self.profiler is not None:
+                self.profiler.setImage(getattr(self.img, 'filename', None), self.img_width, self.img_height)
+        return output
+
+    #draw and present one frame with the current texture and gaze
+    def draw(self):
+
+        if not self.visualize:
+            if not glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE:
+                raise RuntimeError('Framebuffer binding failed')
+
+        if self.incremental is not None:
+            region = self.incremental.update(self.fixations, (self.model.key(), self.fixationMode), lambda maxDistance: radialProfile(self.model, maxDistance),
+                                             self.out_width, self.out_height, self.pixelScale)
+            if region is None:
+                return
+            row0, row1, col0, col1 = region
+            glEnable(GL_SCISSOR_TEST)
+            glScissor(col0, self.out_height - row1, col1 - col0, row1 - row0)
+
+        glClear(GL_COLOR_BUFFER_BIT)
+
+        glViewport(0, 0, self.out_width, self.out_height)
+
+        with self.profileStage('draw', gpu=True):
+            glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
+
+        if self.incremental is not None:
+            glDisable(GL_SCISSOR_TEST)
+        self.context.swapBuffers()
+
+    def run(self):
+        self.draw()
+
+        if self.visualize:
+            time.sleep(0.5)
+
+
+#classic model: the level of detail is log2 of the distance to the gaze point in units of gazeRadius
+class Foveate_OGL(GLRenderer):
+
+    def __init__(self, gazeRadius=25, gazePosition=(-1, -1), visualize = True, backend = 'auto', lodMode = 'shader', pyramid = 'mipmap', cache = None,
+                 outputSize = None):
+        GLRenderer.__init__(self, ClassicModel(gazeRadius), gazePosition=gazePosition, visualize=visualize, backend=backend,
+                            lodMode=lodMode, pyramid=pyramid, cache=cache, outputSize=outputSize)
+
+    @property
+    def gazeRadius(self):
+        return self.model.gazeRadius
+
+    #newGazeRadius is the radius of the fovea, or one radius per gaze point, which then scales the distances
+    #to the points relative to the radius of the model
+    def updateGaze(self, newGazeRadius, newGazePosition, weights=None):
+        if np.ndim(newGazeRadius) > 0:
+            self.moveGaze(newGazePosition, np.asarray(newGazeRadius, np.float32)/np.float32(self.model.gazeRadius), weights)
+            return
+        if newGazeRadius != self.model.gazeRadius:
+            self.model.gazeRadius = newGazeRadius
+            self.updateModel()
+        self.moveGaze(newGazePosition, weights=weights)
+
+    #gaze_radii is a single radius or one radius per point
+    def foveate_batch(self, image, gaze_points, gaze_radii=None):
+        return GLRenderer.foveate_batch(self, image, gaze_points, None if gaze_radii is None else {'gazeRadius': gaze_radii})
+
+
+#Geisler & Perry
+class Foveate_GP_OGL(GLRenderer):
+
+    def __init__(self, dotPitch = -1, viewDist = -1, pix2deg = -1, gazePosition=(-1, -1), visualize = True, backend = 'auto', lodMode = 'shader', pyramid = 'mipmap', cache = None,
+                 outputSize = None):
+        GLRenderer.__init__(self, GeislerPerryModel(dotPitch, viewDist, pix2deg), gazePosition=gazePosition, visualize=visualize, backend=backend,
+                            lodMode=lodMode, pyramid=pyramid, cache=cache, outputSize=outputSize)
+
+    #scales enlarge the fovea of each gaze point (see moveGaze)
+    def updateGaze(self, newGazePosition, scales=None, weights=None):
+        self.moveGaze(newGazePosition, scales, weights)
@@ -0,0 +1,387 @@
+#Persistent foveation service: worker threads keep warm renderers (OpenGL contexts with compiled programs) and foveate
+#images sent over HTTP, on a local TCP port or a Unix socket, so that clients do not pay for the process start-up,
+#context creation and shader compilation of every job
+#POST /foveate?<parameters> with the image file bytes as body (or path=<file readable by the server> and no body)
+#returns the foveated image as .npy (default), png or jpg, GET /stats returns the counters and latency percentiles
+#requests wait in a bounded queue (full: 503), a worker takes the waiting requests as one batch (up to batchSize) and
+#renders all requests for the same image and parameters with one upload (foveate_batch)
+#parameters: model (classic or gp), pyramid, gaze=row,col[;row,col...] (several points are combined in one pass,
+#default: image center), scales, weights (comma separated, one per point), mode (min or blend), format (npy, png or jpg),
+#and the parameters of the model: gazeRadius, viewDist, pix2deg
+import io
+import os
+import json
+import time
+import queue
+import socket
+import hashlib
+import threading
+import http.client
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+import numpy as np
+from PIL import Image
+
+from . import createRenderer
+from .models import MODELS, FIXATION_MODES
+from .pyramid import PYRAMIDS
+from .interactive import TimingStats
+
+RESPONSE_FORMATS = {'npy': 'application/octet-stream', 'png': 'image/png', 'jpg': 'image/jpeg'}
+
+#latency samples kept for the percentiles of /stats
+STATS_SAMPLES = 10000
+
+
+#a request waiting in the queue, the handler thread waits on done until a worker has set frame or error
+class FoveationRequest:
+    def __init__(self, model, pyramid, parameters, gaze, scales, weights, mode, path=None, data=None):
+        self.model = model
+        self.pyramid = pyramid
+        self.parameters = parameters
+        self.gaze = gaze
+        self.scales = scales
+        self.weights = weights
+        self.mode = mode
+        self.path = path
+        self.data = data
+        #requests for the same image and parameters are rendered together
+        image = path if data is None else hashlib.blake2b(data, digest_size=16).hexdigest()
+        self.key = (model, pyramid, tuple(sorted(parameters.items())), image)
+        self.frame = None
+        self.error = None
+        self.done = threading.Event()
+        self.arrival = time.perf_counter()
+
+    #a single gaze point (without scale or weight) can be rendered by foveate_batch
+    def batchable(self):
+        return self.gaze is not None and len(self.gaze) == 1 and self.scales is None and self.weights is None
+
+    def image(self):
+        return self.path if self.data is None else Image.open(io.BytesIO(self.data))
+
+
+#parse the query parameters of a request, raises ValueError with a message for the client
+def parseRequest(query, body, defaults):
+    values = {name: value[-1] for name, value in parse_qs(query).items()}
+    model = values.pop('model', defaults['model'])
+    if model not in MODELS:
+        raise ValueError('Unknown model {!r}'.format(model))
+    pyramid = values.pop('pyramid', defaults['pyramid'])
+    if pyramid not in PYRAMIDS:
+        raise ValueError('Unknown pyramid {!r}'.format(pyramid))
+    mode = values.pop('mode', 'min')
+    if mode not in FIXATION_MODES:
+        raise ValueError('Unknown mode {!r}'.format(mode))
+    gaze = values.pop('gaze', None)
+    if gaze is not None:
+        gaze = [tuple(float(x) for x in point.split(',')) for point in gaze.split(';')]
+        if any(len(point) != 2 for point in gaze):
+            raise ValueError('gaze must be row,col[;row,col...]')
+    scales = values.pop('scales', None)
+    weights = values.pop('weights', None)
+    scales = None if scales is None else [float(x) for x in scales.split(',')]
+    weights = None if weights is None else [float(x) for x in weights.split(',')]
+    path = values.pop('path', None)
+    values.pop('format', None)
+    parameters = {name: float(values.pop(name, defaults[name])) for name in MODELS[model].parameters if name in defaults}
+    if values:
+        raise ValueError('Unknown parameters {}'.format(', '.join(sorted(values))))
+    if (path is None) == (not body):
+        raise ValueError('Send either the image bytes or a path')
+    return FoveationRequest(model, pyramid, parameters, gaze, scales, weights, mode, path=path, data=body or None)
+
+
+def encodeFrame(frame, fmt):
+    output = io.BytesIO()
+    if fmt == 'npy':
+        np.save(output, np.ascontiguousarray(frame))
+    else:
+        Image.fromarray(np.ascontiguousarray(frame)).save(output, format='PNG' if fmt == 'png' else 'JPEG')
+    return output.getvalue()
+
+
+class FoveationServer:
+    #options: model, pyramid and model parameter defaults (gazeRadius, viewDist, pix2deg), backend, lodMode and cacheDir
+    #of the renderers, models lists the models every worker creates at start-up (others are created on first use),
+    #queueSize bounds the waiting requests, batchSize the requests a worker takes at once
+    def __init__(self, options, workers=1, queueSize=64, batchSize=16, models=('classic', 'gp')):
+        self.options = options
+        self.queue = queue.Queue(maxsize=queueSize)
+        self.batchSize = batchSize
+        self.models = models
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'batches': 0, 'uploads': 0}
+        self.latency = {name: TimingStats(STATS_SAMPLES) for name in ['queue', 'render', 'total']}
+        self.ready = threading.Barrier(workers + 1)
+        self.startupErrors = []
+        self.workers = [threading.Thread(target=self.workerLoop, name='foveate-worker-{}'.format(i), daemon=True) for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+        #wait until all renderers are created
+        self.ready.wait()
+        if self.startupErrors:
+            self.close()
+            raise self.startupErrors[0]
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counts[name] += value
+
+    #queue a request and wait for its frame, raises queue.Full if the queue is full
+    def submit(self, request):
+        self.count('requests')
+        try:
+            self.queue.put_nowait(request)
+        except queue.Full:
+            self.count('rejected')
+            raise
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.frame
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+            stats['latencyMs'] = {name: timing.summary() for name, timing in self.latency.items()}
+        stats['queued'] = self.queue.qsize()
+        stats['workers'] = len(self.workers)
+        return stats
+
+    #stop the workers after the queued requests
+    def close(self):
+        for worker in self.workers:
+            if worker.is_alive():
+                self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def workerLoop(self):
+        #renderers are created on the worker thread, which their OpenGL contexts are made current on
+        renderers = {}
+
+        def renderer(model, pyramid):
+            if (model, pyramid) not in renderers:
+                renderers[(model, pyramid)] = createRenderer(model, backend=self.options['backend'], lodMode=self.options['lodMode'], pyramid=pyramid,
+                                                             cache=self.options['cacheDir'], gazeRadius=self.options['gazeRadius'],
+                                                             viewDist=self.options['viewDist'], pix2deg=self.options['pix2deg'])
+            fov = renderers[(model, pyramid)]
+            if fov.backend != 'cpu':
+                fov.context.makeCurrent()
+            return fov
+
+        try:
+            for model in self.models:
+                renderer(model, self.options['pyramid'])
+        except Exception as err:
+            self.startupErrors.append(err)
+            return
+        finally:
+            self.ready.wait()
+
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batchSize and batch[-1] is not None:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            batch = [request for request in batch if request is not None]
+            if batch:
+                self.count('batches')
+                self.renderBatch(batch, renderer)
+            if stop:
+                break
+
+        for fov in renderers.values():
+            if fov.backend != 'cpu':
+                fov.context.terminate()
+
+    #render the requests of a batch grouped by image and parameters, the image of every group is uploaded once
+    def renderBatch(self, batch, renderer):
+        start = time.perf_counter()
+        groups = {}
+        for request in batch:
+            groups.setdefault(request.key, []).append(request)
+
+        for requests in groups.values():
+            first = requests[0]
+            try:
+                fov = renderer(first.model, first.pyramid)
+                for name, value in first.parameters.items():
+                    setattr(fov.model, name, value)
+                single = [request for request in requests if request.batchable()]
+                other = [request for request in requests if not request.batchable()]
+                if single:
+                    frames = fov.foveate_batch(first.image(), [request.gaze[0] for request in single])
+                    for request, frame in zip(single, frames):
+                        request.frame = frame
+                for i, request in enumerate(other):
+                    if i == 0 and not single:
+                        fov.gazePosition = (-1, -1)
+                        if first.data is None:
+                            fov.loadImgFromFile(imgFilename=first.path)
+                        else:
+                            fov.loadImgFromArray(first.image())
+                    fov.setFixationMode(request.mode)
+                    fov.moveGaze((fov.img_height/2, fov.img_width/2) if request.gaze is None else request.gaze, request.scales, request.weights)
+                    fov.run()
+                    request.frame = np.array(fov.readImage())
+                fov.setFixationMode('min')
+                self.count('uploads')
+            except Exception as err:
+                for request in requests:
+                    request.error = err
+
+        end = time.perf_counter()
+        with self.lock:
+            for request in batch:
+                self.latency['queue'].add(start - request.arrival)
+                self.latency['render'].add(end - start)
+                self.latency['total'].add(end - request.arrival)
+                self.counts['failed' if request.error is not None else 'completed'] += 1
+        for request in batch:
+            request.done.set()
+
+
+class FoveationHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def sendJson(self, status, value):
+        self.sendBody(status, json.dumps(value, indent=1).encode(), 'application/json')
+
+    def sendBody(self, status, body, contentType, headers={}):
+        self.send_response(status)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/stats':
+            self.sendJson(200, self.server.foveation.stats())
+        elif path == '/health':
+            self.sendJson(200, {'status': 'ok'})
+        else:
+            self.sendJson(404, {'error': 'Unknown path {}'.format(path)})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if url.path != '/foveate':
+            self.sendJson(404, {'error': 'Unknown path {}'.format(url.path)})
+            return
+        fmt = parse_qs(url.query).get('format', ['npy'])[-1]
+        try:
+            if fmt not in RESPONSE_FORMATS:
+                raise ValueError('Unknown format {!r}'.format(fmt))
+            request = parseRequest(url.query, body, self.server.foveation.options)
+        except ValueError as err:
+            self.sendJson(400, {'error': str(err)})
+            return
+        try:
+            frame = self.server.foveation.submit(request)
+        except queue.Full:
+            self.sendJson(503, {'error': 'Queue is full'})
+            return
+        except Exception as err:
+            self.sendJson(500, {'error': '{}: {}'.format(type(err).__name__, err)})
+            return
+        self.sendBody(200, encodeFrame(frame, fmt), RESPONSE_FORMATS[fmt])
+
+    #requests are counted in /stats instead of being logged
+    def log_message(self, format, *args):
+        pass
+
+
+#pending connections the listening socket accepts, bursts of clients beyond the default of 5 are refused on Unix sockets
+LISTEN_BACKLOG = 128
+
+
+class TCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+
+    #BaseHTTPRequestHandler expects a (host, port) client address
+    def get_request(self):
+        request, _ = self.socket.accept()
+        return request, ('local', 0)
+
+
+#HTTP server for a FoveationServer, on a Unix socket if socketPath is set, else on host:port
+def createHTTPServer(foveation, socketPath=None, host='127.0.0.1', port=8470):
+    if socketPath is not None:
+        server = UnixHTTPServer(socketPath, FoveationHandler)
+    else:
+        server = TCPHTTPServer((host, port), FoveationHandler)
+    server.foveation = foveation
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socketPath, timeout=60):
+        http.client.HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.socketPath = socketPath
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socketPath)
+
+
+#client of a foveation server at a Unix socket path or a (host, port) address, the connection is kept open
+class FoveationClient:
+    def __init__(self, address, timeout=60):
+        if isinstance(address, str):
+            self.connection = UnixHTTPConnection(address, timeout=timeout)
+        else:
+            self.connection = http.client.HTTPConnection(*address, timeout=timeout)
+
+    def call(self, method, url, body=None):
+        self.connection.request(method, url, body=body)
+        response = self.connection.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise RuntimeError('Foveation server returned {}: {}'.format(response.status, json.loads(data).get('error')))
+        return data
+
+    #foveate image (a path readable by the server, or image file bytes) at gaze, one (row, column) point or a list
+    #of them, parameters are the query parameters of the server (model, pyramid, gazeRadius, viewDist, pix2deg, mode,
+    #scales, weights), returns a H x W x 3 uint8 array
+    def foveate(self, image, gaze=None, **parameters):
+        if gaze is not None:
+            points = np.asarray(gaze, np.float64).reshape(-1, 2)
+            parameters['gaze'] = ';'.join('{},{}'.format(row, col) for row, col in points)
+        for name in ['scales', 'weights']:
+            if name in parameters and np.ndim(parameters[name]) > 0:
+                parameters[name] = ','.join(str(float(x)) for x in parameters[name])
+        body = None
+        if isinstance(image, str):
+            parameters['path'] = os.path.abspath(image)
+        else:
+            body = bytes(image)
+        parameters['format'] = 'npy'
+        return np.load(io.BytesIO(self.call('POST', '/foveate?' + urlencode(parameters), body)))
+
+    def stats(self):
+        return json.loads(self.call('GET', '/stats'))
+
+    def close(self):
+        self.connection.close()
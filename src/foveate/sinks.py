@@ -0,0 +1,194 @@
+#output sinks of the renderers (setSink): where and how rendered frames are written (no OpenGL dependency)
+#a sink has write(filename, frame), flush() and close(), frame is a H x W x 3 uint8 array with the top row first,
+#which may be a view that is only valid during the call (e.g. mapped by PBOReader)
+#EncoderPool runs the writes of another sink on a pool of threads, so that encoding never happens on the render thread
+import struct
+import threading
+from os.path import splitext
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .image_utils import writeImage
+
+#auto: format implied by the extension of the output file, png/jpg: converted to that format,
+#npy: one .npy file per frame, chunked: all frames appended to one .npy array per frame size (see ChunkedSink)
+FORMATS = ['auto', 'png', 'jpg', 'npy', 'chunked']
+
+
+class Sink:
+    def write(self, filename, frame):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+#image files encoded by PIL, pngLevel is the zlib compression level of PNG files (0-9, PIL default 6),
+#jpegQuality the quality of JPEG files (1-95, PIL default 75)
+class ImageSink(Sink):
+    def __init__(self, format='auto', pngLevel=None, jpegQuality=None):
+        self.format = format
+        self.pngLevel = pngLevel
+        self.jpegQuality = jpegQuality
+
+    def write(self, filename, frame):
+        root, ext = splitext(filename)
+        if self.format != 'auto':
+            ext = '.' + self.format
+            filename = root + ext
+        options = {}
+        if ext.lower() == '.png' and self.pngLevel is not None:
+            options['compress_level'] = self.pngLevel
+        if ext.lower() in ['.jpg', '.jpeg'] and self.jpegQuality is not None:
+            options['quality'] = self.jpegQuality
+        writeImage(filename, frame, **options)
+
+
+#one .npy file per frame, without encoding, it can be read back memory mapped with np.load(mmap_mode='r')
+class NpySink(Sink):
+    def write(self, filename, frame):
+        np.save(splitext(filename)[0] + '.npy', np.ascontiguousarray(frame))
+
+
+#npy header of a uint8 array padded to size bytes, so that it can be rewritten in place when the shape changes
+def npyHeader(shape, size):
+    header = "{{'descr': '|u1', 'fortran_order': False, 'shape': {!r}, }}".format(tuple(shape))
+    header = header.ljust(size - 11) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+#frames of one size appended to a N x H x W x 3 .npy file, the file grows by chunkFrames frames at a time
+#and is truncated to the written frames on close, the names of the frames are listed in path + '.txt', one per line
+class ArrayChunk:
+    HEADER_BYTES = 128
+
+    def __init__(self, path, frameShape, chunkFrames):
+        self.path = path
+        self.frameShape = frameShape
+        self.chunkFrames = chunkFrames
+        self.names = []
+        self.capacity = 0
+        self.file = open(path, 'wb+')
+
+    def write(self, filename, frame):
+        frameBytes = frame.size
+        index = len(self.names)
+        if index == self.capacity:
+            self.capacity += self.chunkFrames
+            self.file.truncate(self.HEADER_BYTES + self.capacity*frameBytes)
+        self.file.seek(self.HEADER_BYTES + index*frameBytes)
+        self.file.write(np.ascontiguousarray(frame).data)
+        self.names.append(filename)
+
+    def flush(self):
+        self.file.seek(0)
+        self.file.write(npyHeader((len(self.names),) + self.frameShape, self.HEADER_BYTES))
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.truncate(self.HEADER_BYTES + len(self.names)*int(np.prod(self.frameShape)))
+        self.file.close()
+        with open(self.path + '.txt', 'w') as f:
+            f.writelines(name + '\n' for name in self.names)
+
+
+#all frames of a batch appended to a single N x H x W x 3 .npy file at path, which can be read back memory mapped
+#(np.load(path, mmap_mode='r')), the names of the frames are listed in path + '.txt', one per line
+#frames of another size than the first one go to their own file <path>_<width>x<height>.npy (see ArrayChunk)
+class ChunkedSink(Sink):
+    def __init__(self, path, chunkFrames=64):
+        self.path = path
+        self.chunkFrames = chunkFrames
+        #frame shape -> ArrayChunk, in the order of the first frame of each size
+        self.chunks = {}
+        self.lock = threading.Lock()
+
+    #path of the array file of frames of shape, path itself for the size of the first frame
+    def chunkPath(self, shape):
+        if not self.chunks:
+            return self.path
+        root, ext = splitext(self.path)
+        return '{}_{}x{}{}'.format(root, shape[1], shape[0], ext or '.npy')
+
+    def write(self, filename, frame):
+        with self.lock:
+            if frame.shape not in self.chunks:
+                self.chunks[frame.shape] = ArrayChunk(self.chunkPath(frame.shape), frame.shape, self.chunkFrames)
+            self.chunks[frame.shape].write(filename, frame)
+
+    def flush(self):
+        with self.lock:
+            for chunk in self.chunks.values():
+                chunk.flush()
+
+    def close(self):
+        with self.lock:
+            for chunk in self.chunks.values():
+                chunk.close()
+            self.chunks = {}
+
+
+#runs the writes of sink on threads, write copies the frame and returns immediately unless queueSize frames
+#are already waiting or being written, then it blocks until one is done, which bounds the memory used
+#errors of the writes are raised by the next write, flush or close
+class EncoderPool(Sink):
+    def __init__(self, sink, threads=2, queueSize=8):
+        self.sink = sink
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='encoder')
+        self.slots = threading.BoundedSemaphore(queueSize)
+        self.errors = []
+        #number of frames submitted and not written yet
+        self.queued = 0
+        self.idle = threading.Condition()
+
+    def write(self, filename, frame):
+        self.raiseErrors()
+        frame = np.array(frame, order='C')
+        self.slots.acquire()
+        with self.idle:
+            self.queued += 1
+        self.executor.submit(self.sink.write, filename, frame).add_done_callback(self.done)
+
+    def done(self, future):
+        if future.exception() is not None:
+            self.errors.append(future.exception())
+        self.slots.release()
+        with self.idle:
+            self.queued -= 1
+            self.idle.notify_all()
+
+    def raiseErrors(self):
+        if self.errors:
+            raise self.errors.pop(0)
+
+    #wait until all frames are written
+    def flush(self):
+        with self.idle:
+            self.idle.wait_for(lambda: self.queued == 0)
+        self.raiseErrors()
+        self.sink.flush()
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown()
+        self.sink.close()
+
+
+#sink writing frames in format (one of FORMATS) with threads encoder threads (0 writes on the calling thread)
+#chunked frames are appended to path by a single writer thread, so that they stay in the order they were rendered
+def createSink(format='auto', pngLevel=None, jpegQuality=None, threads=0, queueSize=8, path=None):
+    if format not in FORMATS:
+        raise ValueError('Unknown output format {!r}, expected one of {}'.format(format, ', '.join(FORMATS)))
+    if format == 'chunked':
+        if path is None:
+            raise ValueError('The chunked format needs the path of the array file')
+        sink = ChunkedSink(path)
+        threads = min(threads, 1)
+    else:
+        sink = NpySink() if format == 'npy' else ImageSink(format, pngLevel=pngLevel, jpegQuality=jpegQuality)
+    if threads > 0:
+        sink = EncoderPool(sink, threads=threads, queueSize=queueSize)
+    return sink
@@ -0,0 +1,346 @@
+#tiled rendering of images larger than the OpenGL texture and render buffer limits (gigapixel images)
+#the pyramid is built out of core into memory mapped files (pyramid.buildPyramidFiles), then the output is rendered
+#tile by tile: for every tile only the levels its levels of detail need are read, each over the texels the tile covers
+#plus an apron for the filters, packed into a small atlas texture and sampled with texelFetch at the coordinates of the
+#pixels in the whole image, so the tiles are identical to the same region of a single pass and join without seams
+#tiles are written as they are read back, to a memory mapped .npy array or to one image file per tile,
+#so memory use is bounded by the tile size and the strips of the pyramid builder, not by the image size
+import os
+import math
+import shutil
+import tempfile
+from os.path import join, splitext
+import numpy as np
+from PIL import Image
+#renderer selects the PyOpenGL platform of the default backend, which has to be done before OpenGL is imported
+from .renderer import GLRenderer, vertex_shader
+from OpenGL.GL import *
+from .image_utils import imageSize, imageToArray, arrayToRGB
+from .pyramid import buildPyramidFiles, GAUSSIAN_PYRAMIDS
+from .sinks import ImageSink
+
+#default width and height of the tiles in pixels
+TILE_SIZE = 1024
+
+#maximum number of pyramid levels (a 2^31 pixel wide image has 32)
+TILE_MAX_LEVELS = 32
+
+#texels around the footprint of a tile in every level: one for the bilinear and two for the cubic filter,
+#plus one for the rounding of the texel coordinates in the shader
+APRON = 3
+
+#the levels of detail of a tile are sampled at this many distances, and the range widened by LOD_MARGIN,
+#so that the level range covers every pixel even where the shader rounds differently than numpy
+LOD_SAMPLES = 256
+LOD_MARGIN = 0.01
+
+#rows of level 0 converted to RGB at a time
+CONVERT_ROWS = 1024
+
+#the tile is drawn over the lower left corner of the render target, gl_FragCoord is converted to the pixel
+#center in the whole image (column, row from the top), every level is a region of the atlas texture
+tiled_fragment_shader = """
+    #version 330
+    out vec4 outColor;
+    uniform sampler2D imageTex; //atlas with the regions of the levels needed by the tile
+    uniform vec2 gazePosition; //gaze position (column, row) in image pixels
+    uniform vec2 tileOrigin; //column and row of the top left pixel of the tile in the image
+    uniform float tileHeight;
+    uniform int firstLevel; //levels firstLevel to lastLevel are in the atlas
+    uniform int lastLevel;
+    uniform float maxLevel; //coarsest level of the pyramid
+    uniform vec2 levelScale[MAX_LEVELS]; //level size/image size
+    uniform ivec2 regionOrigin[MAX_LEVELS]; //first texel (column, row) of the region of a level, may be negative
+    uniform ivec2 atlasOffset[MAX_LEVELS]; //position of the region in the atlas
+
+    LOD_FUNCTION
+
+    //texel of a level, regions are wrapped like GL_REPEAT when they are gathered
+    vec4 fetch(ivec2 texel, int level)
+    {
+        return texelFetch(imageTex, texel - regionOrigin[level] + atlasOffset[level], 0);
+    }
+
+    SAMPLE_FUNCTION
+
+    void main()
+    {
+        vec2 pixel = tileOrigin + vec2(gl_FragCoord.x, tileHeight - gl_FragCoord.y);
+        float lod = clamp(radialLod(distance(pixel, gazePosition)), 0.0, maxLevel);
+        lod = clamp(lod, float(firstLevel), float(lastLevel));
+        int level = int(lod);
+        vec4 fine = sampleFine(pixel, level);
+        if (level == lastLevel)
+            outColor = fine;
+        else
+            outColor = mix(fine, sampleCoarse(pixel, level + 1), lod - float(level));
+    }
+    """.replace('MAX_LEVELS', str(TILE_MAX_LEVELS))
+
+#bilinear filtering of the levels at the texture coordinates of the pixel centers (pyramids 'mipmap' and 'gaussian')
+tiled_linear_sample_function = """
+    vec4 sampleLinear(vec2 pixel, int level)
+    {
+        vec2 p = pixel*levelScale[level] - 0.5;
+        vec2 i = floor(p);
+        vec2 f = p - i;
+        ivec2 t = ivec2(i);
+        vec4 top = mix(fetch(t, level), fetch(t + ivec2(1, 0), level), f.x);
+        vec4 bottom = mix(fetch(t + ivec2(0, 1), level), fetch(t + ivec2(1, 1), level), f.x);
+        return mix(top, bottom, f.y);
+    }
+
+    vec4 sampleFine(vec2 pixel, int level)
+    {
+        return sampleLinear(pixel, level);
+    }
+
+    vec4 sampleCoarse(vec2 pixel, int level)
+    {
+        return sampleLinear(pixel, level);
+    }
+    """
+
+#pyramid 'laplacian': level 0 at the texel centers, coarse levels with the cubic B-spline of laplacian_sample_function
+tiled_laplacian_sample_function = """
+    vec4 sampleCubic(vec2 pixel, int level)
+    {
+        vec2 p = pixel*levelScale[level] - 0.5;
+        vec2 i = floor(p);
+        vec2 f = p - i;
+        vec2 weights[4] = vec2[]((1.0 - f)*(1.0 - f)*(1.0 - f)/6.0,
+                                 (4.0 - 6.0*f*f + 3.0*f*f*f)/6.0,
+                                 (1.0 + 3.0*f + 3.0*f*f - 3.0*f*f*f)/6.0,
+                                 f*f*f/6.0);
+        vec4 sum = vec4(0.0);
+        for (int y = 0; y < 4; y++)
+            for (int x = 0; x < 4; x++)
+                sum += weights[x].x*weights[y].y*fetch(ivec2(i) + ivec2(x - 1, y - 1), level);
+        return sum;
+    }
+
+    vec4 sampleFine(vec2 pixel, int level)
+    {
+        return level == 0 ? fetch(ivec2(pixel), 0) : sampleCubic(pixel, level);
+    }
+
+    vec4 sampleCoarse(vec2 pixel, int level)
+    {
+        return sampleCubic(pixel, level);
+    }
+    """
+
+
+#OpenGL renderer of images of any size in tiles of tileSize x tileSize pixels, for any foveation model
+#pyramid is 'mipmap' (built like cpu.buildPyramid, glGenerateMipmap needs the whole image in a texture), 'gaussian'
+#or 'laplacian' ('draft' builds mipmap levels, JPEG files are decoded once in full anyway), the levels are written to workDir (a temporary directory by default, removed by close)
+#the level of detail is always computed by the model in the shader (lodMode 'shader'), as a LOD table of a gigapixel
+#image would itself exceed the texture limits
+class TiledRenderer(GLRenderer):
+    def __init__(self, model, gazePosition=(-1, -1), backend='auto', pyramid='mipmap', tileSize=TILE_SIZE, workDir=None):
+        GLRenderer.__init__(self, model, gazePosition=gazePosition, visualize=False, backend=backend, pyramid=pyramid)
+        self.tileSize = tileSize
+        self.ownWorkDir = workDir is None
+        self.workDir = tempfile.mkdtemp(prefix='foveate-tiles-') if workDir is None else workDir
+        os.makedirs(self.workDir, exist_ok=True)
+        self.levels = None
+        self.atlas = None
+        self.atlasSize = (0, 0)
+
+        maxSize = int(glGetIntegerv(GL_MAX_RENDERBUFFER_SIZE))
+        if tileSize > maxSize:
+            raise ValueError('Tile size {} exceeds GL_MAX_RENDERBUFFER_SIZE ({})'.format(tileSize, maxSize))
+        sampleFunction = tiled_laplacian_sample_function if pyramid == 'laplacian' else tiled_linear_sample_function
+        self.tileShader = self.compileProgram(vertex_shader, tiled_fragment_shader.replace('SAMPLE_FUNCTION', sampleFunction))
+
+    #delete the pyramid files, and workDir if it was created by the renderer
+    def close(self):
+        self.levels = None
+        if self.ownWorkDir:
+            shutil.rmtree(self.workDir, ignore_errors=True)
+        else:
+            for level in range(TILE_MAX_LEVELS):
+                path = join(self.workDir, 'level{}.npy'.format(level))
+                if os.path.exists(path):
+                    os.remove(path)
+
+    #load an image file, .npy files are memory mapped and never read entirely, other formats are decoded by PIL,
+    #which needs memory for the whole decoded image once, the RGB pixels are then written to workDir
+    def loadImgFromFile(self, imgFilename='images/Yarbus_scaled.jpg'):
+        if splitext(imgFilename)[1].lower() == '.npy':
+            self.img = np.load(imgFilename, mmap_mode='r')
+        else:
+            #PIL refuses images above about 179 megapixels as a decompression bomb
+            maxPixels = Image.MAX_IMAGE_PIXELS
+            Image.MAX_IMAGE_PIXELS = None
+            try:
+                self.img = Image.open(imgFilename)
+                self.img.load()
+            finally:
+                Image.MAX_IMAGE_PIXELS = maxPixels
+        self.loadImg()
+
+    #load image from array (PIL image or HxW, HxWx3, HxWx4 uint8 numpy array, e.g. np.memmap)
+    def loadImgFromArray(self, img = None):
+        self.img = img
+        self.loadImg()
+
+    def loadImg(self):
+        self.img_width, self.img_height = imageSize(self.img)
+        if self.profiler is not None:
+            self.profiler.setImage(getattr(self.img, 'filename', None), self.img_width, self.img_height)
+        self.levels = None
+        with self.profileStage('decode'):
+            level0 = self.rgbLevel(self.img)
+        #the PIL image is not needed any more once its pixels are in the level file
+        self.img = level0
+        with self.profileStage('mipmap'):
+            self.levels = buildPyramidFiles(level0, 'gaussian' if self.pyramid in GAUSSIAN_PYRAMIDS else 'mipmap', self.workDir)
+        if len(self.levels) > TILE_MAX_LEVELS:
+            raise ValueError('Image size {}x{} needs more than {} levels'.format(self.img_width, self.img_height, TILE_MAX_LEVELS))
+
+        self.model.configure(self.img_width, self.img_height)
+        self.useProgram(self.tileShader)
+        self.updateModel()
+        glUniform1f(self.uniformLocation('maxLevel'), float(len(self.levels) - 1))
+        scales = np.array([[level.shape[1]/self.img_width, level.shape[0]/self.img_height] for level in self.levels], np.float32)
+        glUniform2fv(self.uniformLocation('levelScale'), len(scales), scales)
+        self.moveGaze((self.img_height/2, self.img_width/2) if self.gazePosition[0] < 0 else self.gazePosition)
+
+    #level 0 as a HxWx3 uint8 array, RGB arrays are used as they are (memory mapped arrays stay on disk),
+    #other images are converted in strips of rows into level0.npy in workDir
+    def rgbLevel(self, img):
+        if isinstance(img, np.ndarray) and img.dtype == np.uint8 and img.ndim == 3 and img.shape[2] == 3:
+            return img
+        level0 = np.lib.format.open_memmap(join(self.workDir, 'level0.npy'), 'w+', np.uint8, (self.img_height, self.img_width, 3))
+        for start in range(0, self.img_height, CONVERT_ROWS):
+            if isinstance(img, np.ndarray):
+                strip = img[start:start + CONVERT_ROWS]
+            else:
+                strip = img.crop((0, start, self.img_width, min(self.img_height, start + CONVERT_ROWS)))
+            level0[start:start + CONVERT_ROWS] = arrayToRGB(imageToArray(strip))
+        level0.flush()
+        return level0
+
+    #move the gaze to (row, column) in image pixels, it is used by the next render
+    def moveGaze(self, newGazePosition):
+        self.gazePosition = newGazePosition
+        self.useProgram(self.tileShader)
+        glUniform2f(self.uniformLocation('gazePosition'), float(self.gazePosition[1]), float(self.gazePosition[0]))
+
+    #levels firstLevel to lastLevel used by the pixels of the tile with top left pixel (row, col) and size height x width
+    def tileLevels(self, row, col, height, width):
+        gazeRow, gazeCol = self.gazePosition
+        #distances from the gaze to the nearest and farthest pixel centers of the tile
+        dx = [col + 0.5 - gazeCol, col + width - 0.5 - gazeCol]
+        dy = [row + 0.5 - gazeRow, row + height - 0.5 - gazeRow]
+        nearest = math.hypot(0 if dx[0] <= 0 <= dx[1] else min(abs(d) for d in dx), 0 if dy[0] <= 0 <= dy[1] else min(abs(d) for d in dy))
+        farthest = math.hypot(max(abs(d) for d in dx), max(abs(d) for d in dy))
+        maxLevel = len(self.levels) - 1
+        lod = self.model.radialLod(np.linspace(nearest, farthest, LOD_SAMPLES, dtype=np.float32))
+        lod = np.clip(np.nan_to_num(lod, nan=0.0, neginf=0.0, posinf=maxLevel), 0, maxLevel)
+        firstLevel = max(0, math.floor(lod.min() - LOD_MARGIN))
+        lastLevel = min(maxLevel, math.floor(lod.max() + LOD_MARGIN) + 1)
+        return firstLevel, lastLevel
+
+    #texels of a level covered by the tile and its apron, as (first row, rows, first column, columns),
+    #the region may extend beyond the level, it is wrapped when gathered
+    def tileRegion(self, level, row, col, height, width):
+        levelHeight, levelWidth = self.levels[level].shape[:2]
+        region = []
+        for start, size, scale in [(row, height, levelHeight/self.img_height), (col, width, levelWidth/self.img_width)]:
+            first = math.floor((start + 0.5)*scale - 0.5) - APRON
+            last = math.floor((start + size - 0.5)*scale - 0.5) + 1 + APRON
+            region += [first, last - first + 1]
+        return region
+
+    #bind the atlas texture with at least width x height texels
+    def bindAtlas(self, width, height):
+        if self.atlas is None:
+            self.atlas = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.atlas)
+        if width > self.atlasSize[0] or height > self.atlasSize[1]:
+            width, height = max(width, self.atlasSize[0]), max(height, self.atlasSize[1])
+            maxSize = int(glGetIntegerv(GL_MAX_TEXTURE_SIZE))
+            if width > maxSize or height > maxSize:
+                raise ValueError('Atlas of {}x{} texels exceeds GL_MAX_TEXTURE_SIZE ({}), use smaller tiles'.format(width, height, maxSize))
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB8, width, height, 0, GL_RGB, GL_UNSIGNED_BYTE, None)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            self.atlasSize = (width, height)
+
+    #upload the regions of the levels needed by a tile into the atlas: the finest level on the left,
+    #the coarser ones stacked in a column on its right
+    def uploadTile(self, row, col, height, width):
+        firstLevel, lastLevel = self.tileLevels(row, col, height, width)
+        regions = {level: self.tileRegion(level, row, col, height, width) for level in range(firstLevel, lastLevel + 1)}
+        coarse = [regions[level] for level in range(firstLevel + 1, lastLevel + 1)]
+        fine = regions[firstLevel]
+        self.bindAtlas(fine[3] + max([r[3] for r in coarse], default=0), max(fine[1], sum(r[1] for r in coarse)))
+
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        regionOrigin = np.zeros((TILE_MAX_LEVELS, 2), np.int32)
+        atlasOffset = np.zeros((TILE_MAX_LEVELS, 2), np.int32)
+        offset = [0, 0]
+        for level in range(firstLevel, lastLevel + 1):
+            first, rows, firstCol, cols = regions[level]
+            levelHeight, levelWidth = self.levels[level].shape[:2]
+            pixels = self.levels[level][np.ix_(np.arange(first, first + rows) % levelHeight, np.arange(firstCol, firstCol + cols) % levelWidth)]
+            glTexSubImage2D(GL_TEXTURE_2D, 0, offset[0], offset[1], cols, rows, GL_RGB, GL_UNSIGNED_BYTE, np.ascontiguousarray(pixels))
+            regionOrigin[level] = (firstCol, first)
+            atlasOffset[level] = offset
+            offset = [fine[3], 0] if level == firstLevel else [offset[0], offset[1] + rows]
+
+        glUniform2iv(self.uniformLocation('regionOrigin'), TILE_MAX_LEVELS, regionOrigin)
+        glUniform2iv(self.uniformLocation('atlasOffset'), TILE_MAX_LEVELS, atlasOffset)
+        glUniform1i(self.uniformLocation('firstLevel'), firstLevel)
+        glUniform1i(self.uniformLocation('lastLevel'), lastLevel)
+
+    #foveate the region of the image with top left pixel (row, col) and size height x width (at most tileSize),
+    #returns a height x width x 3 uint8 array with the top row first
+    def renderTile(self, row, col, height, width):
+        self.useProgram(self.tileShader)
+        with self.profileStage('upload'):
+            self.uploadTile(row, col, height, width)
+        self.FBO = self.pool.target(self.tileSize, self.tileSize)
+        glUniform2f(self.uniformLocation('tileOrigin'), float(col), float(row))
+        glUniform1f(self.uniformLocation('tileHeight'), float(height))
+        glViewport(0, 0, width, height)
+        with self.profileStage('draw', gpu=True):
+            glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
+        with self.profileStage('readback'):
+            glReadBuffer(GL_COLOR_ATTACHMENT0)
+            glPixelStorei(GL_PACK_ALIGNMENT, 1)
+            pixels = glReadPixels(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE)
+        return np.frombuffer(pixels, np.uint8).reshape(height, width, 3)[::-1]
+
+    #(row, col, height, width) of all tiles, row by row
+    def tiles(self):
+        return [(row, col, min(self.tileSize, self.img_height - row), min(self.tileSize, self.img_width - col))
+                for row in range(0, self.img_height, self.tileSize) for col in range(0, self.img_width, self.tileSize)]
+
+    #foveate the loaded image tile by tile, output is a .npy file (a H x W x 3 uint8 array, written through a memory map
+    #and flushed after every row of tiles) or a directory, where every tile is written to a file named
+    #<row>_<col>.<ext> by sink (see sinks.py, by default PNG files), returns the output array or the tile filenames
+    def render(self, output, sink=None, ext='png'):
+        if splitext(output)[1].lower() == '.npy':
+            result = np.lib.format.open_memmap(output, 'w+', np.uint8, (self.img_height, self.img_width, 3))
+        else:
+            os.makedirs(output, exist_ok=True)
+            sink = ImageSink() if sink is None else sink
+            result = []
+        for row, col, height, width in self.tiles():
+            tile = self.renderTile(row, col, height, width)
+            with self.profileStage('encode'):
+                if isinstance(result, list):
+                    filename = join(output, '{}_{}.{}'.format(row, col, ext))
+                    sink.write(filename, tile)
+                    result.append(filename)
+                else:
+                    result[row:row + height, col:col + width] = tile
+                    if col + width == self.img_width:
+                        result.flush()
+        if sink is not None:
+            sink.flush()
+        self.flushInstrumentation()
+        return result
@@ -0,0 +1,259 @@
+#Foveation of videos and image sequences along a gaze trace recorded with an eye tracker
+#frames are decoded, rendered and encoded in three overlapping stages connected by bounded queues,
+#so memory use does not depend on the length of the video
+#videos are read and written with the ffmpeg executable, image sequences only need PIL
+import csv
+import glob
+import json
+import time
+import queue
+import shutil
+import threading
+import subprocess
+from os import listdir, makedirs
+from os.path import join, isdir, splitext
+
+import numpy as np
+from PIL import Image
+
+from .image_utils import imageToArray, writeImage
+
+IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'bmp', 'png', 'gif']
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v', '.mpg', '.mpeg']
+
+#column names used by common eye tracker exports, matched case-insensitively
+TIME_COLUMNS = ['timestamp', 'time', 'recordingtimestamp', 'recording timestamp', 't']
+X_COLUMNS = ['gaze_x', 'gazex', 'x', 'gaze point x', 'gazepointx', 'norm_pos_x', 'gaze point x [mcs px]']
+Y_COLUMNS = ['gaze_y', 'gazey', 'y', 'gaze point y', 'gazepointy', 'norm_pos_y', 'gaze point y [mcs px]']
+
+#marks the end of a stream in the pipeline queues
+END = None
+
+
+def findColumn(header, name, candidates):
+    lowered = [h.strip().lower() for h in header]
+    for candidate in ([name.lower()] if name else candidates):
+        if candidate in lowered:
+            return lowered.index(candidate)
+    raise ValueError('Gaze log has no column {} (columns: {})'.format(name if name else '/'.join(candidates), ', '.join(header)))
+
+
+#read a CSV or TSV eye tracker export, returns sample times in seconds and gaze points as (x, y)
+#timeScale converts the time column to seconds (e.g. 0.001 for milliseconds),
+#samples with missing coordinates (blinks, lost tracking) are dropped
+def readGazeLog(filename, timeColumn=None, xColumn=None, yColumn=None, timeScale=1.0):
+    with open(filename, newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = '\t' if '\t' in sample.splitlines()[0] else ','
+        rows = csv.reader(f, delimiter=delimiter)
+        header = next(rows)
+        ti = findColumn(header, timeColumn, TIME_COLUMNS)
+        xi = findColumn(header, xColumn, X_COLUMNS)
+        yi = findColumn(header, yColumn, Y_COLUMNS)
+
+        times, points = [], []
+        for row in rows:
+            try:
+                t, x, y = float(row[ti]), float(row[xi]), float(row[yi])
+            except (ValueError, IndexError):
+                continue
+            if np.isfinite(t) and np.isfinite(x) and np.isfinite(y):
+                times.append(t*timeScale)
+                points.append((x, y))
+
+    if not times:
+        raise ValueError('Gaze log {} contains no valid samples'.format(filename))
+    times = np.asarray(times, np.float64)
+    order = np.argsort(times, kind='stable')
+    return times[order], np.asarray(points, np.float64)[order]
+
+
+#gaze position at arbitrary times, linearly interpolated between the samples of the log
+#and held constant before the first and after the last sample
+class GazeTrace:
+    def __init__(self, times, points, normalized=False, offset=0.0):
+        self.times = np.asarray(times, np.float64)
+        self.points = np.asarray(points, np.float64).reshape(-1, 2)
+        #gaze given as fractions of the frame size instead of pixels
+        self.normalized = normalized
+        #time of the first frame on the clock of the gaze log
+        self.offset = offset
+
+    #returns (row, column) as used by gazePosition
+    def at(self, t, width, height):
+        t = t + self.offset
+        x = np.interp(t, self.times, self.points[:, 0])
+        y = np.interp(t, self.times, self.points[:, 1])
+        if self.normalized:
+            x, y = x*width, y*height
+        return (float(y), float(x))
+
+
+#frames of a directory of images (sorted by name) or of a glob pattern
+class ImageSequenceReader:
+    def __init__(self, path, fps=30.0):
+        if isdir(path):
+            self.files = [join(path, f) for f in sorted(listdir(path)) if any(f.lower().endswith(ext) for ext in IMAGE_EXTENSIONS)]
+        else:
+            self.files = sorted(glob.glob(path))
+        if not self.files:
+            raise ValueError('No images found in {}'.format(path))
+        self.fps = fps
+        self.width, self.height = Image.open(self.files[0]).size
+
+    def __len__(self):
+        return len(self.files)
+
+    def __iter__(self):
+        for f in self.files:
+            yield imageToArray(Image.open(f))
+
+    def close(self):
+        pass
+
+
+#frames of a video decoded by ffmpeg into raw RGB data
+class VideoReader:
+    def __init__(self, filename):
+        if shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None:
+            raise RuntimeError('ffmpeg and ffprobe are required to read videos')
+        probe = subprocess.run(['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height,avg_frame_rate',
+                                '-of', 'json', filename], check=True, capture_output=True)
+        stream = json.loads(probe.stdout)['streams'][0]
+        num, den = stream['avg_frame_rate'].split('/')
+        self.filename = filename
+        self.width, self.height = int(stream['width']), int(stream['height'])
+        self.fps = float(num)/float(den) if float(den) else 30.0
+        self.process = None
+
+    def __iter__(self):
+        self.process = subprocess.Popen(['ffmpeg', '-v', 'error', '-i', self.filename, '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'],
+                                        stdout=subprocess.PIPE)
+        frameSize = self.width*self.height*3
+        while True:
+            data = self.process.stdout.read(frameSize)
+            if len(data) < frameSize:
+                break
+            yield np.frombuffer(data, np.uint8).reshape(self.height, self.width, 3)
+        self.close()
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdout.close()
+            self.process.wait()
+            self.process = None
+
+
+#writes every frame as an image into a directory
+class FrameDirectoryWriter:
+    def __init__(self, outputDir, pattern='frame_{:06d}.png'):
+        makedirs(outputDir, exist_ok=True)
+        self.outputDir = outputDir
+        self.pattern = pattern
+
+    def write(self, index, frame):
+        writeImage(join(self.outputDir, self.pattern.format(index)), frame)
+
+    def close(self):
+        pass
+
+
+#encodes frames into a video with ffmpeg
+class VideoWriter:
+    def __init__(self, filename, width, height, fps, codec='libx264', crf=18):
+        if shutil.which('ffmpeg') is None:
+            raise RuntimeError('ffmpeg is required to write videos')
+        #yuv420p needs even dimensions
+        self.process = subprocess.Popen(['ffmpeg', '-v', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '{}x{}'.format(width, height),
+                                         '-r', str(fps), '-i', '-', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', codec, '-crf', str(crf),
+                                         '-pix_fmt', 'yuv420p', filename], stdin=subprocess.PIPE)
+
+    def write(self, index, frame):
+        self.process.stdin.write(np.ascontiguousarray(frame).data)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError('ffmpeg failed to encode the video')
+
+
+#frames from a video file, an image directory or a glob pattern
+def openReader(path, fps=30.0):
+    if not isdir(path) and splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+        return VideoReader(path)
+    return ImageSequenceReader(path, fps)
+
+
+#a video file if the output has a video extension, otherwise a directory of frames
+def openWriter(path, width, height, fps):
+    if splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+        return VideoWriter(path, width, height, fps)
+    return FrameDirectoryWriter(path)
+
+
+#foveate all frames of reader along the gaze trace and pass them to writer
+#fov is any renderer with loadImgFromArray, run, saveImageAsync and flushImages, rendering happens in the calling thread
+#because the OpenGL context is current there, decoding and encoding run in their own threads
+#queueSize bounds the number of frames held by each queue, returns (frames, seconds)
+def foveateStream(fov, reader, gaze, writer, queueSize=8):
+    decoded = queue.Queue(maxsize=queueSize)
+    rendered = queue.Queue(maxsize=queueSize)
+    errors = []
+
+    def decode():
+        try:
+            for frame in reader:
+                decoded.put(frame)
+        except Exception as err:
+            errors.append(err)
+        decoded.put(END)
+
+    def encode():
+        while True:
+            item = rendered.get()
+            if item is END:
+                break
+            if errors:
+                #keep draining so that the render stage never blocks on a full queue
+                continue
+            try:
+                writer.write(*item)
+            except Exception as err:
+                errors.append(err)
+
+    #frames handed out by saveImageAsync are only valid during the call
+    def enqueue(index, frame):
+        rendered.put((index, np.ascontiguousarray(frame)))
+
+    decoder = threading.Thread(target=decode, daemon=True)
+    encoder = threading.Thread(target=encode)
+    decoder.start()
+    encoder.start()
+
+    start = time.perf_counter()
+    index = 0
+    try:
+        while not errors:
+            frame = decoded.get()
+            if frame is END:
+                break
+            #the gaze is moved after loading, loadImg would take a sample with a negative row or column for "no gaze"
+            #and center it, but eye trackers report such samples above or left of the frame
+            height, width = frame.shape[:2]
+            fov.loadImgFromArray(frame)
+            fov.moveGaze(gaze.at(index/reader.fps, width, height))
+            fov.run()
+            fov.saveImageAsync(index, writer=enqueue)
+            index += 1
+        fov.flushImages(writer=enqueue)
+    finally:
+        rendered.put(END)
+        encoder.join()
+        reader.close()
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+    writer.close()
+    return index, elapsed
@@ -0,0 +1,141 @@
+#command line interface of the foveated multiresolution coding (foveate/codec.py)
+#encodes images into containers and reports their size against full frame JPEG/PNG, or decodes containers to images
+import io
+import sys
+import getopt
+from os import listdir, makedirs
+from os.path import join, splitext
+
+import numpy as np
+from PIL import Image
+
+import foveate
+from foveate.codec import CODEC_FORMATS, BLOCK_SIZE, encodeFoveated, decodeFoveated
+
+#extension of the containers
+CONTAINER_EXT = '.fvmr'
+
+
+def usage():
+    print('Usage: python3 src/foveate_codec.py [options]')
+    print('Foveated multiresolution coding: stores of every pyramid level only the blocks the foveation needs')
+    print('Options:')
+    print('-h, --help\t\t', 'Displays this help')
+    print('-D, --decode\t\t', 'Decode the ' + CONTAINER_EXT + ' containers of the input directory to PNG images instead of encoding')
+    print('-m, --model\t\t', 'Foveation model: classic or gp (Geisler&Perry), default: classic')
+    print('-p, --gazePosition\t', "Gaze position coordinates (e.g. '--gazePosition 512,512'), default: center of the image")
+    print('-r, --gazeRadius\t', 'Radius of the circle around gaze position where the resolution of the image is the highest, default: 25 (classic model)')
+    print('-d, --viewDist\t\t', 'Distance to the stimuli in meters, default: 0.6 (gp model)')
+    print('-x, --pix2deg\t\t', 'Number of pixels per deg vis angle, default: 32 (gp model)')
+    print('-y, --pyramid\t\t', 'Image pyramid: mipmap (as built by the CPU backend), gaussian, laplacian or draft (coarse levels of JPEG files decoded at reduced scale), default: mipmap')
+    print('-f, --format\t\t', 'Compression of the blocks: jpg (lossy) or png (lossless), default: jpg')
+    print('-q, --quality\t\t', 'JPEG quality of the blocks and of the full frame JPEGs they are compared with (1-95), default: 75')
+    print('-B, --blockSize\t\t', 'Side of the blocks in texels, default: {}'.format(BLOCK_SIZE))
+    print('-i, --inputDir\t\t', 'Input directory, default: images')
+    print('-o, --outputDir\t\t', 'Output directory, default: output')
+
+
+def encodedSize(frame, fmt, quality):
+    stream = io.BytesIO()
+    if fmt == 'jpg':
+        Image.fromarray(frame).save(stream, format='JPEG', quality=quality)
+    else:
+        Image.fromarray(frame).save(stream, format='PNG')
+    return len(stream.getvalue())
+
+
+def main():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hDm:p:r:d:x:y:f:q:B:i:o:', ['help', 'decode', 'model=', 'gazePosition=', 'gazeRadius=', 'viewDist=', 'pix2deg=',
+                                                                             'pyramid=', 'format=', 'quality=', 'blockSize=', 'inputDir=', 'outputDir='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    decode = False
+    model = 'classic'
+    gazePosition = None
+    gazeRadius = 25
+    viewDist = 0.6
+    pix2deg = 32
+    pyramid = 'mipmap'
+    fmt = 'jpg'
+    quality = 75
+    blockSize = BLOCK_SIZE
+    inputDir = 'images'
+    outputDir = 'output'
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            usage()
+            sys.exit(2)
+        if o in ['-D', '--decode']:
+            decode = True
+        if o in ['-m', '--model']:
+            model = a
+        if o in ['-p', '--gazePosition']:
+            gazePosition = tuple([float(x) for x in a.split(',')])
+        if o in ['-r', '--gazeRadius']:
+            gazeRadius = float(a)
+        if o in ['-d', '--viewDist']:
+            viewDist = float(a)
+        if o in ['-x', '--pix2deg']:
+            pix2deg = float(a)
+        if o in ['-y', '--pyramid']:
+            pyramid = a
+        if o in ['-f', '--format']:
+            fmt = a
+        if o in ['-q', '--quality']:
+            quality = int(a)
+        if o in ['-B', '--blockSize']:
+            blockSize = int(a)
+        if o in ['-i', '--inputDir']:
+            inputDir = a
+        if o in ['-o', '--outputDir']:
+            outputDir = a
+
+    if fmt not in CODEC_FORMATS:
+        print('Unknown format {}'.format(fmt))
+        usage()
+        sys.exit(2)
+
+    makedirs(outputDir, exist_ok=True)
+
+    if decode:
+        for name in sorted(f for f in listdir(inputDir) if f.endswith(CONTAINER_EXT)):
+            with open(join(inputDir, name), 'rb') as f:
+                frame = decodeFoveated(f.read())
+            Image.fromarray(frame).save(join(outputDir, splitext(name)[0] + '.png'))
+        return
+
+    parameters = {'gazeRadius': gazeRadius, 'viewDist': viewDist, 'pix2deg': pix2deg}
+    imageList = sorted(f for f in listdir(inputDir) if any(f.endswith(ext) for ext in ['jpg', 'jpeg', 'bmp', 'png', 'gif']))
+
+    #bytes per frame of the container, of the foveated render compressed as the blocks and of the full frame as JPEG and PNG,
+    #ratio is the size of the full frame in the format of the blocks over the size of the container
+    print('{:<30} {:>12} {:>12} {:>12} {:>12} {:>8}'.format('image', 'container', 'foveated ' + fmt, 'full jpg', 'full png', 'ratio'))
+    full = 2 if fmt == 'jpg' else 3
+    totals = np.zeros(4)
+    for imgName in imageList:
+        image = Image.open(join(inputDir, imgName))
+        img = np.asarray(image.convert('RGB'))
+        #the draft pyramid decodes the file itself
+        data = encodeFoveated(image if pyramid == 'draft' else img, model, gazePosition, pyramid=pyramid, blockSize=blockSize, fmt=fmt, quality=quality, **parameters)
+        with open(join(outputDir, splitext(imgName)[0] + CONTAINER_EXT), 'wb') as f:
+            f.write(data)
+
+        renderer = foveate.createRenderer(model, backend='cpu', pyramid=pyramid, **parameters)
+        renderer.loadImgFromArray(img)
+        if gazePosition is not None:
+            renderer.moveGaze(gazePosition)
+        sizes = [len(data), encodedSize(renderer.run(), fmt, quality), encodedSize(img, 'jpg', quality), encodedSize(img, 'png', quality)]
+        totals += sizes
+        print('{:<30} {:>12} {:>12} {:>12} {:>12} {:>8.2f}'.format(imgName, *sizes, sizes[full]/sizes[0]))
+    if imageList:
+        means = totals/len(imageList)
+        print('{:<30} {:>12.0f} {:>12.0f} {:>12.0f} {:>12.0f} {:>8.2f}'.format('mean', *means, means[full]/means[0]))
+
+if __name__ == "__main__":
+    main()
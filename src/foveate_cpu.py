@@ -0,0 +1,91 @@
+#command line interface of the CPU (numpy) renderers of both foveation models (foveate/cpu.py)
+import sys
+import getopt
+from os import listdir, makedirs
+from os.path import join
+import foveate
+
+
+def usage():
+    print('Usage: python3 src/foveate_cpu.py [options]')
+    print('Foveation transform over static images on the CPU (numpy), for machines without OpenGL')
+    print('Options:')
+    print('-h, --help\t\t', 'Displays this help')
+    print('-m, --model\t\t', 'Foveation model: classic (as foveate_ogl.py) or gp (Geisler&Perry, as foveate_gp_ogl.py), default: classic')
+    print('-p, --gazePosition\t', "Gaze position coordinates (e.g. '--gazePosition 512,512'), default: center of the image")
+    print('-r, --gazeRadius\t', 'Radius of the circle around gaze position where the resolution of the image is the highest, default: 25 (classic model)')
+    print('-d, --viewDist\t\t', 'Distance to the stimuli in meters, default: 0.6 (gp model)')
+    print('-x, --pix2deg\t\t', 'Number of pixels per deg vis angle, default: 32 (gp model)')
+    print('-C, --cacheDir\t\t', 'Cache decoded images and their pyramids in this directory for later runs, default: no cache')
+    print('-y, --pyramid\t\t', 'Image pyramid: mipmap (glGenerateMipmap), gaussian, laplacian (gaussian, blended with cubic expansion) or draft (coarse levels of JPEG files decoded at reduced scale), default: mipmap')
+    print('-s, --outputSize\t', "Render the outputs at this resolution (e.g. '--outputSize 224x224'), gaze positions stay in image pixels, default: size of the image")
+    print('-i, --inputDir\t\t', 'Input directory, default: images')
+    print('-o, --outputDir\t\t', 'Output directory, default: output')
+
+def main():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hm:p:r:d:x:y:C:s:i:o:', ['help', 'model=', 'gazePosition=', 'gazeRadius=', 'viewDist=', 'pix2deg=', 'pyramid=', 'cacheDir=', 'outputSize=',
+                                                                  'inputDir=', 'outputDir='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    model = 'classic'
+    gazePosition = (-1, -1)
+    gazeRadius = 25
+    viewDist = 0.6
+    pix2deg = 32
+    pyramid = 'mipmap'
+    cacheDir = None
+    outputSize = None
+    inputDir = 'images'
+    outputDir = 'output'
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            usage()
+            sys.exit(2)
+        if o in ['-m', '--model']:
+            model = a
+        if o in ['-p', '--gazePosition']:
+            gazePosition = tuple([float(x) for x in a.split(',')])
+        if o in ['-r', '--gazeRadius']:
+            gazeRadius = float(a)
+        if o in ['-d', '--viewDist']:
+            viewDist = float(a)
+        if o in ['-x', '--pix2deg']:
+            pix2deg = float(a)
+        if o in ['-y', '--pyramid']:
+            pyramid = a
+        if o in ['-C', '--cacheDir']:
+            cacheDir = a
+        if o in ['-s', '--outputSize']:
+            outputSize = tuple(int(x) for x in a.split('x'))
+        if o in ['-i', '--inputDir']:
+            inputDir = a
+        if o in ['-o', '--outputDir']:
+            outputDir = a
+
+    if model == 'classic':
+        fov_cpu = foveate.Foveate_CPU(gazeRadius=gazeRadius, gazePosition=gazePosition, pyramid=pyramid, cache=cacheDir, outputSize=outputSize)
+    elif model == 'gp':
+        fov_cpu = foveate.Foveate_GP_CPU(viewDist=viewDist, gazePosition=gazePosition, pix2deg=pix2deg, pyramid=pyramid, cache=cacheDir,
+                                         outputSize=outputSize)
+    else:
+        print('Unknown model {}'.format(model))
+        usage()
+        sys.exit(2)
+
+    imageList = [f for f in listdir(inputDir) if any(f.endswith(ext) for ext in ['jpg', 'jpeg', 'bmp', 'png', 'gif']) ]
+
+    makedirs(outputDir, exist_ok=True)
+
+    for imgName in imageList:
+        fov_cpu.loadImgFromFile(imgFilename=join(inputDir, imgName))
+        fov_cpu.run()
+        fov_cpu.saveImage(join(outputDir, imgName))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#Command line interface of the real-time gaze-contingent mode (foveate/interactive.py)
+#shows an image foveated at the mouse cursor or along a replayed gaze log and reports frame time and latency
+import sys
+import getopt
+
+from foveate import gl_context, createRenderer
+from foveate.interactive import MouseGaze, ReplayGaze, runInteractive, printStats
+from foveate.video import readGazeLog
+
+
+def usage():
+    print('Usage: python3 src/foveate_interactive.py [options]')
+    print('Real-time gaze-contingent foveation of an image, driven by the mouse or a replayed gaze log')
+    print('Options:')
+    print('-h, --help\t\t', 'Displays this help')
+    print('-m, --model\t\t', 'Foveation model: classic or gp (Geisler&Perry), default: classic')
+    print('-i, --image\t\t', 'Image to display, default: images/Yarbus_scaled.jpg')
+    print('-g, --gazeLog\t\t', 'Replay gaze from a CSV or TSV eye tracker export instead of following the mouse')
+    print('-c, --columns\t\t', "Names of the time, x and y columns of the gaze log, default: detected from the header")
+    print('-t, --timeScale\t\t', 'Factor converting the time column to seconds (e.g. 0.001 for milliseconds), default: 1')
+    print('-n, --normalized\t', 'Gaze coordinates are given as fractions of the image size')
+    print('-l, --loop\t\t', 'Replay the gaze log in a loop')
+    print('-T, --duration\t\t', 'Stop after this many seconds')
+    print('-s, --swapInterval\t', 'Display refreshes per frame, 0 disables vsync, default: 1')
+    print('-b, --backend\t\t', 'OpenGL context backend: auto, glfw, egl or osmesa, default: auto (glfw with a window if there is a display)')
+    print('-H, --headless\t\t', 'Render offscreen without a window (gaze log replay only)')
+    print('-y, --pyramid\t\t', 'Image pyramid: mipmap (glGenerateMipmap), gaussian, laplacian (gaussian, blended with cubic expansion) or draft (coarse levels of JPEG files decoded at reduced scale), default: mipmap')
+    print('-r, --gazeRadius\t', 'Radius of the fovea, default: 25 (classic model)')
+    print('-d, --viewDist\t\t', 'Distance to the stimuli in meters, default: 0.6 (gp model)')
+    print('-x, --pix2deg\t\t', 'Number of pixels per deg vis angle, default: 32 (gp model)')
+
+def main():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hm:i:g:c:t:nlT:s:b:Hy:r:d:x:', ['help', 'model=', 'image=', 'gazeLog=', 'columns=', 'timeScale=',
+                                                                            'normalized', 'loop', 'duration=', 'swapInterval=', 'backend=',
+                                                                            'headless', 'pyramid=', 'gazeRadius=', 'viewDist=', 'pix2deg='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    model = 'classic'
+    imgFilename = 'images/Yarbus_scaled.jpg'
+    gazeLog = None
+    columns = (None, None, None)
+    timeScale = 1.0
+    normalized = False
+    loop = False
+    duration = None
+    swapInterval = 1
+    backend = 'auto'
+    visualize = True
+    gazeRadius = 25
+    viewDist = 0.6
+    pix2deg = 32
+    pyramid = 'mipmap'
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            usage()
+            sys.exit(2)
+        if o in ['-m', '--model']:
+            model = a
+        if o in ['-i', '--image']:
+            imgFilename = a
+        if o in ['-g', '--gazeLog']:
+            gazeLog = a
+        if o in ['-c', '--columns']:
+            columns = tuple(a.split(','))
+        if o in ['-t', '--timeScale']:
+            timeScale = float(a)
+        if o in ['-n', '--normalized']:
+            normalized = True
+        if o in ['-l', '--loop']:
+            loop = True
+        if o in ['-T', '--duration']:
+            duration = float(a)
+        if o in ['-s', '--swapInterval']:
+            swapInterval = int(a)
+        if o in ['-b', '--backend']:
+            backend = a
+        if o in ['-H', '--headless']:
+            visualize = False
+        if o in ['-y', '--pyramid']:
+            pyramid = a
+        if o in ['-r', '--gazeRadius']:
+            gazeRadius = float(a)
+        if o in ['-d', '--viewDist']:
+            viewDist = float(a)
+        if o in ['-x', '--pix2deg']:
+            pix2deg = float(a)
+
+    if not visualize and gazeLog is None:
+        print('Headless mode needs a gaze log to replay')
+        sys.exit(2)
+
+    gl_context.relaunchForBackend(backend, visible=visualize)
+    fov = createRenderer(model, backend=backend, visualize=visualize, gazeRadius=gazeRadius, viewDist=viewDist, pix2deg=pix2deg,
+                         pyramid=pyramid)
+
+    fov.loadImgFromFile(imgFilename=imgFilename)
+
+    if gazeLog is None:
+        source = MouseGaze(fov)
+    else:
+        times, points = readGazeLog(gazeLog, *columns, timeScale=timeScale)
+        source = ReplayGaze(fov, times, points, normalized=normalized, loop=loop)
+
+    frameTimes, latencies = runInteractive(fov, source, duration=duration, swapInterval=swapInterval)
+    printStats('frame time', frameTimes)
+    printStats('gaze-to-photon latency', latencies)
+
+    fov.context.terminate()
+
+if __name__ == "__main__":
+    main()
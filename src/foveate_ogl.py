@@ -1,247 +1,10 @@
-
-import glfw
-from OpenGL.GL import *
-import OpenGL.GL.shaders
-import numpy
-from PIL import Image
+#command line interface of the classic foveation model, the renderer is in the foveate package (foveate/renderer.py)
 import sys
-import time
 import getopt
 from os import listdir, makedirs
-from os.path import join
-
-MAX_SIZE = 5000
-
-
-#fragment shader for Geisler & Perry implementation
-gp_fragment_shader = """
-	#version 330
-
-	#define epsilon2  2.3
-	#define CTO 0.015625 //1/64
-	#define alpha 0.106
-	#define PI 3.14
-
-
-	in vec3 newColor;
-	in vec2 outTexCoords;
-	in float gazeRadius;
-	in vec2 gazePosition;
-
-	out vec4 outColor;
-	uniform sampler2D imageTexture;
-	uniform sampler2D lodTexture; #which lod values to use for each pixel
-
-	void main()
-	{
-		float lod = texture2D(lodTexture, outTexCoords);		
-		outColor = textureLod(imageTexture, outTexCoords, lod);
-	}
-	"""
-
-
-
-#shaders below are adapted from BlurredMipmapDemo in PsychToolBox
-#(C) 2012 Mario Kleiner - Licensed under MIT license.
-
-vertex_shader = """
-	#version 330
-	layout(location = 0) in vec3 position;
-	layout(location = 1) in vec3 color;
-	layout(location = 2) in vec2 inTexCoords;
-	uniform vec3 auxParameters;
-
-	out vec3 newColor;
-	out vec2 outTexCoords;
-	out float gazeRadius;
-	out vec2 gazePosition;
-
-	void main()
-	{
-		gl_Position = vec4(position, 1.0f);
-		newColor = color;
-		outTexCoords = inTexCoords;
-		gazeRadius = auxParameters[0];
-		gazePosition = vec2(auxParameters[1], auxParameters[2]);
-	}
-	"""
-
-fragment_shader = """
-	#version 330
-	in vec3 newColor;
-	in vec2 outTexCoords;
-	in float gazeRadius;
-	in vec2 gazePosition;
-
-	out vec4 outColor;
-	uniform sampler2D imageTexture;
-	void main()
-	{
-		vec2 outpos = gl_FragCoord.xy;
-		float lod = log2(distance(outpos, gazePosition) / gazeRadius);		
-		outColor = textureLod(imageTexture, outTexCoords, lod);
-	}
-	"""
-
-
-class Foveate_OGL:
-	def __init__(self, gazeRadius=25, gazePosition=(-1, -1), visualize = True):
-		self.gazeRadius = gazeRadius
-		self.gazePosition = gazePosition
-
-		self.visualize = visualize
-
-		self.initGLFW()
-		self.initBuffers()
-
-
-	def initGLFW(self):
-		if not glfw.init():
-			print('ERROR: Failed to initialize GLFW!')
-			return
-		#creating the window
-		if not self.visualize:
-			glfw.window_hint(glfw.VISIBLE, glfw.FALSE) #we cannot create OpenGL context without some sort of window, so we just hide it if no visualization is needed
-	
-		self.window = glfw.create_window(1024, 980, "foveated", None, None)
-
-		if not self.window:
-			glfw.terminate()
-			print('ERROR: Failed to create GLFW window!')
-			return
-
-		glfw.make_context_current(self.window)
-
-	def initBuffers(self):
-		# Below is the code with coordinates for textured quad, these are fixed
-		#		   positions		colors		  texture coords
-		quad = [   -1, -1, 0.0,  1.0, 0.0, 0.0,  0.0, 1.0,
-					1, -1, 0.0,  0.0, 1.0, 0.0,  1.0, 1.0,
-					1,  1, 0.0,  0.0, 0.0, 1.0,  1.0, 0.0,
-				   -1,  1, 0.0,  1.0, 1.0, 1.0,  0.0, 0.0]
-
-		quad = numpy.array(quad, dtype = numpy.float32)
-
-		indices = [0, 1, 2,
-				   2, 3, 0]
-		indices = numpy.array(indices, dtype= numpy.uint32)
-
-
-		self.shader = OpenGL.GL.shaders.compileProgram(OpenGL.GL.shaders.compileShader(vertex_shader, GL_VERTEX_SHADER),
-												  OpenGL.GL.shaders.compileShader(fragment_shader, GL_FRAGMENT_SHADER))
-
-
-		VBO = glGenBuffers(1)
-		glBindBuffer(GL_ARRAY_BUFFER, VBO)
-		glBufferData(GL_ARRAY_BUFFER, 128, quad, GL_STATIC_DRAW)
-
-		EBO = glGenBuffers(1)
-		glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, EBO)
-		glBufferData(GL_ELEMENT_ARRAY_BUFFER, 24, indices, GL_STATIC_DRAW)
-
-		#position = glGetAttribLocation(shader, "position")
-		glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 32, ctypes.c_void_p(0))
-		glEnableVertexAttribArray(0)
-
-		#color = glGetAttribLocation(shader, "color")
-		glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 32, ctypes.c_void_p(12))
-		glEnableVertexAttribArray(1)
-
-		#texCoords = glGetAttribLocation(shader, "inTexCoords")
-		glVertexAttribPointer(2, 2, GL_FLOAT, GL_FALSE, 32, ctypes.c_void_p(24))
-		glEnableVertexAttribArray(2)
-
-		self.auxParametersLoc = glGetUniformLocation(self.shader, 'auxParameters')
-
-		self.texture = glGenTextures(1)
-		glBindTexture(GL_TEXTURE_2D, self.texture)
-		#texture wrapping params
-		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-		#texture filtering params
-		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
-		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-
-		if not self.visualize:
-			self.FBO = glGenFramebuffers(1)
-			glBindFramebuffer(GL_FRAMEBUFFER, self.FBO)
-			glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
-
-			self.RBO = glGenRenderbuffers(1)
-			glBindRenderbuffer(GL_RENDERBUFFER, self.RBO)
-			glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA, MAX_SIZE, MAX_SIZE)
-			glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.RBO)
-
-		glUseProgram(self.shader)
-
-	#load image from array
-	def loadImgFromArray(self, img = None):
-		self.img = img.copy()
-		self.img_width, self.img_height = self.img.size
-		if self.visualize:
-			glfw.set_window_size(self.window, self.img_width, self.img_height)
-		self.updateTexture()
-		if self.gazePosition[0] < 0:
-			self.gazePosition = (self.img_height/2, self.img_width/2)
-			self.updateGaze(gazeRadius, gazePosition)
-
-	#load image from file
-	def loadImgFromFile(self, imgFilename='images/Yarbus_scaled.jpg'):
-		self.img = Image.open(imgFilename)
-		self.img_width, self.img_height = self.img.size
-		if self.visualize:
-			glfw.set_window_size(self.window, self.img_width, self.img_height)
-
-		self.updateTexture()
-
-		if self.gazePosition[0] < 0:
-			gazePosition = (self.img_height/2, self.img_width/2)
-		else:
-			gazePosition = self.gazePosition
-		self.updateGaze(self.gazeRadius, gazePosition)
-
-	def updateGaze(self, newGazeRadius, newGazePosition):
-		self.gazePosition = newGazePosition
-		self.gazeRadius = newGazeRadius
-		glUniform3f(self.auxParametersLoc, float(self.gazeRadius), float(self.gazePosition[1]), self.img_height - float(self.gazePosition[0]))
-
-	def updateTexture(self):
-		self.img_width, self.img_height = self.img.size
-
-		img_data = numpy.array(list(self.img.getdata()), numpy.uint8)
-		glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, self.img_width, self.img_height, 0, GL_RGB, GL_UNSIGNED_BYTE, img_data)
-		glGenerateMipmap(GL_TEXTURE_2D);
-
-	def saveImage(self, filename):
-		if self.visualize: 
-			glReadBuffer(GL_FRONT)
-		else:
-			glReadBuffer(GL_COLOR_ATTACHMENT0)
-
-		pixels = glReadPixels(0,0,self.img_width,self.img_height,GL_RGB,GL_UNSIGNED_BYTE)
-		image = Image.frombytes("RGB", (self.img_width,self.img_height), pixels)
-		image = image.transpose( Image.FLIP_TOP_BOTTOM)
-		image.save(filename)
-
-	def run(self):
-
-		if not self.visualize:
-			if not glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE:
-				print('Error: Framebuffer binding failed!')
-				exit()
-				glBindFramebuffer(GL_FRAMEBUFFER, 0)
-
-		glClear(GL_COLOR_BUFFER_BIT)
-
-		glViewport(0, 0, self.img_width, self.img_height)
-
-		glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
-
-		glfw.swap_buffers(self.window)
-		glfw.poll_events()		
-
-		if self.visualize:
-			time.sleep(0.5)	
+from os.path import join, basename
+import foveate
+from foveate import gl_context, image_utils, sinks
 
 
 def usage():
@@ -254,19 +17,41 @@ def usage():
 	print('-d, --viewDist\t', 'Viewing distance in m (default 0.60)')
 	print('-x, --pix2deg\t', 'Number of pixels per degree of visual angle (default 32)')
 	print('-v, --visualize\t\t', 'Show foveated images')
+	print('-b, --backend\t\t', 'OpenGL context backend: auto, glfw, egl or osmesa (default auto, headless EGL/OSMesa if there is no display)')
+	print('-l, --lodMode\t\t', 'Level of detail computed per pixel in the shader (shader) or read from a precomputed radial table (table), default: shader')
+	print('-y, --pyramid\t\t', 'Image pyramid: mipmap (glGenerateMipmap), gaussian, laplacian (gaussian, blended with cubic expansion) or draft (coarse levels of JPEG files decoded at reduced scale), default: mipmap')
+	print('-C, --cacheDir\t\t', 'Cache decoded images and their pyramids in this directory for later runs, default: no cache')
+	print('-s, --outputSize\t', "Render the outputs at this resolution (e.g. '--outputSize 224x224'), gaze positions stay in image pixels, default: size of the image")
+	print('-k, --layers\t\t', 'Foveate up to this many consecutive images of the same size with one draw call (texture array), default: 1')
+	print('-f, --format\t\t', 'Output format: auto (extension of the input), png, jpg, npy (one array file per image) or chunked (all images in one array file, foveated.npy), default: auto')
+	print('-c, --pngLevel\t\t', 'Compression level of PNG output, 0 (fastest) to 9, default: 6')
+	print('-Q, --jpegQuality\t', 'Quality of JPEG output, 1 to 95, default: 75')
+	print('-j, --threads\t\t', 'Number of threads encoding the output images, 0 encodes on the render thread, default: 2')
+	print('-q, --queueSize\t\t', 'Maximum number of images waiting to be encoded, default: 8')
 	print('-i, --inputDir\t\t', 'Input directory, default: images')
 	print('-o, --outputDir\t\t', 'Output directory, default: output')
 
 def main():
 
 	try:
-		opts, args = getopt.getopt(sys.argv[1:], 'hp:r:d:i:o:v', ['help','gazePosition', 'gazeRadius', 'inputDir', 'outputDir', 'visualize'])
+		opts, args = getopt.getopt(sys.argv[1:], 'hp:r:d:i:o:vb:l:k:y:C:s:f:c:Q:j:q:', ['help','gazePosition', 'gazeRadius', 'inputDir', 'outputDir', 'visualize', 'backend=', 'lodMode=', 'layers=', 'pyramid=', 'cacheDir=', 'outputSize=', 'format=', 'pngLevel=', 'jpegQuality=', 'threads=', 'queueSize='])
 	except getopt.GetoptError as err:
 		print(str(err))
 		usage()
 		sys.exit(2)
 
 	visualize = False
+	backend = 'auto'
+	lodMode = 'shader'
+	layers = 1
+	pyramid = 'mipmap'
+	cacheDir = None
+	outputSize = None
+	outputFormat = 'auto'
+	pngLevel = None
+	jpegQuality = None
+	threads = 2
+	queueSize = 8
 	gazePosition = (-1, -1)
 	gazeRadius = 25
 	inputDir = 'images'
@@ -280,6 +65,28 @@ def main():
 			sys.exit(2)
 		if o in ['-v', '--visualize']:
 			visualize = True
+		if o in ['-b', '--backend']:
+			backend = a
+		if o in ['-l', '--lodMode']:
+			lodMode = a
+		if o in ['-k', '--layers']:
+			layers = int(a)
+		if o in ['-y', '--pyramid']:
+			pyramid = a
+		if o in ['-C', '--cacheDir']:
+			cacheDir = a
+		if o in ['-s', '--outputSize']:
+			outputSize = tuple(int(x) for x in a.split('x'))
+		if o in ['-f', '--format']:
+			outputFormat = a
+		if o in ['-c', '--pngLevel']:
+			pngLevel = int(a)
+		if o in ['-Q', '--jpegQuality']:
+			jpegQuality = int(a)
+		if o in ['-j', '--threads']:
+			threads = int(a)
+		if o in ['-q', '--queueSize']:
+			queueSize = int(a)
 		if o in ['-p', '--gazePosition']:
 			gazePosition = tuple([float(x) for x in a.split(',')])
 		if o in ['-r', '--gazeRadius']:
@@ -290,21 +97,40 @@ def main():
 			outputDir = a
 			saveOutput = True
 
-	fov_ogl = Foveate_OGL(gazeRadius=gazeRadius, gazePosition=gazePosition, visualize=visualize)
+	gl_context.relaunchForBackend(backend, visible=visualize)
+	fov_ogl = foveate.Foveate_OGL(gazeRadius=gazeRadius, gazePosition=gazePosition, visualize=visualize, backend=backend, lodMode=lodMode, pyramid=pyramid, cache=cacheDir, outputSize=outputSize)
 
 	imageList = [f for f in listdir(inputDir) if any(f.endswith(ext) for ext in ['jpg', 'jpeg', 'bmp', 'png', 'gif']) ]
 	
 	if saveOutput:
 		makedirs(outputDir, exist_ok=True)
+		#images are encoded on other threads while the next ones are rendered
+		sink = sinks.createSink(outputFormat, pngLevel=pngLevel, jpegQuality=jpegQuality, threads=threads, queueSize=queueSize,
+		                        path=join(outputDir, 'foveated.npy'))
+		fov_ogl.setSink(sink)
+
+	if layers > 1 and not visualize:
+		#images of the same size are rendered together into a texture array
+		gazePoints = None if gazePosition[0] < 0 else [gazePosition]
+		for group in image_utils.groupBySize([join(inputDir, imgName) for imgName in imageList], layers):
+			frames = fov_ogl.foveate_array(group, None if gazePoints is None else gazePoints*len(group))
+			if saveOutput:
+				for filename, frame in zip(group, frames):
+					sink.write(join(outputDir, basename(filename)), frame)
+		imageList = []
 
 	for imgName in imageList:
 		fov_ogl.loadImgFromFile(imgFilename=join(inputDir, imgName))
 		fov_ogl.run()
 
 		if saveOutput:
-			fov_ogl.saveImage(join(outputDir, imgName))
+			fov_ogl.saveImageAsync(join(outputDir, imgName))
+
+	if saveOutput:
+		fov_ogl.flushImages()
+		sink.close()
 
-	glfw.terminate()
+	fov_ogl.context.terminate()
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,103 @@
+#Command line interface of the process-pool batch driver (foveate/pool.py)
+#foveates large (optionally recursive) image directories with a pool of worker processes
+import sys
+import getopt
+
+import foveate
+from foveate import gl_context
+from foveate.pool import runPool, printReport
+
+
+def usage():
+    print('Usage: python3 src/foveate_pool.py [options]')
+    print('Foveation of large image directories with a pool of worker processes')
+    print('Options:')
+    print('-h, --help\t\t', 'Displays this help')
+    print('-m, --model\t\t', 'Foveation model: classic (foveate_ogl.py) or gp (Geisler&Perry, foveate_gp_ogl.py), default: classic')
+    print('-b, --backend\t\t', 'Renderer backend of the workers: auto, egl, osmesa, glfw or cpu, default: auto')
+    print('-j, --workers\t\t', 'Number of worker processes, default: number of cores')
+    print('-q, --queueSize\t\t', 'Maximum number of rendered images waiting to be written per worker, default: 4')
+    print('-R, --recursive\t\t', 'Process subdirectories of the input directory')
+    print('-s, --resume\t\t', 'Skip images whose output already exists')
+    print('-p, --gazePosition\t', "Gaze position coordinates (e.g. '--gazePosition 512,512'), default: center of the image")
+    print('-r, --gazeRadius\t', 'Radius of the fovea, default: 25 (classic model)')
+    print('-d, --viewDist\t\t', 'Distance to the stimuli in meters, default: 0.6 (gp model)')
+    print('-x, --pix2deg\t\t', 'Number of pixels per deg vis angle, default: 32 (gp model)')
+    print('-y, --pyramid\t\t', 'Image pyramid: mipmap (glGenerateMipmap), gaussian, laplacian (gaussian, blended with cubic expansion) or draft (coarse levels of JPEG files decoded at reduced scale), default: mipmap')
+    print('-C, --cacheDir\t\t', 'Cache decoded images and their pyramids in this directory for later runs, default: no cache')
+    print('-i, --inputDir\t\t', 'Input directory, default: images')
+    print('-o, --outputDir\t\t', 'Output directory, default: output')
+
+def main():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hm:b:j:q:Rsp:r:d:x:y:C:i:o:', ['help', 'model=', 'backend=', 'workers=', 'queueSize=', 'recursive', 'resume',
+                                                                          'gazePosition=', 'gazeRadius=', 'viewDist=', 'pix2deg=', 'pyramid=', 'cacheDir=', 'inputDir=', 'outputDir='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    options = {'model': 'classic', 'backend': 'auto', 'queueSize': 4, 'gazePosition': (-1, -1), 'gazeRadius': 25, 'viewDist': 0.6, 'pix2deg': 32, 'pyramid': 'mipmap',
+               'cacheDir': None}
+    numWorkers = None
+    recursive = False
+    resume = False
+    inputDir = 'images'
+    outputDir = 'output'
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            usage()
+            sys.exit(2)
+        if o in ['-m', '--model']:
+            options['model'] = a
+        if o in ['-b', '--backend']:
+            options['backend'] = a
+        if o in ['-j', '--workers']:
+            numWorkers = int(a)
+        if o in ['-q', '--queueSize']:
+            options['queueSize'] = int(a)
+        if o in ['-R', '--recursive']:
+            recursive = True
+        if o in ['-s', '--resume']:
+            resume = True
+        if o in ['-p', '--gazePosition']:
+            options['gazePosition'] = tuple([float(x) for x in a.split(',')])
+        if o in ['-r', '--gazeRadius']:
+            options['gazeRadius'] = float(a)
+        if o in ['-d', '--viewDist']:
+            options['viewDist'] = float(a)
+        if o in ['-x', '--pix2deg']:
+            options['pix2deg'] = float(a)
+        if o in ['-y', '--pyramid']:
+            options['pyramid'] = a
+        if o in ['-C', '--cacheDir']:
+            options['cacheDir'] = a
+        if o in ['-i', '--inputDir']:
+            inputDir = a
+        if o in ['-o', '--outputDir']:
+            outputDir = a
+
+    if options['model'] not in ['classic', 'gp']:
+        print('Unknown model {}'.format(options['model']))
+        usage()
+        sys.exit(2)
+
+    if options['pyramid'] not in foveate.PYRAMIDS:
+        print('Unknown pyramid {}'.format(options['pyramid']))
+        usage()
+        sys.exit(2)
+
+    if options['backend'] not in ['auto', 'cpu'] + gl_context.BACKENDS:
+        print('Unknown backend {}'.format(options['backend']))
+        usage()
+        sys.exit(2)
+
+    report = runPool(inputDir, outputDir, options, numWorkers=numWorkers, recursive=recursive, resume=resume)
+    printReport(report)
+    if report['failed'] or report['errors']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
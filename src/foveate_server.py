@@ -0,0 +1,101 @@
+#Command line interface of the persistent foveation service (foveate/server.py)
+#keeps warm OpenGL contexts and serves foveation requests over a Unix socket or a local HTTP port until interrupted
+import sys
+import json
+import getopt
+import signal
+
+from foveate import gl_context
+from foveate.server import FoveationServer, createHTTPServer
+
+
+def usage():
+    print('Usage: python3 src/foveate_server.py [options]')
+    print('Persistent foveation service with warm OpenGL contexts, see foveate/server.py for the request format')
+    print('Options:')
+    print('-h, --help\t\t', 'Displays this help')
+    print('-s, --socket\t\t', 'Listen on this Unix socket instead of a TCP port')
+    print('-H, --host\t\t', 'Host of the HTTP server, default: 127.0.0.1')
+    print('-P, --port\t\t', 'Port of the HTTP server, default: 8470')
+    print('-w, --workers\t\t', 'Number of worker threads, each with its own contexts, default: 1')
+    print('-q, --queueSize\t\t', 'Maximum number of waiting requests, more are rejected with 503, default: 64')
+    print('-n, --batchSize\t\t', 'Maximum number of waiting requests a worker renders together, default: 16')
+    print('-m, --model\t\t', 'Default foveation model: classic or gp (Geisler&Perry), default: classic')
+    print('-b, --backend\t\t', 'Renderer backend: auto, egl, osmesa or cpu, default: auto')
+    print('-l, --lodMode\t\t', 'LOD computation of the OpenGL renderers: shader or table, default: shader')
+    print('-y, --pyramid\t\t', 'Default image pyramid: mipmap, gaussian, laplacian or draft, default: mipmap')
+    print('-C, --cacheDir\t\t', 'Cache decoded images and their pyramids in this directory, default: no cache')
+    print('-r, --gazeRadius\t', 'Default radius of the fovea, default: 25 (classic model)')
+    print('-d, --viewDist\t\t', 'Default distance to the stimuli in meters, default: 0.6 (gp model)')
+    print('-x, --pix2deg\t\t', 'Default number of pixels per deg vis angle, default: 32 (gp model)')
+
+def main():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hs:H:P:w:q:n:m:b:l:y:C:r:d:x:', ['help', 'socket=', 'host=', 'port=', 'workers=', 'queueSize=', 'batchSize=',
+                                                                              'model=', 'backend=', 'lodMode=', 'pyramid=', 'cacheDir=', 'gazeRadius=',
+                                                                              'viewDist=', 'pix2deg='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    options = {'model': 'classic', 'backend': 'auto', 'lodMode': 'shader', 'pyramid': 'mipmap', 'cacheDir': None, 'gazeRadius': 25, 'viewDist': 0.6, 'pix2deg': 32}
+    socketPath = None
+    host = '127.0.0.1'
+    port = 8470
+    workers = 1
+    queueSize = 64
+    batchSize = 16
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            usage()
+            sys.exit(2)
+        if o in ['-s', '--socket']:
+            socketPath = a
+        if o in ['-H', '--host']:
+            host = a
+        if o in ['-P', '--port']:
+            port = int(a)
+        if o in ['-w', '--workers']:
+            workers = int(a)
+        if o in ['-q', '--queueSize']:
+            queueSize = int(a)
+        if o in ['-n', '--batchSize']:
+            batchSize = int(a)
+        if o in ['-m', '--model']:
+            options['model'] = a
+        if o in ['-b', '--backend']:
+            options['backend'] = a
+        if o in ['-l', '--lodMode']:
+            options['lodMode'] = a
+        if o in ['-y', '--pyramid']:
+            options['pyramid'] = a
+        if o in ['-C', '--cacheDir']:
+            options['cacheDir'] = a
+        if o in ['-r', '--gazeRadius']:
+            options['gazeRadius'] = float(a)
+        if o in ['-d', '--viewDist']:
+            options['viewDist'] = float(a)
+        if o in ['-x', '--pix2deg']:
+            options['pix2deg'] = float(a)
+
+    if options['backend'] != 'cpu':
+        #contexts are created on worker threads, which only works with the headless backends
+        gl_context.relaunchForBackend(options['backend'], visible=False)
+    foveation = FoveationServer(options, workers=workers, queueSize=queueSize, batchSize=batchSize)
+    server = createHTTPServer(foveation, socketPath=socketPath, host=host, port=port)
+    #stop on SIGTERM as on Ctrl-C, so that the service shuts down its workers and reports its statistics
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print('listening on {}'.format(socketPath or 'http://{}:{}'.format(host, port)), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    foveation.close()
+    print(json.dumps(foveation.stats(), indent=1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#command line interface of the tiled renderer for images beyond the OpenGL texture limits (foveate/tiled.py)
+import sys
+import getopt
+
+from foveate import gl_context, createModel, createSink
+
+
+def usage():
+    print('Usage: python3 src/foveate_tiled.py -i image -o output [options]')
+    print('Foveation transform of a very large image (e.g. gigapixel), rendered and written tile by tile')
+    print('Options:')
+    print('-h, --help\t\t', 'Displays this help')
+    print('-m, --model\t\t', 'Foveation model: classic or gp (Geisler&Perry), default: classic')
+    print('-i, --image\t\t', 'Input image, .npy arrays (H x W x 3 uint8) are memory mapped, other formats are decoded by PIL')
+    print('-o, --output\t\t', 'Output .npy file (H x W x 3 uint8) or directory for one image file per tile named <row>_<col>.png')
+    print('-t, --tileSize\t\t', 'Width and height of the tiles in pixels, default: 1024')
+    print('-w, --workDir\t\t', 'Directory of the pyramid level files, default: a temporary directory')
+    print('-p, --gazePosition\t', "Gaze position coordinates (e.g. '--gazePosition 512,512'), default: center of the image")
+    print('-r, --gazeRadius\t', 'Radius of the circle around gaze position where the resolution of the image is the highest, default: 25 (classic model)')
+    print('-d, --viewDist\t\t', 'Distance to the stimuli in meters, default: 0.6 (gp model)')
+    print('-x, --pix2deg\t\t', 'Number of pixels per deg vis angle, default: 32 (gp model)')
+    print('-y, --pyramid\t\t', 'Image pyramid: mipmap, gaussian or laplacian (gaussian, blended with cubic expansion), default: mipmap')
+    print('-f, --format\t\t', 'Format of the tile files: png, jpg or npy, default: png')
+    print('-j, --threads\t\t', 'Number of threads encoding the tile files, default: 2')
+    print('-b, --backend\t\t', 'OpenGL context backend: auto, egl, osmesa or glfw, default: auto')
+
+def main():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hm:i:o:t:w:p:r:d:x:y:f:j:b:', ['help', 'model=', 'image=', 'output=', 'tileSize=', 'workDir=',
+                                                                          'gazePosition=', 'gazeRadius=', 'viewDist=', 'pix2deg=', 'pyramid=',
+                                                                          'format=', 'threads=', 'backend='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    model = 'classic'
+    imgFilename = None
+    output = None
+    tileSize = 1024
+    workDir = None
+    gazePosition = (-1, -1)
+    gazeRadius = 25
+    viewDist = 0.6
+    pix2deg = 32
+    pyramid = 'mipmap'
+    imgFormat = 'png'
+    threads = 2
+    backend = 'auto'
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            usage()
+            sys.exit(2)
+        if o in ['-m', '--model']:
+            model = a
+        if o in ['-i', '--image']:
+            imgFilename = a
+        if o in ['-o', '--output']:
+            output = a
+        if o in ['-t', '--tileSize']:
+            tileSize = int(a)
+        if o in ['-w', '--workDir']:
+            workDir = a
+        if o in ['-p', '--gazePosition']:
+            gazePosition = tuple([float(x) for x in a.split(',')])
+        if o in ['-r', '--gazeRadius']:
+            gazeRadius = float(a)
+        if o in ['-d', '--viewDist']:
+            viewDist = float(a)
+        if o in ['-x', '--pix2deg']:
+            pix2deg = float(a)
+        if o in ['-y', '--pyramid']:
+            pyramid = a
+        if o in ['-f', '--format']:
+            imgFormat = a
+        if o in ['-j', '--threads']:
+            threads = int(a)
+        if o in ['-b', '--backend']:
+            backend = a
+
+    if imgFilename is None or output is None:
+        usage()
+        sys.exit(2)
+
+    gl_context.relaunchForBackend(backend, visible=False)
+    from foveate.tiled import TiledRenderer
+    fov = TiledRenderer(createModel(model, gazeRadius=gazeRadius, viewDist=viewDist, pix2deg=pix2deg), gazePosition=gazePosition,
+                        backend=backend, pyramid=pyramid, tileSize=tileSize, workDir=workDir)
+    sink = createSink(imgFormat, threads=threads)
+
+    fov.loadImgFromFile(imgFilename=imgFilename)
+    fov.render(output, sink=sink, ext=imgFormat)
+    sink.close()
+    fov.close()
+    fov.context.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#Command line interface of the video and image sequence foveation (foveate/video.py)
+#foveates a video or image sequence along a gaze trace recorded with an eye tracker
+import sys
+import getopt
+
+from foveate import gl_context, createRenderer
+from foveate.video import readGazeLog, GazeTrace, openReader, openWriter, foveateStream
+
+
+def usage():
+    print('Usage: python3 src/foveate_video.py [options]')
+    print('Foveation of a video or image sequence along a recorded gaze trace')
+    print('Options:')
+    print('-h, --help\t\t', 'Displays this help')
+    print('-m, --model\t\t', 'Foveation model: classic or gp (Geisler&Perry), default: classic')
+    print('-b, --backend\t\t', 'Renderer backend: auto, egl, osmesa, glfw or cpu, default: auto')
+    print('-i, --input\t\t', 'Video file, directory of frames or glob pattern (e.g. "frames/*.png")')
+    print('-o, --output\t\t', 'Video file (.mp4, .avi, ...) or directory for the foveated frames, default: output')
+    print('-g, --gazeLog\t\t', 'CSV or TSV eye tracker export with time and gaze x, y columns')
+    print('-c, --columns\t\t', "Names of the time, x and y columns (e.g. '--columns timestamp,gaze_x,gaze_y'), default: detected from the header")
+    print('-t, --timeScale\t\t', 'Factor converting the time column to seconds (e.g. 0.001 for milliseconds), default: 1')
+    print('-s, --offset\t\t', 'Time of the first frame on the clock of the gaze log in seconds, default: 0')
+    print('-n, --normalized\t', 'Gaze coordinates are given as fractions of the frame size')
+    print('-f, --fps\t\t', 'Frame rate of image sequences, default: 30')
+    print('-q, --queueSize\t\t', 'Number of frames buffered between the pipeline stages, default: 8')
+    print('-y, --pyramid\t\t', 'Image pyramid: mipmap (glGenerateMipmap), gaussian or laplacian (gaussian, blended with cubic expansion), default: mipmap')
+    print('-r, --gazeRadius\t', 'Radius of the fovea, default: 25 (classic model)')
+    print('-d, --viewDist\t\t', 'Distance to the stimuli in meters, default: 0.6 (gp model)')
+    print('-x, --pix2deg\t\t', 'Number of pixels per deg vis angle, default: 32 (gp model)')
+
+def main():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hm:b:i:o:g:c:t:s:nf:q:y:r:d:x:', ['help', 'model=', 'backend=', 'input=', 'output=', 'gazeLog=', 'columns=',
+                                                                               'timeScale=', 'offset=', 'normalized', 'fps=', 'queueSize=', 'pyramid=',
+                                                                               'gazeRadius=', 'viewDist=', 'pix2deg='])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    options = {'model': 'classic', 'backend': 'auto', 'gazePosition': (-1, -1), 'gazeRadius': 25, 'viewDist': 0.6, 'pix2deg': 32, 'pyramid': 'mipmap'}
+    inputPath = None
+    outputPath = 'output'
+    gazeLog = None
+    columns = (None, None, None)
+    timeScale = 1.0
+    offset = 0.0
+    normalized = False
+    fps = 30.0
+    queueSize = 8
+
+    for o, a in opts:
+        if o in ['-h', '--help']:
+            usage()
+            sys.exit(2)
+        if o in ['-m', '--model']:
+            options['model'] = a
+        if o in ['-b', '--backend']:
+            options['backend'] = a
+        if o in ['-i', '--input']:
+            inputPath = a
+        if o in ['-o', '--output']:
+            outputPath = a
+        if o in ['-g', '--gazeLog']:
+            gazeLog = a
+        if o in ['-c', '--columns']:
+            columns = tuple(a.split(','))
+        if o in ['-t', '--timeScale']:
+            timeScale = float(a)
+        if o in ['-s', '--offset']:
+            offset = float(a)
+        if o in ['-n', '--normalized']:
+            normalized = True
+        if o in ['-f', '--fps']:
+            fps = float(a)
+        if o in ['-q', '--queueSize']:
+            queueSize = int(a)
+        if o in ['-y', '--pyramid']:
+            options['pyramid'] = a
+        if o in ['-r', '--gazeRadius']:
+            options['gazeRadius'] = float(a)
+        if o in ['-d', '--viewDist']:
+            options['viewDist'] = float(a)
+        if o in ['-x', '--pix2deg']:
+            options['pix2deg'] = float(a)
+
+    if inputPath is None or gazeLog is None or len(columns) != 3:
+        usage()
+        sys.exit(2)
+
+    if options['backend'] != 'cpu':
+        gl_context.relaunchForBackend(options['backend'], visible=False)
+
+    times, points = readGazeLog(gazeLog, *columns, timeScale=timeScale)
+    gaze = GazeTrace(times, points, normalized=normalized, offset=offset)
+    reader = openReader(inputPath, fps)
+    writer = openWriter(outputPath, reader.width, reader.height, reader.fps)
+
+    fov = createRenderer(options['model'], backend=options['backend'], gazeRadius=options['gazeRadius'],
+                         viewDist=options['viewDist'], pix2deg=options['pix2deg'], pyramid=options['pyramid'])
+
+    frames, elapsed = foveateStream(fov, reader, gaze, writer, queueSize=queueSize)
+    print('{} frames in {:.2f}s, {:.2f} fps'.format(frames, elapsed, frames/elapsed if elapsed > 0 else 0))
+
+    if options['backend'] != 'cpu':
+        fov.context.terminate()
+
+if __name__ == "__main__":
+    main()
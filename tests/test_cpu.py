@@ -0,0 +1,56 @@
+#tests of the CPU renderers (foveate/cpu.py) against the default renders in examples/ and, where an OpenGL context
+#can be created, against the OpenGL renderers
+from os.path import abspath, dirname, join
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import foveate
+from foveate import Foveate_CPU, Foveate_GP_CPU
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+#(model, image, default render in examples/)
+CASES = [('classic', 'Yarbus_scaled.jpg', 'Yarbus_scaled_default.jpg'),
+         ('gp', 'Yarbus_Shishkin.jpg', 'Yarbus_Shishkin_gp_default.jpg')]
+
+#mean absolute difference in 8-bit levels, the examples are JPEG compressed
+EXAMPLES_TOLERANCE = 8.0
+GL_TOLERANCE = 2.0
+
+
+def cpuRenderer(model):
+    if model == 'classic':
+        return Foveate_CPU()
+    return Foveate_GP_CPU(viewDist=0.6, pix2deg=32)
+
+
+def render(fov, imgName):
+    fov.loadImgFromFile(imgFilename=join(ROOT, 'images', imgName))
+    fov.run()
+    return np.asarray(fov.readImage(), np.float32)
+
+
+def meanDifference(a, b):
+    assert a.shape == b.shape
+    return float(np.mean(np.abs(a - b)))
+
+
+@pytest.mark.parametrize('model, imgName, reference', CASES)
+def test_cpu_matches_examples(model, imgName, reference):
+    expected = np.asarray(Image.open(join(ROOT, 'examples', reference)).convert('RGB'), np.float32)
+    assert meanDifference(render(cpuRenderer(model), imgName), expected) <= EXAMPLES_TOLERANCE
+
+
+@pytest.mark.parametrize('model, imgName, reference', CASES)
+def test_cpu_matches_gl(model, imgName, reference):
+    try:
+        fov = foveate.createRenderer(model, backend='auto', viewDist=0.6, pix2deg=32)
+    except Exception as err:
+        pytest.skip('no OpenGL context: {}'.format(err))
+    try:
+        expected = render(fov, imgName)
+    finally:
+        fov.context.terminate()
+    assert meanDifference(render(cpuRenderer(model), imgName), expected) <= GL_TOLERANCE
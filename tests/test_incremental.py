@@ -0,0 +1,37 @@
+#tests of incremental rendering (foveate/incremental.py) with the CPU renderer
+from os.path import abspath, dirname, join
+
+import numpy as np
+from PIL import Image
+
+import foveate
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+#largest difference in 8-bit levels from full renders for the default tolerance
+MAX_DIFFERENCE = 3
+
+
+#frames of an incremental renderer along a gaze path stay close to full renders, and are drawn in part
+def test_incremental_matches_full_frames():
+    with Image.open(join(ROOT, 'images', 'Yarbus_scaled.jpg')) as img:
+        frame = np.asarray(img.convert('RGB').resize((320, 240)))
+    points = [(120 + 2.5*i, 100 + 3*i) for i in range(12)]
+
+    full = foveate.createRenderer('classic', backend='cpu')
+    full.loadImgFromArray(frame)
+    fov = foveate.createRenderer('classic', backend='cpu')
+    fov.setIncremental()
+    fov.loadImgFromArray(frame)
+
+    regions = []
+    for point in points:
+        full.moveGaze(point)
+        full.run()
+        fov.moveGaze(point)
+        fov.run()
+        regions.append(fov.incremental.drawnFixations[-1][1])
+        difference = np.abs(fov.readImage().astype(np.int16) - full.readImage())
+        assert difference.max() <= MAX_DIFFERENCE
+    assert regions[0] == (0, 240, 0, 320)
+    assert any(region != regions[0] for region in regions[1:])
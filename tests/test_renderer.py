@@ -0,0 +1,32 @@
+#tests of the OpenGL renderer (foveate/renderer.py), skipped where no OpenGL context can be created
+from os.path import abspath, dirname, join
+
+import pytest
+
+import foveate
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+
+@pytest.fixture
+def renderer():
+    try:
+        fov = foveate.createRenderer('classic', backend='auto')
+    except Exception as err:
+        pytest.skip('no OpenGL context: {}'.format(err))
+    yield fov
+    fov.context.terminate()
+
+
+#an incomplete framebuffer raises instead of exiting the process, so that servers and pool workers can report it
+def test_incomplete_framebuffer_raises(renderer):
+    from OpenGL.GL import glGenFramebuffers, glBindFramebuffer, glDeleteFramebuffers, GL_FRAMEBUFFER
+    renderer.loadImgFromFile(join(ROOT, 'images', 'Yarbus_scaled.jpg'))
+    fbo = glGenFramebuffers(1)
+    glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+    try:
+        with pytest.raises(RuntimeError):
+            renderer.run()
+    finally:
+        glBindFramebuffer(GL_FRAMEBUFFER, renderer.FBO)
+        glDeleteFramebuffers(1, [fbo])
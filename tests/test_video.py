@@ -0,0 +1,53 @@
+#tests of foveating image sequences along a gaze log (foveate/video.py) with the CPU renderer
+from os.path import abspath, dirname, join
+
+import numpy as np
+from PIL import Image
+
+from foveate import Foveate_CPU
+from foveate.video import ImageSequenceReader, GazeTrace, readGazeLog, foveateStream
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+
+class ListWriter:
+    def __init__(self):
+        self.frames = {}
+
+    def write(self, index, frame):
+        self.frames[index] = np.array(frame)
+
+    def close(self):
+        pass
+
+
+def renderAt(frame, gazePosition):
+    fov = Foveate_CPU()
+    fov.loadImgFromArray(frame)
+    fov.moveGaze(gazePosition)
+    fov.run()
+    return np.asarray(fov.readImage())
+
+
+#gaze samples above the frame (negative y) are rendered where they are, not moved to the center as "no gaze"
+def test_gaze_above_frame(tmp_path):
+    frameDir = tmp_path / 'frames'
+    frameDir.mkdir()
+    with Image.open(join(ROOT, 'images', 'Yarbus_scaled.jpg')) as img:
+        img = img.convert('RGB').resize((160, 120))
+    for i in range(2):
+        img.save(str(frameDir / 'frame_{}.png'.format(i)))
+    logFile = tmp_path / 'gaze.csv'
+    logFile.write_text('timestamp,gaze_x,gaze_y\n0.0,40,-30\n1.0,40,-30\n')
+
+    reader = ImageSequenceReader(str(frameDir), fps=10.0)
+    writer = ListWriter()
+    frames, _ = foveateStream(Foveate_CPU(), reader, GazeTrace(*readGazeLog(str(logFile))), writer)
+
+    assert frames == 2
+    frame = np.asarray(img)
+    expected = renderAt(frame, (-30.0, 40.0))
+    centered = renderAt(frame, (60.0, 80.0))
+    assert not np.array_equal(expected, centered)
+    for index in range(frames):
+        assert np.array_equal(writer.frames[index], expected)